@@ -0,0 +1,113 @@
+"""Memory/runtime comparison of the dtype backends on a generated returns file"""
+
+import argparse
+import json
+import logging
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.config import PROCESSING_CONFIG
+from src.utils import logger, resolve_dtype_backend
+from src.ingestion import AmazonParser
+from src.processing import Aggregator
+from src.analysis import RiskPredictor
+
+REASONS = [
+    "Size too small", "Sole separated after two runs", "Colour not as pictured", "Arrived damaged",
+    "Stopped working after 2 days", "Packaging torn", "Zip broke", "Too large", "Strong odor",
+]
+
+
+def generate_returns(path: Path, rows: int, products: int = 20000, seed: int = 0, chunk_rows: int = 1_000_000) -> None:
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Product {i:05d}" for i in range(products)], dtype=object)
+    for start in range(0, rows, chunk_rows):
+        n = min(chunk_rows, rows - start)
+        dates = pd.Timestamp("2025-01-01") + pd.to_timedelta(rng.integers(0, 365, n), unit="D")
+        pd.DataFrame({
+            'order_id': np.char.add('AMZ', np.arange(start, start + n).astype(str)),
+            'title': names[rng.zipf(1.3, n) % products],
+            'sku': np.char.add('SKU-', (rng.integers(0, products, n)).astype(str)),
+            'return_reason': rng.choice(REASONS, n),
+            'return_date': dates.strftime('%Y-%m-%d'),
+            'refund_amount': rng.uniform(5, 200, n).round(2),
+        }).to_csv(path, mode='w' if start == 0 else 'a', header=start == 0, index=False)
+
+
+def run_backend(path: str, backend: str) -> dict:
+    """Parse and score the file with one backend; meant to run in its own process for a clean peak RSS"""
+
+    logger.setLevel(logging.ERROR)
+    PROCESSING_CONFIG['dtype_backend'] = backend
+    PROCESSING_CONFIG['lookback_pushdown'] = {'enabled': False}
+    if resolve_dtype_backend(backend) != backend:
+        return {'backend': backend, 'skipped': 'pyarrow is not installed'}
+
+    timings = {}
+    start = time.perf_counter()
+    returns_df = AmazonParser(path).parse()
+    timings['parse'] = time.perf_counter() - start
+    frame_mb = returns_df.memory_usage(deep=True).sum() / 2 ** 20
+
+    start = time.perf_counter()
+    metrics = Aggregator().product_metrics(returns_df, 'product_name', 'return_reason')
+    timings['product_metrics'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predictor = RiskPredictor()
+    predictor.calculate_risk_score(returns_df, 'product_name', metrics=metrics)
+    predictor.calculate_windowed_risk_scores(returns_df, 'product_name', 'return_date')
+    timings['risk_scores'] = time.perf_counter() - start
+
+    return {
+        'backend': backend,
+        'rows': len(returns_df),
+        'frame_mb': round(frame_mb, 1),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'seconds': {stage: round(seconds, 2) for stage, seconds in timings.items()},
+        'dtypes': {col: str(dtype) for col, dtype in returns_df.dtypes.items()},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=10_000_000)
+    parser.add_argument("--backends", nargs="+", default=["numpy", "pyarrow"])
+    parser.add_argument("--file", help="reuse an existing returns CSV instead of generating one")
+    parser.add_argument("--worker", nargs=2, metavar=("FILE", "BACKEND"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_backend(*args.worker)))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(args.file) if args.file else Path(tmp) / "amazon_returns.csv"
+        if not args.file:
+            start = time.perf_counter()
+            generate_returns(path, args.rows)
+            print(f"Generated {args.rows:,} returns ({path.stat().st_size / 2 ** 20:.0f} MB) "
+                  f"in {time.perf_counter() - start:.1f}s")
+
+        for backend in args.backends:
+            output = subprocess.run([sys.executable, __file__, "--worker", str(path), backend],
+                                    capture_output=True, text=True, check=True).stdout
+            result = json.loads(output.strip().splitlines()[-1])
+            if 'skipped' in result:
+                print(f"{backend:>15}: skipped ({result['skipped']})")
+                continue
+            seconds = ", ".join(f"{stage} {value}s" for stage, value in result['seconds'].items())
+            print(f"{backend:>15}: frame {result['frame_mb']} MB, peak RSS {result['peak_rss_mb']} MB; {seconds}")
+
+
+if __name__ == "__main__":
+    main()
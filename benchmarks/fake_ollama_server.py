@@ -0,0 +1,187 @@
+"""Local Ollama stand-in for benchmarking and load-testing the LLM path without a real model"""
+
+import argparse
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_RESPONSES = {
+    "root_cause": (
+        "1. Inaccurate size chart - HIGH severity, ~40% of returns, affects customers between sizes\n"
+        "2. Sole adhesive failure within two weeks - HIGH severity, ~30% of returns, affects runners\n"
+        "3. Colour differs from product photos - MEDIUM severity, ~15% of returns"
+    ),
+    "recommendations": (
+        "DESIGN ACTIONS\n- Reinforce the sole bond area with a wider adhesive margin\n"
+        "MATERIALS ACTIONS\n- Switch to a polyurethane adhesive rated for 500 flex cycles\n"
+        "SIZING ACTIONS\n- Re-measure the size chart against 20 production samples\n"
+        "PACKAGING ACTIONS\n- Add corner protectors to the shipping carton\n"
+        "QC ACTIONS\n- Add a peel test to 1 in 50 units per batch"
+    ),
+}
+
+
+class FakeOllamaServer:
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 latency_jitter: float = 0.0, error_rate: float = 0.0, responses: dict = None,
+                 models: list = None, seed: int = None):
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self.responses = dict(DEFAULT_RESPONSES, **(responses or {}))
+        self.models = models or ["mistral"]
+        self.random = random.Random(seed)
+        self.request_count = 0
+        self.error_count = 0
+        self._lock = threading.Lock()
+        self._thread = None
+
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                if self.path.rstrip('/') == "/api/tags":
+                    self._send_json(200, {"models": [{"name": f"{name}:latest"} for name in server.models]})
+                else:
+                    self._send_json(404, {"error": "not found"})
+
+            def do_POST(self):
+                if self.path.rstrip('/') != "/api/generate":
+                    self._send_json(404, {"error": "not found"})
+                    return
+
+                length = int(self.headers.get("Content-Length", 0))
+                try:
+                    payload = json.loads(self.rfile.read(length) or b"{}")
+                except json.JSONDecodeError:
+                    self._send_json(400, {"error": "invalid json"})
+                    return
+
+                delay, fail = server._next_outcome()
+                if delay:
+                    time.sleep(delay)
+                if fail:
+                    self._send_json(500, {"error": "simulated failure"})
+                    return
+
+                text = server.render_response(payload)
+                model = payload.get("model", server.models[0])
+                if payload.get("stream", True):
+                    self._send_stream(model, text)
+                else:
+                    self._send_json(200, {"model": model, "response": text, "done": True})
+
+            def _send_json(self, status: int, body: dict):
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _send_stream(self, model: str, text: str):
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                for token in re.findall(r'\S+\s*', text):
+                    self.wfile.write((json.dumps({"model": model, "response": token, "done": False}) + "\n").encode("utf-8"))
+                self.wfile.write((json.dumps({"model": model, "response": "", "done": True}) + "\n").encode("utf-8"))
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _next_outcome(self) -> tuple:
+        with self._lock:
+            self.request_count += 1
+            delay = max(0.0, self.latency + self.random.uniform(-self.latency_jitter, self.latency_jitter))
+            fail = self.random.random() < self.error_rate
+            if fail:
+                self.error_count += 1
+        return delay, fail
+
+    def render_response(self, payload: dict) -> str:
+        """Pick a canned response shaped like the request (plain, fused or keyed-JSON batch)"""
+
+        prompt = payload.get("prompt", "")
+        is_recommendation = "recommendations" in prompt.lower() and "root causes" in prompt.lower()
+
+        if payload.get("format") == "json":
+            keys = re.findall(r'^\[(P\d+)\]', prompt, re.MULTILINE)
+            if is_recommendation:
+                value = {
+                    "design": ["Reinforce the sole bond area"],
+                    "materials": ["Switch to a higher-grade adhesive"],
+                    "sizing": ["Re-measure the size chart"],
+                    "packaging": ["Add corner protectors"],
+                    "qc": ["Add a peel test per batch"],
+                }
+            else:
+                value = self.responses["root_cause"]
+            return json.dumps({key: value for key in keys})
+
+        if "ROOT CAUSE ANALYSIS:" in prompt and "RECOMMENDATIONS:" in prompt:
+            return f"ROOT CAUSE ANALYSIS:\n{self.responses['root_cause']}\n\nRECOMMENDATIONS:\n{self.responses['recommendations']}"
+        if is_recommendation or "Generate specific, actionable recommendations" in prompt:
+            return self.responses["recommendations"]
+        return self.responses["root_cause"]
+
+    def start(self) -> "FakeOllamaServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local Ollama stand-in server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds of delay per generate request")
+    parser.add_argument("--latency-jitter", type=float, default=0.0, help="uniform +/- jitter on latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of generate requests answered with HTTP 500")
+    parser.add_argument("--responses", help="JSON file with 'root_cause' and/or 'recommendations' canned texts")
+    parser.add_argument("--model", action="append", dest="models", help="model name to advertise (repeatable)")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args()
+
+    responses = None
+    if args.responses:
+        with open(args.responses, "r", encoding="utf-8") as f:
+            responses = json.load(f)
+
+    server = FakeOllamaServer(
+        args.host, args.port, args.latency, args.latency_jitter,
+        args.error_rate, responses, args.models, args.seed
+    )
+    print(f"Fake Ollama listening on {server.url}", file=sys.stderr)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
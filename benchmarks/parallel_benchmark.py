@@ -0,0 +1,76 @@
+"""Speedup of the partitioned process-pool executor for text normalization, classification and regex flags"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils import logger, ParallelExecutor, contains_pattern
+from src.processing import Normalizer, Classifier
+
+WORDS = [
+    "the", "sole", "separated", "after", "two", "runs", "size", "too", "small", "arrived", "damaged",
+    "box", "crushed", "refund", "please", "zip", "broke", "colour", "not", "as", "pictured", "quality",
+    "cheap", "stopped", "working", "exchange", "fits", "large", "odor", "strong", "packaging", "torn",
+]
+ISSUE_PATTERN = r'broken|damaged|defect|quality|issue|problem|stop work|failed|poor|cheap|quality|cracking|fading'
+
+
+def make_texts(rows: int, distinct: int, seed: int = 0) -> pd.DataFrame:
+    """Free text where each row draws from `distinct` generated sentences (transcripts are mostly unique)"""
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(5, 40, distinct)
+    sentences = np.array([
+        " ".join(rng.choice(WORDS, length)).capitalize() + f"! Order #{i}" for i, length in enumerate(lengths)
+    ], dtype=object)
+    return pd.DataFrame({'text': sentences[rng.integers(0, distinct, rows)]})
+
+
+def run_stages(df: pd.DataFrame) -> tuple:
+    normalized = Normalizer().normalize_dataframe(df, ['text'])['text_normalized']
+    categories = Classifier().classify_dataframe(df, 'text')['return_category']
+    flags = ParallelExecutor.shared().map_column(df['text'], contains_pattern, ISSUE_PATTERN).astype(bool)
+    return normalized, categories, flags
+
+
+def timed(df: pd.DataFrame, workers: int, block_rows: int) -> tuple:
+    ParallelExecutor._shared = ParallelExecutor(workers=workers, block_rows=block_rows, min_values=0)
+    try:
+        run_stages(df.head(1000))  # start the pool outside the timing
+        start = time.perf_counter()
+        results = run_stages(df)
+        return time.perf_counter() - start, results
+    finally:
+        ParallelExecutor.shutdown_shared()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--distinct", type=int, default=1_000_000)
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4, 8, os.cpu_count() or 1])
+    parser.add_argument("--block-rows", type=int, default=50000)
+    args = parser.parse_args()
+    logger.setLevel(logging.ERROR)
+
+    df = make_texts(args.rows, args.distinct)
+    print(f"{args.rows:,} rows, {df['text'].nunique():,} distinct texts, {os.cpu_count()} CPUs")
+
+    baseline, expected = timed(df, 1, args.block_rows)
+    print(f"  1 worker : {baseline:.2f}s")
+    for workers in sorted(set(w for w in args.workers if w > 1)):
+        seconds, results = timed(df, workers, args.block_rows)
+        for got, want in zip(results, expected):
+            pd.testing.assert_series_equal(got, want)
+        print(f"{workers:3d} workers: {seconds:.2f}s  (speedup {baseline / seconds:.2f}x, results identical)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""Check that incremental risk state updates match a full recompute, and time both paths"""
+
+import argparse
+import logging
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from src.utils import logger
+from src.analysis import RiskPredictor
+
+
+def make_returns(n: int, products: int, days: int, seed: int = 0) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    dates = pd.Timestamp("2025-01-01") + pd.to_timedelta(np.sort(rng.integers(0, days, n)), unit="D")
+    return pd.DataFrame({
+        'product_name': [f"Product {i:05d}" for i in rng.zipf(1.3, n) % products],
+        'return_date': dates.strftime("%Y-%m-%d")
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental vs full risk scoring equivalence check")
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--products", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--step-days", type=int, default=7, help="days of new returns folded per run")
+    args = parser.parse_args()
+
+    logger.setLevel(logging.ERROR)
+    df = make_returns(args.rows, args.products, args.days)
+    day_index = pd.to_datetime(df['return_date'])
+    cutoffs = pd.date_range(day_index.min(), day_index.max() + pd.Timedelta(days=1), freq=f"{args.step_days}D")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        state_file = Path(tmp) / "risk_state.json"
+        incremental_seconds, full_seconds, runs = 0.0, 0.0, 0
+        previous = cutoffs[0]
+        for cutoff in list(cutoffs[1:]) + [day_index.max() + pd.Timedelta(days=1)]:
+            history = df[day_index < cutoff]
+            # Each run reads only the returns that arrived since the previous one
+            new_rows = df[(day_index >= previous) & (day_index < cutoff)]
+            previous = cutoff
+
+            predictor = RiskPredictor()
+            predictor.state_path = state_file
+            start = time.perf_counter()
+            predictor.load_state()
+            incremental = predictor.update_risk_score(new_rows, 'product_name', 'return_date')
+            predictor.save_state()
+            incremental_seconds += time.perf_counter() - start
+
+            start = time.perf_counter()
+            full = RiskPredictor().calculate_risk_score(history, 'product_name', 'return_date')
+            full_seconds += time.perf_counter() - start
+
+            pd.testing.assert_frame_equal(incremental.reset_index(drop=True), full.reset_index(drop=True))
+            runs += 1
+
+    print(f"{runs} runs match a full recompute "
+          f"(incremental {incremental_seconds:.2f}s, full {full_seconds:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
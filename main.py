@@ -3,19 +3,31 @@ import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).parent))
 
-from src.utils import logger
+from src.utils import logger, select_top_n, resolve_dtype_backend, apply_dtype_backend, ParallelExecutor
 from src.config import (
     DATA_SOURCES, RAW_DATA_DIR, PROCESSED_DATA_DIR,
-    REPORTS_DIR, PROCESSING_CONFIG
+    REPORTS_DIR, PROCESSING_CONFIG, AI_CONFIG, RISK_CONFIG, REPORTING_CONFIG
 )
 
 from src.ingestion import (
     AmazonParser, WebsiteParser, ChatParser,
     ReviewParser, LogParser, QCParser
 )
-from src.processing import Normalizer, Classifier, PatternDetector, Aggregator
-from src.analysis import RootCauseAnalyzer, RiskPredictor, RecommendationEngine
-from src.reporting import ReportGenerator
+from src.processing import (
+    Normalizer, Classifier, PatternDetector, Aggregator, SourceJoiner, IdentityResolver,
+    ReasonClusterer, HeavyHitters, RollupCube, OrderDeduplicator
+)
+from src.analysis import (
+    RootCauseAnalyzer, RiskPredictor, RecommendationEngine,
+    FusedAnalyzer, LLMScheduler, PipelinedExecutor, ModelRouter,
+    RuleBasedEngine, SimilarityIndex, RiskState
+)
+from src.reporting import ReportGenerator, ResultsStore
+
+
+def reason_column(returns_df):
+    """Clustered canonical reasons when available, raw return_reason otherwise"""
+    return 'return_reason_canonical' if 'return_reason_canonical' in returns_df.columns else 'return_reason'
 
 
 def load_data():
@@ -95,10 +107,20 @@ def process_data(data_sources):
     processed_data = {}
     returns_dfs = []
 
+    order_deduplicator = None
+    if (PROCESSING_CONFIG.get("order_dedup") or {}).get("enabled", False):
+        order_deduplicator = OrderDeduplicator()
+
+    window_starts = []
     for source_name in ['amazon', 'website']:
         df = data_sources.get(source_name)
         if df is not None and not df.empty:
             logger.info(f"Processing {source_name} data...")
+            if 'window_start' in df.attrs:
+                window_starts.append(df.attrs['window_start'])
+            if order_deduplicator is not None:
+                # Fingerprint the raw rows; dedup itself runs once products are resolved
+                df = df.assign(row_hash=OrderDeduplicator.row_hashes(df))
             df = normalizer.normalize_dataframe(df, ['return_reason', 'customer_feedback'])
             df = normalizer.remove_duplicates(df)
             if 'return_reason' in df.columns:
@@ -106,9 +128,23 @@ def process_data(data_sources):
             returns_dfs.append(df)
             logger.info(f"✓ Processed {source_name}: {len(df)} records")
 
+    resolver = None
+    if (PROCESSING_CONFIG.get("identity_resolution") or {}).get("enabled", False):
+        resolver = IdentityResolver()
+
     if returns_dfs:
-        combined_returns = aggregator.combine_dataframes(returns_dfs)
+        combined_returns = aggregator.combine_dataframes(returns_dfs, resolver=resolver)
+        if order_deduplicator is not None:
+            combined_returns = order_deduplicator.drop_duplicates(combined_returns)
+        if (PROCESSING_CONFIG.get("reason_clustering") or {}).get("enabled", False):
+            combined_returns = ReasonClusterer().cluster_dataframe(combined_returns, 'return_reason')
         processed_data['returns'] = combined_returns
+        if (PROCESSING_CONFIG.get("rollup_cube") or {}).get("enabled", False):
+            cube = RollupCube().build(combined_returns)
+            if RollupCube.default_path().exists():
+                # Pushdown trims the returns to the risk window; older weeks come from the saved cube
+                cube.merge(RollupCube.load(), max(window_starts) if window_starts else None)
+            cube.save()
         logger.info(f"✓ Combined returns data: {len(combined_returns)} total records")
 
     if data_sources.get('chats') is not None and not data_sources['chats'].empty:
@@ -130,11 +166,21 @@ def process_data(data_sources):
     if data_sources.get('qc') is not None and not data_sources['qc'].empty:
         processed_data['qc_reports'] = data_sources['qc']
 
+    if resolver is not None and 'returns' in processed_data:
+        for source_name in ['chats', 'reviews', 'packaging_logs', 'qc_reports']:
+            if source_name in processed_data:
+                processed_data[source_name] = resolver.apply(processed_data[source_name])
+
+    dtype_backend = resolve_dtype_backend(PROCESSING_CONFIG.get("dtype_backend"))
+    if dtype_backend != 'numpy':
+        processed_data = {name: apply_dtype_backend(df, dtype_backend) for name, df in processed_data.items()}
+        logger.info(f"✓ Converted derived text columns to {dtype_backend} dtypes")
+
     logger.info("✓ Data processing complete")
     return processed_data
 
 
-def analyze_data(processed_data):
+def analyze_data(processed_data, scheduler=None, include_root_causes=True):
     logger.info("=" * 60)
     logger.info("STEP 3: DATA ANALYSIS")
     logger.info("=" * 60)
@@ -147,9 +193,23 @@ def analyze_data(processed_data):
         classifier_obj = Classifier()
         returns_df = processed_data['returns']
 
+        if 'product_name' in returns_df.columns:
+            product_metrics = Aggregator().product_metrics(
+                returns_df, 'product_name',
+                reason_column(returns_df) if 'return_reason' in returns_df.columns else None
+            )
+            analysis_results['product_metrics'] = product_metrics
+
         if 'product_name' in returns_df.columns and 'return_reason' in returns_df.columns:
+            reason_sketch = None
+            if (PROCESSING_CONFIG.get("heavy_hitters") or {}).get("enabled", False) and 'return_date' in returns_df.columns:
+                reason_sketch = HeavyHitters.load()
+                reason_sketch.update_new(returns_df, reason_column(returns_df), 'product_name', 'return_date')
+                reason_sketch.save()
+                analysis_results['reason_sketch'] = reason_sketch
             product_patterns = pattern_detector.detect_product_issues(
-                returns_df, 'product_name', 'return_reason'
+                returns_df, 'product_name', reason_column(returns_df),
+                metrics=analysis_results['product_metrics'], sketch=reason_sketch
             )
             analysis_results['product_patterns'] = product_patterns
             logger.info(f"✓ Detected patterns for {len(product_patterns)} products")
@@ -159,37 +219,169 @@ def analyze_data(processed_data):
             analysis_results['category_distribution'] = category_dist
             logger.info(f"✓ Category distribution: {list(category_dist.keys())}")
 
+        if 'product_name' in returns_df.columns and 'return_date' in returns_df.columns:
+            return_spikes = pattern_detector.detect_return_spikes(
+                returns_df, 'product_name', 'return_date', 'return_category'
+            )
+            analysis_results['return_spikes'] = return_spikes
+            logger.info(f"✓ Return spikes flagged for {len(return_spikes['products'])} products")
+
+    if 'returns' in processed_data and not processed_data['returns'].empty:
+        logger.info("Joining returns with QC, packaging, review and chat data...")
+        source_joiner = SourceJoiner()
+        product_features = source_joiner.build_product_features(
+            processed_data['returns'],
+            qc_df=processed_data.get('qc_reports'),
+            packaging_df=processed_data.get('packaging_logs'),
+            reviews_df=processed_data.get('reviews'),
+            chats_df=processed_data.get('chats')
+        )
+        if not product_features.empty:
+            analysis_results['product_features'] = product_features
+            analysis_results['source_correlations'] = source_joiner.correlate(product_features)
+            logger.info(f"✓ Built cross-source features for {len(product_features)} products")
+
     if 'returns' in processed_data and not processed_data['returns'].empty:
         logger.info("Calculating risk scores...")
         risk_predictor = RiskPredictor()
         returns_df = processed_data['returns']
         if 'product_name' in returns_df.columns:
-            risk_scores = risk_predictor.calculate_risk_score(
-                returns_df, 'product_name'
+            if RISK_CONFIG.get("incremental_state") and 'return_date' in returns_df.columns:
+                state = risk_predictor.load_state()
+                keys = RiskState.row_keys(returns_df, 'product_name', 'return_date')
+                unseen = state.unseen(keys)
+                logger.info(f"Folding {int(unseen.sum())} of {len(returns_df)} returns not yet in the risk state")
+                risk_scores = risk_predictor.update_risk_score(
+                    returns_df[unseen], 'product_name', 'return_date', keys=keys[unseen]
+                )
+                risk_predictor.save_state()
+            else:
+                risk_scores = risk_predictor.calculate_risk_score(
+                    returns_df, 'product_name',
+                    date_col='return_date' if 'return_date' in returns_df.columns else None,
+                    metrics=analysis_results.get('product_metrics')
+                )
+            if 'return_date' in returns_df.columns:
+                windowed = risk_predictor.calculate_windowed_risk_scores(
+                    returns_df, 'product_name', 'return_date'
+                )
+                risk_scores = risk_scores.merge(windowed, on='product', how='left')
+                forecast = risk_predictor.forecast_returns(returns_df, 'product_name', 'return_date')
+                risk_scores = risk_scores.merge(
+                    forecast.drop(columns=['avg_returns_per_week', 'recent_returns']), on='product', how='left'
+                )
+            risk_scores = risk_predictor.calculate_estimated_impact(
+                risk_scores, metrics=analysis_results.get('product_metrics')
             )
             analysis_results['risk_scores'] = risk_scores
             logger.info(f"✓ Calculated risk scores for {len(risk_scores)} products")
 
+            at_risk = risk_scores.loc[risk_scores['risk_level'] == 'HIGH', 'product']
+            if len(at_risk):
+                similarity_index = SimilarityIndex().build_from_sources(
+                    returns_df, 'product_name', reason_column(returns_df),
+                    reviews_df=processed_data.get('reviews'),
+                    chats_df=processed_data.get('chats')
+                )
+                analysis_results['similar_products'] = {
+                    product: similarity_index.similar_products(product) for product in at_risk
+                }
+                logger.info(f"✓ Found similar failure profiles for {len(at_risk)} at-risk products")
+
+            if 'product_patterns' in analysis_results:
+                risk_levels = risk_scores.drop_duplicates('product').set_index('product')['risk_level']
+                for product_name, pattern_data in analysis_results['product_patterns'].items():
+                    pattern_data['risk_level'] = risk_levels.get(product_name)
+
     logger.info("Performing root cause analysis...")
-    root_cause_analyzer = RootCauseAnalyzer()
     root_causes = {}
-
-    if 'product_patterns' in analysis_results:
-        for product_name, pattern_data in analysis_results['product_patterns'].items():
-            logger.info(f"  Analyzing {product_name}...")
-            analysis = root_cause_analyzer.analyze_reasons(pattern_data, product_name)
-            root_causes[product_name] = analysis
+    scheduler = scheduler or LLMScheduler()
+    risk_df = analysis_results.get('risk_scores')
+
+    # engine: rules never needs Ollama; only llm/auto build the analyzer (and its connection check)
+    root_cause_analyzer = None
+    if not RuleBasedEngine.enabled(llm_available=True):
+        root_cause_analyzer = RootCauseAnalyzer()
+    llm_available = root_cause_analyzer is not None and root_cause_analyzer.client is not None
+
+    if 'returns' in processed_data and RuleBasedEngine.enabled(llm_available):
+        logger.info("Using rule-based root cause engine")
+        root_causes, rule_recommendations = RuleBasedEngine().analyze(
+            processed_data['returns'],
+            'product_name',
+            processed_data.get('qc_reports'),
+            processed_data.get('packaging_logs'),
+            reason_column(processed_data['returns'])
+        )
+        analysis_results['root_causes'] = root_causes
+        analysis_results['precomputed_recommendations'] = rule_recommendations
+        scheduler.record(root_causes, 'root_cause+recommendations', LLMScheduler.TIER_RULES)
+        logger.info(f"✓ Generated root cause analysis for {len(root_causes)} products")
+        return analysis_results
+
+    if not include_root_causes:
+        return analysis_results
+
+    if 'product_patterns' in analysis_results and AI_CONFIG.get('fused_mode', False):
+        logger.info("Fused mode: generating root causes and recommendations in one call per product")
+        risk_lookup = {}
+        if 'risk_scores' in analysis_results:
+            risk_lookup = analysis_results['risk_scores'].set_index('product').to_dict('index')
+        products = {
+            product_name: {
+                'reasons_data': pattern_data,
+                'return_rate': risk_lookup.get(product_name, {}).get('return_rate_percentage', 0),
+                'risk_score': risk_lookup.get(product_name, {}).get('risk_score', 0)
+            }
+            for product_name, pattern_data in analysis_results['product_patterns'].items()
+        }
+        fused_analyzer = FusedAnalyzer(root_cause_analyzer=root_cause_analyzer)
+
+        def fused_llm(chunk, budget):
+            chunk_causes, chunk_recommendations = fused_analyzer.batch_analyze(chunk, budget)
+            return {name: (chunk_causes[name], chunk_recommendations[name]) for name in chunk}
+
+        def fused_fallback(product_name, data):
+            analysis = root_cause_analyzer._fallback_analysis(data['reasons_data'], product_name)
+            return analysis, fused_analyzer.recommendation_engine._fallback_recommendations(analysis, product_name)
+
+        fused = scheduler.run(
+            'root_cause+recommendations', products,
+            fused_llm,
+            fused_fallback,
+            risk_df=risk_df,
+            llm_available=fused_analyzer.client is not None
+        )
+        root_causes = {name: result[0] for name, result in fused.items()}
+        analysis_results['precomputed_recommendations'] = {name: result[1] for name, result in fused.items()}
+    elif 'product_patterns' in analysis_results:
+        root_causes = scheduler.run(
+            'root_cause', analysis_results['product_patterns'],
+            root_cause_analyzer.batch_analyze,
+            lambda product_name, pattern_data: root_cause_analyzer._fallback_analysis(pattern_data, product_name),
+            risk_df=risk_df,
+            chunk_size=root_cause_analyzer.batch_size,
+            llm_available=root_cause_analyzer.client is not None
+        )
 
     analysis_results['root_causes'] = root_causes
     logger.info(f"✓ Generated root cause analysis for {len(root_causes)} products")
     return analysis_results
 
 
-def generate_recommendations(analysis_results):
+def generate_recommendations(analysis_results, scheduler=None):
     logger.info("=" * 60)
     logger.info("STEP 4: RECOMMENDATION GENERATION")
     logger.info("=" * 60)
 
+    scheduler = scheduler or LLMScheduler()
+
+    if 'precomputed_recommendations' in analysis_results:
+        recommendations = analysis_results['precomputed_recommendations']
+        analysis_results['llm_coverage'] = scheduler.summary()
+        logger.info(f"✓ Using recommendations generated during analysis for {len(recommendations)} products")
+        return recommendations
+
     recommendation_engine = RecommendationEngine()
     logger.info("Generating recommendations...")
     recommendations = {}
@@ -198,23 +390,48 @@ def generate_recommendations(analysis_results):
         risk_df = analysis_results['risk_scores']
         root_causes_dict = analysis_results['root_causes']
 
-        for _, row in risk_df.iterrows():
-            product_name = row['product']
-            root_cause = root_causes_dict.get(product_name, '')
-            rec = recommendation_engine.generate_recommendations(
-                root_cause,
-                product_name,
-                row['return_rate_percentage'],
-                row['risk_score']
-            )
-            recommendations[product_name] = rec
-            logger.info(f"  ✓ Generated recommendations for {product_name}")
-
+        products = {
+            row['product']: {
+                'root_causes': root_causes_dict.get(row['product'], ''),
+                'return_rate': row['return_rate_percentage'],
+                'risk_score': row['risk_score'],
+                'risk_level': row['risk_level']
+            }
+            for _, row in risk_df.iterrows()
+        }
+        recommendations = scheduler.run(
+            'recommendations', products,
+            recommendation_engine.batch_generate_recommendations,
+            lambda product_name, data: recommendation_engine._fallback_recommendations(data['root_causes'], product_name),
+            risk_df=risk_df,
+            chunk_size=recommendation_engine.batch_size,
+            llm_available=recommendation_engine.client is not None
+        )
+
+    analysis_results['llm_coverage'] = scheduler.summary()
     logger.info(f"✓ Generated recommendations for {len(recommendations)} products")
     return recommendations
 
 
-def generate_report(processed_data, analysis_results, recommendations):
+def run_pipelined_analysis(analysis_results, scheduler=None):
+    logger.info("=" * 60)
+    logger.info("STEP 3-4: PIPELINED ROOT CAUSE ANALYSIS + RECOMMENDATIONS")
+    logger.info("=" * 60)
+
+    scheduler = scheduler or LLMScheduler()
+    executor = PipelinedExecutor(scheduler=scheduler)
+    root_causes, recommendations, action_items = executor.run(
+        analysis_results.get('product_patterns', {}),
+        analysis_results.get('risk_scores')
+    )
+
+    analysis_results['root_causes'] = root_causes
+    analysis_results['llm_coverage'] = scheduler.summary()
+    logger.info(f"✓ Generated root causes and recommendations for {len(recommendations)} products")
+    return recommendations, action_items
+
+
+def generate_report(processed_data, analysis_results, recommendations, action_items=None):
     logger.info("=" * 60)
     logger.info("STEP 5: REPORT GENERATION")
     logger.info("=" * 60)
@@ -234,36 +451,72 @@ def generate_report(processed_data, analysis_results, recommendations):
     if 'returns' in processed_data:
         returns_df = processed_data['returns']
         if 'return_reason' in returns_df.columns:
-            top_issues = returns_df['return_reason'].value_counts().head(10)
+            reason_col = reason_column(returns_df)
+            top_issues_count = REPORTING_CONFIG.get('top_issues_count', 10)
+            sketch = analysis_results.get('reason_sketch')
+            if sketch is not None:
+                # All-time top issues from the summary carried across runs
+                top_issues = [(item, count) for item, count, _ in sketch.top_k(top_issues_count)]
+                issues_total = sketch.total()
+            else:
+                top_issues = list(returns_df[reason_col].value_counts(sort=False).nlargest(top_issues_count).items())
+                issues_total = len(returns_df)
+            categories = {}
+            if 'return_category' in returns_df.columns:
+                categories = returns_df.drop_duplicates(reason_col).set_index(reason_col)['return_category'].to_dict()
             issues_list = [
                 {
                     'reason': reason,
                     'count': int(count),
-                    'percentage': round((count / len(returns_df)) * 100, 2),
-                    'category': returns_df[returns_df['return_reason'] == reason]['return_category'].iloc[0]
-                    if 'return_category' in returns_df.columns else 'Unknown'
+                    'percentage': round((count / issues_total) * 100, 2),
+                    'category': categories.get(reason, 'Unknown')
                 }
-                for reason, count in top_issues.items()
+                for reason, count in top_issues
             ]
             report_data['top_issues'] = issues_list
 
     if 'risk_scores' in analysis_results:
-        at_risk = analysis_results['risk_scores'][
-            analysis_results['risk_scores']['risk_level'] == 'HIGH'
-        ].head(10)
+        at_risk = RiskPredictor().identify_at_risk_products(
+            analysis_results['risk_scores'], 'HIGH', top_n=REPORTING_CONFIG.get('top_products_count', 10)
+        )
         report_data['at_risk_products'] = at_risk.to_dict('records')
+        similar_products = analysis_results.get('similar_products', {})
+        for product in report_data['at_risk_products']:
+            product['similar_products'] = similar_products.get(product['product'], [])
 
     report_data['root_causes'] = analysis_results.get('root_causes', {})
     report_data['recommendations'] = recommendations
-
-    action_items = []
-    recommendation_engine = RecommendationEngine()
-    for product_name, rec in recommendations.items():
-        actions = recommendation_engine.generate_action_plan(rec, 'HIGH')
-        action_items.extend(actions)
+    if 'product_features' in analysis_results:
+        product_features = analysis_results['product_features']
+        report_data['product_features'] = product_features.astype(object).where(product_features.notna(), None).to_dict('records')
+        report_data['source_correlations'] = analysis_results.get('source_correlations', {})
+    if analysis_results.get('return_spikes', {}).get('events'):
+        report_data['return_spikes'] = analysis_results['return_spikes']
+    if 'llm_coverage' in analysis_results:
+        report_data['llm_coverage'] = analysis_results['llm_coverage']
+    model_routes = ModelRouter.shared().summary()
+    if model_routes:
+        report_data['model_routes'] = model_routes
+
+    if action_items is None:
+        action_items = []
+        for product_name, rec in recommendations.items():
+            actions = RecommendationEngine.generate_action_plan(rec, 'HIGH')
+            action_items.extend(actions)
 
     report_data['action_items'] = action_items
 
+    if (REPORTING_CONFIG.get("results_store") or {}).get("enabled", False):
+        results_store = ResultsStore()
+        results_store.record_run(analysis_results, total_returns=len(processed_data.get('returns', [])))
+        risk_changes = results_store.risk_changes().dropna(subset=['risk_score_change'])
+        if not risk_changes.empty:
+            movers = select_top_n(
+                risk_changes.assign(abs_change=risk_changes['risk_score_change'].abs()),
+                'abs_change', REPORTING_CONFIG.get('top_products_count', 10)
+            ).drop(columns='abs_change')
+            report_data['risk_changes'] = movers.to_dict('records')
+
     logger.info("Saving report...")
     report_generator.save_report_data(report_data)
     logger.info(f"✓ Report saved to {REPORTS_DIR}")
@@ -288,9 +541,18 @@ def main():
             return
 
         processed_data = process_data(data_sources)
-        analysis_results = analyze_data(processed_data)
-        recommendations = generate_recommendations(analysis_results)
-        report_data = generate_report(processed_data, analysis_results, recommendations)
+        scheduler = LLMScheduler()
+        pipelined = (
+            AI_CONFIG.get('execution_mode', 'staged') == 'pipelined'
+            and not AI_CONFIG.get('fused_mode', False)
+        )
+        analysis_results = analyze_data(processed_data, scheduler, include_root_causes=not pipelined)
+        if pipelined and 'precomputed_recommendations' not in analysis_results:
+            recommendations, action_items = run_pipelined_analysis(analysis_results, scheduler)
+        else:
+            recommendations = generate_recommendations(analysis_results, scheduler)
+            action_items = None
+        report_data = generate_report(processed_data, analysis_results, recommendations, action_items)
 
         logger.info("\n")
         logger.info("#" * 60)
@@ -304,6 +566,8 @@ def main():
         import traceback
         logger.error(traceback.format_exc())
         sys.exit(1)
+    finally:
+        ParallelExecutor.shutdown_shared()
 
 
 if __name__ == "__main__":
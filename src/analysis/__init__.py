@@ -1,11 +1,26 @@
 """Analysis module"""
 
+from .model_router import ModelRouter
+from .ollama_client import OllamaClient
 from .root_cause_analyzer import RootCauseAnalyzer
-from .risk_predictor import RiskPredictor
+from .risk_predictor import RiskPredictor, RiskState
 from .recommendation_engine import RecommendationEngine
+from .fused_analyzer import FusedAnalyzer
+from .llm_scheduler import LLMScheduler
+from .pipeline_executor import PipelinedExecutor
+from .rule_engine import RuleBasedEngine
+from .similarity_index import SimilarityIndex
 
 __all__ = [
     'RootCauseAnalyzer',
     'RiskPredictor',
-    'RecommendationEngine'
+    'RecommendationEngine',
+    'FusedAnalyzer',
+    'LLMScheduler',
+    'PipelinedExecutor',
+    'ModelRouter',
+    'OllamaClient',
+    'RuleBasedEngine',
+    'RiskState',
+    'SimilarityIndex'
 ]
@@ -0,0 +1,101 @@
+
+import re
+from src.utils import logger
+from .root_cause_analyzer import RootCauseAnalyzer
+from .recommendation_engine import RecommendationEngine
+from .llm_scheduler import CallBudget
+
+class FusedAnalyzer:
+
+    RECOMMENDATIONS_MARKER = re.compile(r'^[\s#*]*RECOMMENDATIONS\b.*$', re.IGNORECASE | re.MULTILINE)
+    ROOT_CAUSE_MARKER = re.compile(r'^[\s#*]*ROOT CAUSE ANALYSIS\b[:*\s]*', re.IGNORECASE)
+
+    def __init__(self, root_cause_analyzer: RootCauseAnalyzer = None,
+                 recommendation_engine: RecommendationEngine = None):
+        self.root_cause_analyzer = root_cause_analyzer or RootCauseAnalyzer()
+        self.recommendation_engine = recommendation_engine or RecommendationEngine()
+        self.client = self.root_cause_analyzer.client
+
+    def analyze(self, reasons_data: dict, product_name: str,
+                return_rate: float, risk_score: float, budget: CallBudget = None) -> tuple:
+
+        if not self.client:
+            root_causes = self.root_cause_analyzer._fallback_analysis(reasons_data, product_name, budget)
+            return root_causes, self.recommendation_engine._fallback_recommendations(root_causes, product_name)
+
+        try:
+            formatted_data = self.root_cause_analyzer._format_for_llm(reasons_data, product_name)
+
+            prompt = f"""Analyze these product return data:
+
+{formatted_data}Return Rate: {return_rate}%
+Risk Score: {risk_score}/100
+
+Respond in exactly two parts.
+
+ROOT CAUSE ANALYSIS:
+1. Top 3-5 root causes (specific, pinpointed)
+2. Severity level for each cause (HIGH, MEDIUM, LOW)
+3. Estimated frequency/impact
+4. Affected customer segments if identifiable
+
+RECOMMENDATIONS:
+Specific, actionable recommendations addressing those root causes, in these categories:
+1. DESIGN ACTIONS - Changes to product design
+2. MATERIALS ACTIONS - Material or component improvements
+3. SIZING ACTIONS - Size/fit adjustments
+4. PACKAGING ACTIONS - Packaging improvements
+5. QC ACTIONS - Quality control improvements
+
+Format recommendations as a bulleted list. Be specific and measurable. Avoid generic statements."""
+
+            text = self.root_cause_analyzer.ollama.generate(prompt, risk_level=reasons_data.get('risk_level'), budget=budget)
+            if text is None:
+                root_causes = self.root_cause_analyzer._fallback_analysis(reasons_data, product_name, budget)
+                return root_causes, self.recommendation_engine._fallback_recommendations(root_causes, product_name)
+
+            root_causes, recommendations = self._split_response(text, product_name)
+            if not any(recommendations[c] for c in recommendations if c != 'product'):
+                logger.warning(f"Fused reply for {product_name} had no recommendations, requesting separately")
+                recommendations = self.recommendation_engine.generate_recommendations(
+                    root_causes, product_name, return_rate, risk_score, reasons_data.get('risk_level'), budget
+                )
+
+            logger.info(f"Generated fused analysis for {product_name}")
+            return root_causes, recommendations
+
+        except Exception as e:
+            logger.error(f"Error in fused LLM analysis: {str(e)}")
+            root_causes = self.root_cause_analyzer._fallback_analysis(reasons_data, product_name, budget)
+            return root_causes, self.recommendation_engine._fallback_recommendations(root_causes, product_name)
+
+    def _split_response(self, text: str, product_name: str) -> tuple:
+
+        match = self.RECOMMENDATIONS_MARKER.search(text)
+        if match:
+            analysis_text = text[:match.start()]
+            recommendations_text = text[match.end():]
+        else:
+            analysis_text = text
+            recommendations_text = ''
+
+        root_causes = self.ROOT_CAUSE_MARKER.sub('', analysis_text.strip(), count=1).strip()
+        recommendations = self.recommendation_engine._parse_recommendations(recommendations_text, product_name)
+        return root_causes, recommendations
+
+    def batch_analyze(self, products: dict, budget: CallBudget = None) -> tuple:
+
+        root_causes = {}
+        recommendations = {}
+
+        for product_name, data in products.items():
+            root_causes[product_name], recommendations[product_name] = self.analyze(
+                data.get('reasons_data', {}),
+                product_name,
+                data.get('return_rate', 0),
+                data.get('risk_score', 0),
+                budget
+            )
+
+        logger.info(f"Fused analysis generated for {len(root_causes)} products")
+        return root_causes, recommendations
@@ -0,0 +1,141 @@
+
+import time
+import threading
+import pandas as pd
+from src.utils import logger
+from src.config import AI_CONFIG
+
+class CallBudget:
+    """
+    One scheduled LLM call: caps each request's timeout at the time left in the scheduler's
+    budget and collects the products inside the call that got the deterministic fallback
+    """
+
+    def __init__(self, scheduler: "LLMScheduler"):
+        self.scheduler = scheduler
+        self.fallbacks = {}
+        self._lock = threading.Lock()
+
+    def timeout(self, seconds: float) -> float:
+        return min(seconds, self.scheduler.time_remaining())
+
+    def fallback(self, product_name) -> None:
+        tier = self.scheduler.TIER_DEADLINE if self.scheduler.expired() else self.scheduler.TIER_FALLBACK
+        with self._lock:
+            self.fallbacks[product_name] = tier
+
+
+class LLMScheduler:
+
+    TIER_LLM = "llm"
+    TIER_FALLBACK = "fallback"
+    TIER_DEADLINE = "deadline_fallback"
+    TIER_RULES = "rules"
+
+    def __init__(self, time_budget_seconds: float = None):
+        if time_budget_seconds is None:
+            time_budget_seconds = AI_CONFIG.get("time_budget_seconds", 0)
+        self.time_budget_seconds = float(time_budget_seconds or 0)
+        self.started_at = None
+        self.deadline = None
+        self.coverage = {}
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        """Start the wall-clock budget; a budget of 0 means unlimited"""
+        self.started_at = time.monotonic()
+        if self.time_budget_seconds > 0:
+            self.deadline = self.started_at + self.time_budget_seconds
+            logger.info(f"LLM time budget: {self.time_budget_seconds:g}s")
+
+    def expired(self) -> bool:
+        return self.deadline is not None and time.monotonic() >= self.deadline
+
+    def time_remaining(self) -> float:
+        if self.deadline is None:
+            return float('inf')
+        return max(0.0, self.deadline - time.monotonic())
+
+    def next_tier(self, llm_available: bool = True) -> str:
+        """Tier the next unit of work should run at, given LLM availability and the deadline"""
+        if not llm_available:
+            return self.TIER_FALLBACK
+        return self.TIER_DEADLINE if self.expired() else self.TIER_LLM
+
+    def budget(self) -> CallBudget:
+        return CallBudget(self)
+
+    def record(self, product_names, stage: str, tier: str, budget: CallBudget = None) -> None:
+        """Record the tier each product got for stage; products the call fell back on keep their fallback tier"""
+        fallbacks = budget.fallbacks if budget is not None else {}
+        with self._lock:
+            for name in product_names:
+                self.coverage.setdefault(name, {})[stage] = fallbacks.get(name, tier)
+
+    def prioritize(self, product_names, risk_df: pd.DataFrame = None) -> list:
+        """Order products by descending risk_score; products without a score go last"""
+
+        product_names = list(product_names)
+        if risk_df is None or risk_df.empty or 'risk_score' not in risk_df.columns:
+            return product_names
+
+        scores = risk_df.set_index('product')['risk_score']
+        scores = scores[~scores.index.duplicated(keep='first')]
+        ranked = scores.reindex(product_names).fillna(-1)
+        order = ranked.sort_values(ascending=False, kind='stable').index
+        return list(order)
+
+    def run(self, stage: str, items: dict, llm_fn, fallback_fn,
+            risk_df: pd.DataFrame = None, chunk_size: int = 1, llm_available: bool = True) -> dict:
+        """
+        Run llm_fn over items in risk order until the deadline, then fallback_fn for the rest.
+        llm_fn takes a {product: item} chunk and a CallBudget and returns {product: result},
+        capping request timeouts with the budget and reporting products it fell back on;
+        fallback_fn takes (product, item) and returns a single result.
+        """
+
+        if self.started_at is None:
+            self.start()
+
+        ordered = self.prioritize(items.keys(), risk_df)
+        chunk_size = max(1, int(chunk_size))
+        results = {}
+
+        for i in range(0, len(ordered), chunk_size):
+            chunk_names = ordered[i:i + chunk_size]
+
+            tier = self.next_tier(llm_available)
+            budget = None
+            if tier == self.TIER_LLM:
+                chunk = {name: items[name] for name in chunk_names}
+                budget = self.budget()
+                results.update(llm_fn(chunk, budget))
+            else:
+                for name in chunk_names:
+                    results[name] = fallback_fn(name, items[name])
+
+            self.record(chunk_names, stage, tier, budget)
+
+        skipped = sum(1 for name in ordered if self.coverage[name][stage] == self.TIER_DEADLINE)
+        if skipped:
+            logger.warning(f"LLM time budget exhausted: {skipped}/{len(ordered)} products used fallback for {stage}")
+
+        return {name: results[name] for name in items}
+
+    def summary(self) -> dict:
+
+        tiers = {}
+        with self._lock:
+            coverage = {name: dict(stages) for name, stages in self.coverage.items()}
+        for stages in coverage.values():
+            for stage, tier in stages.items():
+                tiers.setdefault(stage, {}).setdefault(tier, 0)
+                tiers[stage][tier] += 1
+
+        elapsed = time.monotonic() - self.started_at if self.started_at is not None else 0.0
+        return {
+            'time_budget_seconds': self.time_budget_seconds,
+            'elapsed_seconds': round(elapsed, 2),
+            'tiers': tiers,
+            'products': coverage
+        }
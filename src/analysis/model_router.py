@@ -0,0 +1,124 @@
+
+import threading
+import time
+from contextlib import contextmanager
+import numpy as np
+from src.utils import logger
+from src.config import AI_CONFIG
+from .llm_scheduler import CallBudget
+
+class ModelRoute:
+
+    def __init__(self, name: str, model: str, max_concurrency: int, timeout: float):
+        self.name = name
+        self.model = model
+        self.max_concurrency = max(1, int(max_concurrency))
+        self.timeout = float(timeout)
+        self.semaphore = threading.BoundedSemaphore(self.max_concurrency)
+        self.latencies = []
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def mark_error(self) -> None:
+        with self._lock:
+            self.errors += 1
+
+    def summary(self) -> dict:
+        with self._lock:
+            latencies_ms = np.array(self.latencies) * 1000
+            errors = self.errors
+        stats = {
+            'model': self.model,
+            'max_concurrency': self.max_concurrency,
+            'timeout': self.timeout,
+            'requests': int(len(latencies_ms)),
+            'errors': errors
+        }
+        if len(latencies_ms):
+            stats.update({
+                'mean_ms': round(float(latencies_ms.mean()), 1),
+                'p50_ms': round(float(np.percentile(latencies_ms, 50)), 1),
+                'p99_ms': round(float(np.percentile(latencies_ms, 99)), 1)
+            })
+        return stats
+
+
+class ModelRouter:
+
+    DEFAULT_ROUTE = "DEFAULT"
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, routes: dict = None, default_model: str = None,
+                 default_timeout: float = None, default_concurrency: int = None):
+        self.default_model = default_model or AI_CONFIG.get("model", "mistral")
+        default_timeout = default_timeout or AI_CONFIG.get("api_timeout", 60)
+        default_concurrency = default_concurrency or AI_CONFIG.get("max_workers", 4)
+
+        self.routes = {
+            self.DEFAULT_ROUTE: ModelRoute(self.DEFAULT_ROUTE, self.default_model, default_concurrency, default_timeout)
+        }
+        for level, spec in (routes if routes is not None else AI_CONFIG.get("model_routes") or {}).items():
+            spec = spec or {}
+            self.routes[str(level).upper()] = ModelRoute(
+                str(level).upper(),
+                spec.get("model", self.default_model),
+                spec.get("max_concurrency", default_concurrency),
+                spec.get("timeout", default_timeout)
+            )
+
+    @classmethod
+    def shared(cls) -> "ModelRouter":
+        """Process-wide router so both engines share per-route concurrency limits"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def route_for(self, risk_level: str = None) -> ModelRoute:
+        if risk_level:
+            route = self.routes.get(str(risk_level).upper())
+            if route is not None:
+                return route
+        return self.routes[self.DEFAULT_ROUTE]
+
+    def check_available(self, available_models: list) -> None:
+        """Point routes whose model is not pulled back at the default model"""
+
+        available = {name.split(":")[0] for name in available_models} | set(available_models)
+        for route in self.routes.values():
+            if route.model not in available and route.model.split(":")[0] not in available:
+                logger.warning(f"Route {route.name}: model '{route.model}' not found, using '{self.default_model}'")
+                route.model = self.default_model
+
+    @contextmanager
+    def acquire(self, risk_level: str = None, budget: CallBudget = None):
+        """
+        Hold a concurrency slot on the route for risk_level and record the request latency.
+        Yields None, recording nothing, when budget ran out while waiting for the slot.
+        """
+
+        route = self.route_for(risk_level)
+        with route.semaphore:
+            if budget is not None and budget.timeout(route.timeout) <= 0:
+                yield None
+                return
+            start = time.perf_counter()
+            try:
+                yield route
+            except Exception:
+                route.mark_error()
+                raise
+            finally:
+                route.record(time.perf_counter() - start)
+
+    def summary(self) -> dict:
+        return {
+            name: route.summary()
+            for name, route in self.routes.items()
+            if route.latencies or name != self.DEFAULT_ROUTE
+        }
@@ -0,0 +1,118 @@
+import requests
+from src.utils import logger, extract_json_object
+from src.config import AI_CONFIG
+from .model_router import ModelRouter
+from .llm_scheduler import CallBudget
+
+class OllamaClient:
+    """
+    Ollama access shared by the LLM analyzers: the availability check, single prompts sent on
+    the model route for a risk level, and keyed-JSON batches where each product's answer sits
+    under its own key and products missing from the reply are retried one by one.
+    """
+
+    def __init__(self, router: ModelRouter = None):
+        self.router = router or ModelRouter.shared()
+        self.base_url = AI_CONFIG.get("ollama_base_url", "http://localhost:11434")
+        self.model = AI_CONFIG.get("model", "mistral")
+        self.temperature = AI_CONFIG.get("temperature", 0.7)
+        self.max_tokens = int(AI_CONFIG.get("max_tokens", 2000))
+
+    def connect(self) -> bool:
+        """Check that Ollama is up and serves the configured model"""
+
+        try:
+            response = requests.get(f"{self.base_url}/api/tags", timeout=2)
+            if response.status_code != 200:
+                raise Exception("Ollama not responding")
+
+            models = response.json().get("models", [])
+            model_names = [m.get("name", "").split(":")[0] for m in models]
+
+            if any(self.model in name for name in model_names):
+                self.router.check_available([m.get("name", "") for m in models])
+                logger.info(f"Connected to Ollama at {self.base_url}")
+                return True
+
+            available = ", ".join(model_names) if model_names else "none"
+            logger.warning(f"Model '{self.model}' not found. Available: {available}")
+            logger.warning(f"Run: ollama pull {self.model}")
+        except Exception as e:
+            logger.warning(f"Ollama not available: {str(e)}")
+        return False
+
+    def generate(self, prompt: str, json_mode: bool = False, scale: int = 1,
+                 risk_level: str = None, budget: CallBudget = None) -> str:
+        """
+        Send a prompt to Ollama on the model route for risk_level and return the response text,
+        or None on HTTP error. scale multiplies the generation limit and timeout for batched prompts;
+        budget caps the timeout at the scheduler's time left, and None is returned once it is spent.
+        """
+
+        if budget is not None and budget.timeout(float('inf')) <= 0:
+            logger.warning("LLM time budget exhausted, skipping request")
+            return None
+
+        with self.router.acquire(risk_level, budget) as route:
+            if route is None:
+                logger.warning("LLM time budget ran out while waiting for a model slot, skipping request")
+                return None
+            timeout = route.timeout * scale
+            if budget is not None:
+                timeout = budget.timeout(timeout)
+
+            payload = {
+                "model": route.model,
+                "prompt": prompt,
+                "stream": False,
+                "options": {
+                    "temperature": self.temperature,
+                    "num_predict": self.max_tokens * scale
+                }
+            }
+            if json_mode:
+                payload["format"] = "json"
+
+            response = requests.post(
+                f"{self.base_url}/api/generate",
+                json=payload,
+                timeout=timeout
+            )
+
+            if response.status_code == 200:
+                return response.json().get("response", "")
+            route.mark_error()
+
+        logger.error(f"Ollama error: {response.status_code}")
+        return None
+
+    def generate_keyed(self, items: dict, build_prompt, parse_value, retry, risk_level: str = None,
+                       budget: CallBudget = None) -> dict:
+        """
+        Answer several items with one keyed-JSON prompt.
+        build_prompt(keys) gets {"P1": name, ...} and returns the prompt; parse_value(value, name)
+        turns one keyed value into a result, or None if unusable; retry(name) produces the result
+        for an item the reply did not cover. Returns results in the order of items.
+        """
+
+        keys = {f"P{i}": name for i, name in enumerate(items, 1)}
+        results = {}
+
+        try:
+            reply = extract_json_object(
+                self.generate(build_prompt(keys), json_mode=True, scale=len(keys), risk_level=risk_level, budget=budget)
+            )
+            for key, name in keys.items():
+                parsed = parse_value(reply.get(key), name)
+                if parsed is not None:
+                    results[name] = parsed
+        except Exception as e:
+            logger.error(f"Error in batched LLM request: {str(e)}")
+
+        missing = [name for name in keys.values() if name not in results]
+        if missing:
+            logger.warning(f"Batched reply missing {len(missing)}/{len(keys)} products, retrying individually")
+        for name in missing:
+            results[name] = retry(name)
+
+        return {name: results[name] for name in items}
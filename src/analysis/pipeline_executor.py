@@ -0,0 +1,122 @@
+
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import pandas as pd
+from src.utils import logger
+from src.config import AI_CONFIG
+from .root_cause_analyzer import RootCauseAnalyzer
+from .recommendation_engine import RecommendationEngine
+from .llm_scheduler import LLMScheduler
+
+class PipelinedExecutor:
+
+    STAGE_ROOT_CAUSE = "root_cause"
+    STAGE_RECOMMENDATIONS = "recommendations"
+
+    def __init__(self, root_cause_analyzer: RootCauseAnalyzer = None,
+                 recommendation_engine: RecommendationEngine = None,
+                 scheduler: LLMScheduler = None, max_workers: int = None):
+        self.root_cause_analyzer = root_cause_analyzer or RootCauseAnalyzer()
+        self.recommendation_engine = recommendation_engine or RecommendationEngine()
+        self.scheduler = scheduler or LLMScheduler()
+        self.max_workers = max(1, int(max_workers or AI_CONFIG.get("max_workers", 4)))
+
+    def run(self, product_patterns: dict, risk_df: pd.DataFrame = None) -> tuple:
+        """
+        Stream products through root cause -> recommendations -> action plan.
+        A product's recommendation request is queued as soon as its root cause lands, so both
+        LLM stages overlap instead of running behind a barrier. At most max_workers requests
+        are in flight; whenever a slot frees, ready recommendations are sent before the next
+        root-cause chunk, so they never wait behind the whole root-cause backlog.
+        """
+
+        if self.scheduler.started_at is None:
+            self.scheduler.start()
+
+        risk_lookup = {}
+        if risk_df is not None and not risk_df.empty:
+            risk_lookup = risk_df.drop_duplicates('product').set_index('product').to_dict('index')
+
+        ordered = self.scheduler.prioritize(product_patterns.keys(), risk_df)
+        chunk_size = self.root_cause_analyzer.batch_size
+        waiting_chunks = deque(ordered[i:i + chunk_size] for i in range(0, len(ordered), chunk_size))
+        ready_recommendations = deque()
+
+        root_causes = {}
+        recommendations = {}
+        action_items = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = {}
+
+            def fill_slots():
+                while len(pending) < self.max_workers and (ready_recommendations or waiting_chunks):
+                    if ready_recommendations:
+                        future = pool.submit(self._recommendation_task, ready_recommendations.popleft())
+                        pending[future] = self.STAGE_RECOMMENDATIONS
+                    else:
+                        chunk = waiting_chunks.popleft()
+                        future = pool.submit(self._root_cause_task, {name: product_patterns[name] for name in chunk})
+                        pending[future] = self.STAGE_ROOT_CAUSE
+
+            fill_slots()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = pending.pop(future)
+                    results = future.result()
+
+                    if stage == self.STAGE_ROOT_CAUSE:
+                        root_causes.update(results)
+                        ready_recommendations.append({
+                            name: {
+                                'root_causes': analysis,
+                                'return_rate': risk_lookup.get(name, {}).get('return_rate_percentage', 0),
+                                'risk_score': risk_lookup.get(name, {}).get('risk_score', 0),
+                                'risk_level': risk_lookup.get(name, {}).get('risk_level')
+                            }
+                            for name, analysis in results.items()
+                        })
+                    else:
+                        recommendations.update(results)
+                        for name, rec in results.items():
+                            action_items[name] = self.recommendation_engine.generate_action_plan(rec, 'HIGH')
+                fill_slots()
+
+        logger.info(f"Pipelined analysis complete for {len(recommendations)} products")
+        return (
+            {name: root_causes[name] for name in product_patterns},
+            {name: recommendations[name] for name in product_patterns},
+            [action for name in ordered for action in action_items[name]]
+        )
+
+    def _root_cause_task(self, chunk: dict) -> dict:
+
+        analyzer = self.root_cause_analyzer
+        tier = self.scheduler.next_tier(analyzer.client is not None)
+        budget = None
+        if tier == LLMScheduler.TIER_LLM:
+            budget = self.scheduler.budget()
+            results = analyzer.batch_analyze(chunk, budget)
+        else:
+            results = {name: analyzer._fallback_analysis(data, name) for name, data in chunk.items()}
+
+        self.scheduler.record(chunk, self.STAGE_ROOT_CAUSE, tier, budget)
+        return results
+
+    def _recommendation_task(self, products: dict) -> dict:
+
+        engine = self.recommendation_engine
+        tier = self.scheduler.next_tier(engine.client is not None)
+        budget = None
+        if tier == LLMScheduler.TIER_LLM:
+            budget = self.scheduler.budget()
+            results = engine.batch_generate_recommendations(products, budget)
+        else:
+            results = {
+                name: engine._fallback_recommendations(data['root_causes'], name)
+                for name, data in products.items()
+            }
+
+        self.scheduler.record(products, self.STAGE_RECOMMENDATIONS, tier, budget)
+        return results
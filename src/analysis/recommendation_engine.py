@@ -1,40 +1,25 @@
 
 import os
-import requests
-from src.utils import logger
+from src.utils import logger, truncate_to_tokens
 from src.config import AI_CONFIG
+from .model_router import ModelRouter
+from .ollama_client import OllamaClient
+from .llm_scheduler import CallBudget
 
 class RecommendationEngine:
     
-    def __init__(self):
-        try:
-            self.base_url = AI_CONFIG.get("ollama_base_url", "http://localhost:11434")
-            self.model = AI_CONFIG.get("model", "mistral")
-            
-            response = requests.get(f"{self.base_url}/api/tags", timeout=2)
-            if response.status_code == 200:
-                
-                models = response.json().get("models", [])
-                model_names = [m.get("name", "").split(":")[0] for m in models]
-                
-                if any(self.model in name for name in model_names):
-                    self.client = "ollama"
-                else:
-                    available = ", ".join(model_names) if model_names else "none"
-                    logger.warning(f"Model '{self.model}' not found. Available: {available}")
-                    logger.warning(f"Run: ollama pull {self.model}")
-                    self.client = None
-            else:
-                raise Exception("Ollama not responding")
-        except Exception as e:
-            logger.warning(f"Ollama not available: {str(e)}")
-            self.client = None
+    def __init__(self, router: ModelRouter = None):
+        self.ollama = OllamaClient(router)
+        self.batch_size = max(1, int(AI_CONFIG.get("batch_size", 1)))
+        self.max_input_tokens = int(AI_CONFIG.get("max_input_tokens", 1500))
+        self.client = "ollama" if self.ollama.connect() else None
     
     def generate_recommendations(self, root_causes: str, product_name: str, 
-                                return_rate: float, risk_score: float) -> dict:
+                                return_rate: float, risk_score: float, risk_level: str = None,
+                                budget: CallBudget = None) -> dict:
         
         if not self.client:
-            return self._fallback_recommendations(root_causes, product_name)
+            return self._fallback_recommendations(root_causes, product_name, budget)
         
         try:
             prompt = f"""Based on this return analysis for product '{product_name}':
@@ -42,7 +27,7 @@ Return Rate: {return_rate}%
 Risk Score: {risk_score}/100
 
 Root Causes:
-{root_causes}
+{truncate_to_tokens(root_causes, self.max_input_tokens)}
 
 Generate specific, actionable recommendations in these categories:
 1. DESIGN ACTIONS - Changes to product design
@@ -53,26 +38,82 @@ Generate specific, actionable recommendations in these categories:
 
 Format as a bulleted list. Be specific and measurable."""
             
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "temperature": 0.7
-                },
-                timeout=120
-            )
-            
-            if response.status_code == 200:
-                recommendations_text = response.json().get("response", "")
+            recommendations_text = self.ollama.generate(prompt, risk_level=risk_level, budget=budget)
+            if recommendations_text is not None:
                 return self._parse_recommendations(recommendations_text, product_name)
             else:
-                return self._fallback_recommendations(root_causes, product_name)
+                return self._fallback_recommendations(root_causes, product_name, budget)
         
         except Exception as e:
             logger.error(f"Error generating recommendations: {str(e)}")
-            return self._fallback_recommendations(root_causes, product_name)
+            return self._fallback_recommendations(root_causes, product_name, budget)
+    
+    def generate_recommendations_batch(self, products: dict, budget: CallBudget = None) -> dict:
+        """Recommend for several products with one keyed-JSON prompt; products missing from the reply are retried individually"""
+        
+        def build_prompt(keys: dict) -> str:
+            per_product_tokens = max(1, self.max_input_tokens // len(keys))
+            sections = "\n".join(
+                f"""[{key}] Product: {product_name}
+Return Rate: {products[product_name].get('return_rate', 0)}%
+Risk Score: {products[product_name].get('risk_score', 0)}/100
+Root Causes:
+{truncate_to_tokens(products[product_name].get('root_causes', ''), per_product_tokens)}
+"""
+                for key, product_name in keys.items()
+            )
+            
+            return f"""Based on the return analyses below, generate specific, actionable recommendations for each product.
+
+{sections}
+Respond ONLY with a JSON object keyed by product key ({", ".join(keys)}). Each value must be an object with these list-of-string fields:
+"design" - changes to product design
+"materials" - material or component improvements
+"sizing" - size/fit adjustments
+"packaging" - packaging improvements
+"qc" - quality control improvements
+
+Be specific and measurable."""
+        
+        def retry(product_name: str) -> dict:
+            analysis = products[product_name]
+            return self.generate_recommendations(
+                analysis.get('root_causes', ''),
+                product_name,
+                analysis.get('return_rate', 0),
+                analysis.get('risk_score', 0),
+                analysis.get('risk_level'),
+                budget
+            )
+        
+        return self.ollama.generate_keyed(
+            products,
+            build_prompt,
+            self._parse_json_recommendations,
+            retry,
+            risk_level=next(iter(products.values())).get('risk_level'),
+            budget=budget
+        )
+    
+    def _parse_json_recommendations(self, value, product_name: str) -> dict:
+        """One product's value from a keyed-JSON reply as a recommendations dict, or None if it has no actions to use"""
+        
+        if isinstance(value, str):
+            parsed = self._parse_recommendations(value, product_name)
+            return parsed if any(parsed[c] for c in parsed if c != 'product') else None
+        if not isinstance(value, dict):
+            return None
+        
+        recommendations = {'product': product_name}
+        for category in ['design', 'materials', 'sizing', 'packaging', 'qc']:
+            items = value.get(category, [])
+            if isinstance(items, str):
+                items = [items]
+            recommendations[category] = [str(item).strip().lstrip('-•* ') for item in items if str(item).strip()]
+        
+        if not any(recommendations[c] for c in recommendations if c != 'product'):
+            return None
+        return recommendations
     
     def _parse_recommendations(self, text: str, product_name: str) -> dict:
         
@@ -106,7 +147,10 @@ Format as a bulleted list. Be specific and measurable."""
         
         return recommendations
     
-    def _fallback_recommendations(self, root_causes: str, product_name: str) -> dict:
+    def _fallback_recommendations(self, root_causes: str, product_name: str, budget: CallBudget = None) -> dict:
+        
+        if budget is not None:
+            budget.fallback(product_name)
         
         recommendations = {
             'product': product_name,
@@ -119,9 +163,11 @@ Format as a bulleted list. Be specific and measurable."""
         
         return recommendations
     
-    def generate_action_plan(self, recommendations: dict, priority_level: str = "HIGH") -> list:
+    @staticmethod
+    def generate_action_plan(recommendations: dict, priority_level: str = "HIGH") -> list:
         
-        actions = []
+        # Bucketed by priority as they are generated, which keeps the order a stable sort would give
+        buckets = {'HIGH': [], 'MEDIUM': [], 'LOW': []}
         
         priority_mapping = {
             'design': 2,
@@ -136,30 +182,42 @@ Format as a bulleted list. Be specific and measurable."""
                 priority = priority_mapping.get(category, 2)
                 
                 for item in items:
-                    actions.append({
+                    priority_name = ['HIGH', 'MEDIUM', 'LOW'][priority - 1]
+                    buckets[priority_name].append({
                         'category': category,
                         'action': item,
-                        'priority': ['HIGH', 'MEDIUM', 'LOW'][priority - 1],
+                        'priority': priority_name,
                         'status': 'TO-DO'
                     })
         
-        priority_order = {'HIGH': 0, 'MEDIUM': 1, 'LOW': 2}
-        actions.sort(key=lambda x: priority_order[x['priority']])
+        actions = buckets['HIGH'] + buckets['MEDIUM'] + buckets['LOW']
         
         logger.info(f"Generated {len(actions)} action items")
         return actions
     
-    def batch_generate_recommendations(self, analysis_results: dict) -> dict:
+    def batch_generate_recommendations(self, analysis_results: dict, budget: CallBudget = None) -> dict:
         
         all_recommendations = {}
         
-        for product_name, analysis in analysis_results.items():
-            all_recommendations[product_name] = self.generate_recommendations(
-                analysis.get('root_causes', ''),
-                product_name,
-                analysis.get('return_rate', 0),
-                analysis.get('risk_score', 0)
-            )
+        if self.client and self.batch_size > 1:
+            by_level = {}
+            for name, analysis in analysis_results.items():
+                by_level.setdefault(analysis.get('risk_level'), []).append(name)
+            for product_names in by_level.values():
+                for i in range(0, len(product_names), self.batch_size):
+                    chunk = {name: analysis_results[name] for name in product_names[i:i + self.batch_size]}
+                    all_recommendations.update(self.generate_recommendations_batch(chunk, budget))
+            all_recommendations = {name: all_recommendations[name] for name in analysis_results}
+        else:
+            for product_name, analysis in analysis_results.items():
+                all_recommendations[product_name] = self.generate_recommendations(
+                    analysis.get('root_causes', ''),
+                    product_name,
+                    analysis.get('return_rate', 0),
+                    analysis.get('risk_score', 0),
+                    analysis.get('risk_level'),
+                    budget
+                )
         
         logger.info(f"Generated recommendations for {len(all_recommendations)} products")
         return all_recommendations
@@ -1,8 +1,139 @@
 
+import json
+from pathlib import Path
 import pandas as pd
 import numpy as np
-from src.utils import logger
-from src.config import RISK_CONFIG
+from src.utils import logger, parse_dates, select_top_n, pack_array, unpack_array, RowLedger
+from src.config import RISK_CONFIG, REPORTING_CONFIG, PROJECT_ROOT
+
+
+class RiskState:
+    """
+    Compact per-product return state carried between runs: daily return buckets inside
+    the lookback window, all-time totals and last-seen dates. Day buckets (rather than weeks)
+    keep the lookback cut-off exact, so scores match a full recompute. A RowLedger remembers
+    the folded rows, so feeding the same rows again never counts them twice.
+    Buckets are flat (product code, day, count) arrays, so an update costs O(new rows + buckets).
+    """
+    
+    DAY_OFFSET = np.int64(1 << 31)
+    row_keys = staticmethod(RowLedger.row_keys)
+    
+    def __init__(self, lookback_days: int):
+        self.lookback_days = int(lookback_days)
+        self.ledger = RowLedger(lookback_days)
+        self.products = pd.Index([], dtype=object)
+        self.totals = np.zeros(0, dtype=np.int64)
+        self.last_seen = np.zeros(0, dtype=np.int64)
+        self.bucket_product = np.zeros(0, dtype=np.int64)
+        self.bucket_day = np.zeros(0, dtype=np.int64)
+        self.bucket_count = np.zeros(0, dtype=np.int64)
+    
+    @property
+    def as_of_day(self):
+        return self.ledger.as_of_day
+    
+    def unseen(self, keys: np.ndarray) -> np.ndarray:
+        """Mask of row keys not folded yet"""
+        return self.ledger.unseen(keys)
+    
+    def _product_codes(self, products: np.ndarray) -> np.ndarray:
+        codes = self.products.get_indexer(products)
+        new = codes < 0
+        if new.any():
+            added = pd.Index(pd.unique(products[new]), dtype=object)
+            self.products = self.products.append(added)
+            self.totals = np.concatenate([self.totals, np.zeros(len(added), dtype=np.int64)])
+            self.last_seen = np.concatenate([self.last_seen, np.full(len(added), np.iinfo(np.int64).min)])
+            codes[new] = self.products.get_indexer(products[new])
+        return codes
+    
+    def update(self, products: pd.Series, dates: pd.Series, keys: np.ndarray) -> int:
+        """
+        Add the returns the ledger admits (unseen ones, including late rows still inside the
+        previous window) and evict days outside the lookback window.
+        """
+        
+        days = RowLedger.day_numbers(dates)
+        valid = ~np.isnan(days) & products.notna().to_numpy()
+        products = products.to_numpy(dtype=object)[valid]
+        days = days[valid].astype(np.int64)
+        
+        admitted = self.ledger.admit(keys[valid], days)
+        products, days = products[admitted], days[admitted]
+        
+        if len(days):
+            codes = self._product_codes(products)
+            self.totals += np.bincount(codes, minlength=len(self.products))
+            np.maximum.at(self.last_seen, codes, days)
+            
+            packed = np.concatenate([self.bucket_product, codes]) << 32 | (
+                np.concatenate([self.bucket_day, days]) + self.DAY_OFFSET
+            )
+            weights = np.concatenate([self.bucket_count, np.ones(len(days), dtype=np.int64)])
+            packed, inverse = np.unique(packed, return_inverse=True)
+            self.bucket_count = np.bincount(inverse, weights=weights).astype(np.int64)
+            self.bucket_product = packed >> 32
+            self.bucket_day = (packed & np.int64(0xFFFFFFFF)) - self.DAY_OFFSET
+        
+        self.evict()
+        return int(len(days))
+    
+    def evict(self) -> None:
+        if self.as_of_day is None:
+            return
+        keep = self.as_of_day - self.bucket_day < self.lookback_days
+        self.bucket_product, self.bucket_day, self.bucket_count = (
+            self.bucket_product[keep], self.bucket_day[keep], self.bucket_count[keep]
+        )
+    
+    def window_counts(self) -> pd.Series:
+        """Returns per product inside the lookback window, sorted by product"""
+        
+        counts = np.bincount(self.bucket_product, weights=self.bucket_count, minlength=len(self.products))
+        present = np.flatnonzero(counts > 0)
+        return pd.Series(counts[present].astype(np.int64), index=self.products[present]).sort_index()
+    
+    def to_dict(self) -> dict:
+        """JSON-ready form; days are counted from 1970-01-01 and numeric arrays are packed as base64"""
+        return {
+            'lookback_days': self.lookback_days,
+            'products': {
+                'product': self.products.tolist(),
+                'total': pack_array(self.totals),
+                'last_seen': pack_array(self.last_seen)
+            },
+            'buckets': {
+                'product': pack_array(self.bucket_product),
+                'day': pack_array(self.bucket_day),
+                'count': pack_array(self.bucket_count)
+            },
+            'seen': self.ledger.to_dict()
+        }
+    
+    @classmethod
+    def from_dict(cls, data: dict, lookback_days: int) -> "RiskState":
+        state = cls(lookback_days)
+        if not data:
+            return state
+        if int(data.get('lookback_days', 0)) < state.lookback_days or 'seen' not in data:
+            # A longer lookback needs history the saved state has already evicted, and a
+            # state without row keys cannot tell which rows it already holds
+            logger.warning("Saved risk state does not cover the current lookback; starting from scratch")
+            return state
+        
+        state.ledger = RowLedger.from_dict(data['seen'], state.lookback_days)
+        products = data['products']
+        state.products = pd.Index(products['product'], dtype=object)
+        state.totals = unpack_array(products['total'], np.int64)
+        state.last_seen = unpack_array(products['last_seen'], np.int64)
+        buckets = data['buckets']
+        state.bucket_product = unpack_array(buckets['product'], np.int64)
+        state.bucket_day = unpack_array(buckets['day'], np.int64)
+        state.bucket_count = unpack_array(buckets['count'], np.int64)
+        state.evict()
+        return state
+
 
 class RiskPredictor:
   
@@ -10,37 +141,150 @@ class RiskPredictor:
         self.high_threshold = RISK_CONFIG["high_threshold"]
         self.medium_threshold = RISK_CONFIG["medium_threshold"]
         self.lookback_days = RISK_CONFIG["lookback_days"]
+        self.windows = RISK_CONFIG.get("windows", [7, 30, 90])
+        self.state_path = PROJECT_ROOT / RISK_CONFIG.get("state_file", "data/processed/risk_state.json")
+        self.state = None
     
     def calculate_risk_score(self, df: pd.DataFrame, product_col: str, 
-                            date_col: str = None, category_col: str = None) -> pd.DataFrame:
-   
+                            date_col: str = None, category_col: str = None,
+                            metrics: pd.DataFrame = None) -> pd.DataFrame:
+        """
+        Score products on return share and frequency; with date_col, only the last lookback_days count.
+        Rows come back in product order; use top_risk_products for a ranked selection.
+        Without date_col, return counts are read from a precomputed Aggregator.product_metrics table when given.
+        """
         
-        df_copy = df.copy()
+        if date_col and date_col in df.columns:
+            dates = parse_dates(df[date_col])
+            age_days = self._age_in_days(dates, dates.max())
+            df = df[(age_days >= 0) & (age_days < self.lookback_days)]
+            metrics = None
         
-       
-        product_returns = df_copy.groupby(product_col).size()
-        total_returns = len(df_copy)
+        if metrics is not None:
+            product_returns = metrics['return_count'].sort_index()
+        else:
+            product_returns = df.groupby(product_col).size()
+        results = self._score_counts(product_returns.index, product_returns.to_numpy())
         
-        return_rates = (product_returns / total_returns * 100).round(2)
+        logger.info(f"Calculated risk scores for {len(results)} products")
+        return results
+    
+    def load_state(self, path=None) -> RiskState:
         
-        results = pd.DataFrame({
-            'product': return_rates.index,
-            'return_count': product_returns.values,
-            'return_rate_percentage': return_rates.values
+        path = Path(path or self.state_path)
+        data = None
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        
+        self.state = RiskState.from_dict(data, self.lookback_days)
+        logger.info(f"Loaded risk state for {len(self.state.totals)} products from {path}")
+        return self.state
+    
+    def save_state(self, path=None) -> None:
+        
+        path = Path(path or self.state_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(self.state.to_dict()))
+        tmp_path.replace(path)
+        
+        logger.info(f"Saved risk state to {path}")
+    
+    def update_risk_score(self, new_df: pd.DataFrame, product_col: str, date_col: str,
+                          keys: np.ndarray = None) -> pd.DataFrame:
+        """
+        Fold new returns into the carried risk state and score from it.
+        keys are the RiskState.row_keys of new_df's rows (computed when omitted); rows already
+        folded by an earlier run are skipped, so the scores match
+        calculate_risk_score(all_rows_so_far, product_col, date_col).
+        """
+        
+        if self.state is None:
+            self.state = RiskState(self.lookback_days)
+        if keys is None:
+            keys = RiskState.row_keys(new_df, product_col, date_col)
+        
+        folded = self.state.update(new_df[product_col], parse_dates(new_df[date_col]), keys)
+        product_returns = self.state.window_counts()
+        results = self._score_counts(product_returns.index, product_returns.to_numpy())
+        
+        logger.info(f"Updated risk state with {folded} returns; scored {len(results)} products")
+        return results
+    
+    def calculate_windowed_risk_scores(self, df: pd.DataFrame, product_col: str,
+                                       date_col: str = 'return_date', windows: list = None,
+                                       as_of=None) -> pd.DataFrame:
+        """
+        Risk scores and levels for several lookback windows in one grouped pass.
+        Returns one row per product with return_count_{w}d, return_rate_percentage_{w}d,
+        risk_score_{w}d and risk_level_{w}d columns for each window w (days, ending at as_of).
+        """
+        
+        windows = sorted(int(w) for w in (windows or self.windows))
+        dates = parse_dates(df[date_col])
+        as_of = pd.Timestamp(as_of) if as_of is not None else dates.max()
+        age_days = self._age_in_days(dates, as_of).to_numpy(dtype=np.float64, na_value=np.nan)
+        
+        codes, products = pd.factorize(df[product_col], sort=True)
+        
+        # One bincount per window over the rows still inside the widest window keeps memory O(n)
+        recent = (codes >= 0) & (age_days >= 0) & (age_days < windows[-1])
+        codes, age_days = codes[recent], age_days[recent]
+        matrix = np.column_stack([
+            np.bincount(codes[age_days < window], minlength=len(products)) for window in windows
+        ]).astype(np.int64)
+        rates, scores, levels = self._score_matrix(matrix)
+        
+        results = pd.DataFrame({'product': products})
+        for i, window in enumerate(windows):
+            results[f'return_count_{window}d'] = matrix[:, i]
+            results[f'return_rate_percentage_{window}d'] = rates[:, i]
+            results[f'risk_score_{window}d'] = scores[:, i]
+            results[f'risk_level_{window}d'] = levels[:, i]
+        
+        logger.info(f"Calculated windowed risk scores for {len(results)} products over windows {windows}")
+        return results
+    
+    def _age_in_days(self, dates: pd.Series, as_of) -> pd.Series:
+        """Whole days between each date and as_of (NaN for missing dates)"""
+        return (pd.Timestamp(as_of).normalize() - dates.dt.normalize()).dt.days
+    
+    def _score_counts(self, products, counts: np.ndarray) -> pd.DataFrame:
+        
+        counts = np.asarray(counts, dtype=np.int64)
+        rates, scores, levels = self._score_matrix(counts[:, None])
+        
+        return pd.DataFrame({
+            'product': products,
+            'return_count': counts,
+            'return_rate_percentage': rates[:, 0],
+            'risk_score': scores[:, 0],
+            'risk_level': levels[:, 0]
         }).reset_index(drop=True)
+    
+    def _score_matrix(self, counts: np.ndarray) -> tuple:
+        """Vectorized risk scoring over a products x windows count matrix"""
         
-        results['risk_score'] = results['return_rate_percentage'] * 2  
-        results['risk_score'] = results['risk_score'].clip(0, 100)
+        counts = np.asarray(counts, dtype=np.float64)
+        totals = counts.sum(axis=0, keepdims=True)
+        maxima = counts.max(axis=0, keepdims=True) if len(counts) else np.zeros((1, counts.shape[1]))
         
-        max_returns = results['return_count'].max()
-        frequency_factor = (results['return_count'] / max_returns * 20)
-        results['risk_score'] = (results['risk_score'] + frequency_factor).clip(0, 100)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rates = np.where(totals > 0, counts / totals * 100, 0.0).round(2)
+            frequency_factor = np.where(maxima > 0, counts / maxima * 20, 0.0)
         
-
-        results['risk_level'] = results['risk_score'].apply(self._classify_risk)
+        scores = (np.clip(rates * 2, 0, 100) + frequency_factor).clip(0, 100)
+        return rates, scores, self._classify_risk_array(scores)
+    
+    def _classify_risk_array(self, scores: np.ndarray) -> np.ndarray:
         
-        logger.info(f"Calculated risk scores for {len(results)} products")
-        return results.sort_values('risk_score', ascending=False)
+        return np.select(
+            [scores >= self.high_threshold, scores >= self.medium_threshold],
+            ["HIGH", "MEDIUM"],
+            default="LOW"
+        ).astype(object)
     
     def _classify_risk(self, score: float) -> str:
         
@@ -54,44 +298,147 @@ class RiskPredictor:
     def predict_returns_trend(self, df: pd.DataFrame, product_col: str, 
                              date_col: str, periods: int = 4) -> dict:
         
-        predictions = {}
+        forecast = self.forecast_returns(df, product_col, date_col, periods)
+        forecast_cols = [f'forecast_w{h}' for h in range(1, periods + 1)]
         
-        for product in df[product_col].unique():
-            product_data = df[df[product_col] == product].copy()
-            
-            if date_col in product_data.columns:
-                product_data[date_col] = pd.to_datetime(product_data[date_col], errors='coerce')
-                
-                
-                product_data['period'] = product_data[date_col].dt.to_period('W')
-                period_counts = product_data.groupby('period').size()
-                
-                if len(period_counts) > 0:
-                    avg_returns = period_counts.mean()
-                    trend = "increasing" if period_counts.iloc[-1] > avg_returns else "decreasing"
-                    
-                    predictions[product] = {
-                        'avg_returns_per_week': round(avg_returns, 2),
-                        'trend': trend,
-                        'recent_returns': period_counts.iloc[-1] if len(period_counts) > 0 else 0
-                    }
+        predictions = {}
+        for row in zip(forecast['product'], forecast['avg_returns_per_week'], forecast['trend'],
+                       forecast['recent_returns'], forecast[forecast_cols].to_numpy().round(2).tolist()):
+            product, avg_returns, trend, recent_returns, values = row
+            predictions[product] = {
+                'avg_returns_per_week': avg_returns,
+                'trend': trend,
+                'recent_returns': recent_returns,
+                'forecast': values
+            }
         
         logger.info(f"Predicted trends for {len(predictions)} products")
         return predictions
     
-    def identify_at_risk_products(self, risk_df: pd.DataFrame, threshold: str = "HIGH") -> pd.DataFrame:
+    def weekly_return_matrix(self, df: pd.DataFrame, product_col: str, date_col: str) -> pd.DataFrame:
+        """Products x weeks matrix of return counts over the full week range, built in one pass"""
+        
+        if date_col not in df.columns or df.empty:
+            return pd.DataFrame()
+        
+        dates = parse_dates(df[date_col]).dt.normalize()
+        valid = dates.notna().to_numpy() & df[product_col].notna().to_numpy()
+        if not valid.any():
+            return pd.DataFrame()
+        
+        dates = dates[valid]
+        week_starts = (dates - pd.to_timedelta(dates.dt.dayofweek, unit='D')).to_numpy()
+        first_week = week_starts.min()
+        week_idx = ((week_starts - first_week) // np.timedelta64(7, 'D')).astype(np.int64)
+        n_weeks = int(week_idx.max()) + 1
+        
+        codes, products = pd.factorize(df[product_col].to_numpy()[valid], sort=True)
+        counts = np.bincount(codes * n_weeks + week_idx, minlength=len(products) * n_weeks)
+        columns = pd.period_range(pd.Timestamp(first_week), periods=n_weeks, freq='W')
+        return pd.DataFrame(counts.reshape(len(products), n_weeks), index=products, columns=columns)
+    
+    def forecast_returns(self, df: pd.DataFrame, product_col: str, date_col: str,
+                         periods: int = 4, alpha: float = None, beta: float = None) -> pd.DataFrame:
+        """
+        Holt (double exponential smoothing) forecast of weekly returns for all products at once.
+        Smoothing starts at each product's first week with returns; forecasts are clipped at zero.
+        recent_returns is each product's count in its own last week with returns.
+        """
+        
+        alpha = RISK_CONFIG.get("forecast_alpha", 0.5) if alpha is None else alpha
+        beta = RISK_CONFIG.get("forecast_beta", 0.3) if beta is None else beta
+        
+        matrix = self.weekly_return_matrix(df, product_col, date_col)
+        forecast_cols = [f'forecast_w{h}' for h in range(1, periods + 1)]
+        if matrix.empty:
+            return pd.DataFrame(columns=['product', 'avg_returns_per_week', 'trend',
+                                         'recent_returns', 'trend_slope'] + forecast_cols)
         
-        at_risk = risk_df[risk_df['risk_level'] == threshold]
+        y = matrix.to_numpy(dtype=np.float64, na_value=np.nan)
+        n_products, n_weeks = y.shape
+        first_week = (y > 0).argmax(axis=1)
+        
+        level = np.zeros(n_products)
+        slope = np.zeros(n_products)
+        for t in range(n_weeks):
+            started = first_week == t
+            active = first_week < t
+            previous_level = level
+            level = np.where(started, y[:, t], level)
+            smoothed = alpha * y[:, t] + (1 - alpha) * (previous_level + slope)
+            level = np.where(active, smoothed, level)
+            slope = np.where(active, beta * (level - previous_level) + (1 - beta) * slope, slope)
+        
+        horizons = np.arange(1, periods + 1)
+        forecasts = np.clip(level[:, None] + slope[:, None] * horizons[None, :], 0, None)
+        active_weeks = n_weeks - first_week
+        last_week = n_weeks - 1 - (y[:, ::-1] > 0).argmax(axis=1)
+        
+        results = pd.DataFrame({
+            'product': matrix.index,
+            'avg_returns_per_week': (y.sum(axis=1) / active_weeks).round(2),
+            'trend': np.select([slope > 1e-9, slope < -1e-9], ['increasing', 'decreasing'], default='stable'),
+            'recent_returns': y[np.arange(n_products), last_week].astype(np.int64),
+            'trend_slope': slope.round(4)
+        })
+        for i, col in enumerate(forecast_cols):
+            results[col] = forecasts[:, i]
+        
+        logger.info(f"Forecast {periods} weeks of returns for {n_products} products")
+        return results
+    
+    def identify_at_risk_products(self, risk_df: pd.DataFrame, threshold: str = "HIGH",
+                                  top_n: int = None) -> pd.DataFrame:
+        """Products at the given risk level; with top_n, only the top_n highest scores, ranked"""
+        
+        mask = (risk_df['risk_level'] == threshold).to_numpy()
+        if top_n is None:
+            at_risk = risk_df[mask]
+        else:
+            at_risk = select_top_n(risk_df, 'risk_score', top_n, mask=mask)
         logger.info(f"Identified {len(at_risk)} {threshold} risk products")
         
         return at_risk
     
-    def calculate_estimated_impact(self, risk_df: pd.DataFrame, avg_order_value: float = 100) -> pd.DataFrame:
+    def top_risk_products(self, risk_df: pd.DataFrame, n: int = None, threshold: str = None) -> pd.DataFrame:
+        """
+        The n highest risk scores (default: reporting top_products_count), ranked, optionally
+        limited to one risk level, without sorting the whole frame
+        """
+        
+        n = REPORTING_CONFIG.get("top_products_count", 10) if n is None else n
+        if threshold is not None:
+            return self.identify_at_risk_products(risk_df, threshold, top_n=n)
+        return select_top_n(risk_df, 'risk_score', n)
+    
+    def calculate_estimated_impact(self, risk_df: pd.DataFrame, avg_order_value: float = 100,
+                                   metrics: pd.DataFrame = None) -> pd.DataFrame:
+        """
+        Monthly return and refund estimates. With an Aggregator.product_metrics table, returns and
+        actual refund totals are scaled from the period the data covers (at least a week) to 30 days;
+        avg_order_value only stands in for products without parsed refunds.
+        """
         
         df_copy = risk_df.copy()
         
-        df_copy['estimated_monthly_returns'] = df_copy['return_count'] * 4  # Rough estimate
-        df_copy['estimated_refund_amount'] = df_copy['estimated_monthly_returns'] * avg_order_value
+        if metrics is None or 'refund_total' not in metrics.columns:
+            df_copy['estimated_monthly_returns'] = df_copy['return_count'] * 4  # Rough estimate
+            df_copy['estimated_refund_amount'] = df_copy['estimated_monthly_returns'] * avg_order_value
+            logger.info(f"Calculated estimated impact for {len(df_copy)} products")
+            return df_copy
+        
+        span_days = 7
+        if 'first_return' in metrics.columns and metrics['last_return'].notna().any():
+            span_days = max((metrics['last_return'].max() - metrics['first_return'].min()).days + 1, 7)
+        monthly_factor = 30 / span_days
+        
+        refunds = metrics.reindex(df_copy['product'])
+        df_copy['refund_total'] = refunds['refund_total'].round(2).to_numpy()
+        df_copy['avg_refund'] = refunds['refund_mean'].round(2).to_numpy()
+        df_copy['estimated_monthly_returns'] = (df_copy['return_count'] * monthly_factor).round(1)
+        df_copy['estimated_refund_amount'] = (
+            df_copy['refund_total'] * monthly_factor
+        ).where(df_copy['avg_refund'].notna(), df_copy['estimated_monthly_returns'] * avg_order_value).round(2)
         
-        logger.info(f"Calculated estimated impact for {len(df_copy)} products")
+        logger.info(f"Calculated estimated impact for {len(df_copy)} products over a {span_days}-day period")
         return df_copy
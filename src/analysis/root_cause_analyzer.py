@@ -1,42 +1,30 @@
 
 import pandas as pd
 import os
-import requests
-from src.utils import logger
+import json
+from src.utils import logger, estimate_tokens
 from src.config import AI_CONFIG
+from .model_router import ModelRouter
+from .ollama_client import OllamaClient
+from .llm_scheduler import CallBudget
 
 class RootCauseAnalyzer:
     
-    def __init__(self):
-        try:
-            self.base_url = AI_CONFIG.get("ollama_base_url", "http://localhost:11434")
-            self.model = AI_CONFIG.get("model", "mistral")
-            self.temperature = AI_CONFIG.get("temperature", 0.7)
-            
-            response = requests.get(f"{self.base_url}/api/tags", timeout=2)
-            if response.status_code == 200:
-                
-                models = response.json().get("models", [])
-                model_names = [m.get("name", "").split(":")[0] for m in models]
-                
-                if any(self.model in name for name in model_names):
-                    self.client = "ollama"
-                    logger.info(f"Connected to Ollama at {self.base_url}")
-                else:
-                    available = ", ".join(model_names) if model_names else "none"
-                    logger.warning(f"Model '{self.model}' not found. Available: {available}")
-                    logger.warning(f"Run: ollama pull {self.model}")
-                    self.client = None
-            else:
-                raise Exception("Ollama not responding")
-        except Exception as e:
-            logger.warning(f"Ollama client not available: {str(e)}. Using fallback analysis.")
+    def __init__(self, router: ModelRouter = None):
+        self.ollama = OllamaClient(router)
+        self.batch_size = max(1, int(AI_CONFIG.get("batch_size", 1)))
+        self.max_input_tokens = int(AI_CONFIG.get("max_input_tokens", 1500))
+        
+        if self.ollama.connect():
+            self.client = "ollama"
+        else:
+            logger.warning("Ollama client not available. Using fallback analysis.")
             self.client = None
     
-    def analyze_reasons(self, reasons_data: dict, product_name: str = None) -> str:
+    def analyze_reasons(self, reasons_data: dict, product_name: str = None, budget: CallBudget = None) -> str:
         
         if not self.client:
-            return self._fallback_analysis(reasons_data, product_name)
+            return self._fallback_analysis(reasons_data, product_name, budget)
         
         try:
             formatted_data = self._format_for_llm(reasons_data, product_name)
@@ -53,50 +41,98 @@ Please provide:
 
 Be specific and actionable. Avoid generic statements."""
             
-            response = requests.post(
-                f"{self.base_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "temperature": self.temperature
-                },
-                timeout=120
-            )
-            
-            if response.status_code == 200:
-                analysis = response.json().get("response", "")
+            analysis = self.ollama.generate(prompt, risk_level=reasons_data.get('risk_level'), budget=budget)
+            if analysis is not None:
                 logger.info(f"Generated root cause analysis for {product_name or 'product'}")
                 return analysis
-            else:
-                logger.error(f"Ollama error: {response.status_code}")
-                return self._fallback_analysis(reasons_data, product_name)
+            return self._fallback_analysis(reasons_data, product_name, budget)
         
         except Exception as e:
             logger.error(f"Error in LLM analysis: {str(e)}")
-            return self._fallback_analysis(reasons_data, product_name)
+            return self._fallback_analysis(reasons_data, product_name, budget)
+    
+    def analyze_batch(self, product_data: dict, budget: CallBudget = None) -> dict:
+        """Analyze several products with one keyed-JSON prompt; products missing from the reply are retried individually"""
+        
+        def build_prompt(keys: dict) -> str:
+            per_product_tokens = max(1, self.max_input_tokens // len(keys))
+            sections = "\n".join(
+                f"[{key}]\n{self._format_for_llm(product_data[product_name], product_name, per_product_tokens)}"
+                for key, product_name in keys.items()
+            )
+            
+            return f"""Analyze the return data for each of the following products and identify root causes.
+
+{sections}
+For each product provide:
+1. Top 3-5 root causes (specific, pinpointed)
+2. Severity level for each cause (HIGH, MEDIUM, LOW)
+3. Estimated frequency/impact
+4. Affected customer segments if identifiable
+
+Respond ONLY with a JSON object keyed by product key ({", ".join(keys)}), where each value is the analysis text for that product.
+Be specific and actionable. Avoid generic statements."""
+        
+        def parse_value(analysis, product_name: str) -> str:
+            if isinstance(analysis, (dict, list)):
+                analysis = json.dumps(analysis, indent=2)
+            if isinstance(analysis, str) and analysis.strip():
+                return analysis.strip()
+            return None
+        
+        return self.ollama.generate_keyed(
+            product_data,
+            build_prompt,
+            parse_value,
+            retry=lambda product_name: self.analyze_reasons(product_data[product_name], product_name, budget),
+            risk_level=next(iter(product_data.values())).get('risk_level'),
+            budget=budget
+        )
     
-    def _format_for_llm(self, reasons_data: dict, product_name: str = None) -> str:
-        """Format data for LLM input"""
+    def _format_for_llm(self, reasons_data: dict, product_name: str = None, max_tokens: int = None) -> str:
+        """Format data for LLM input, trimming the lowest-count reasons (then categories) to fit the token budget"""
         
-        formatted = f"Product: {product_name or 'Unknown'}\n"
-        formatted += f"Total Returns: {reasons_data.get('total_returns', 0)}\n"
-        formatted += "Top Return Reasons:\n"
+        max_tokens = max_tokens or self.max_input_tokens
+        total_returns = reasons_data.get('total_returns', 0)
         
-        if 'top_reasons' in reasons_data:
-            for reason, count in reasons_data['top_reasons']:
-                percentage = round((count / reasons_data.get('total_returns', 1)) * 100, 1)
-                formatted += f"  - {reason}: {count} returns ({percentage}%)\n"
+        header = f"Product: {product_name or 'Unknown'}\n"
+        header += f"Total Returns: {total_returns}\n"
+        header += "Top Return Reasons:\n"
+        
+        reason_lines = []
+        for reason, count in sorted(reasons_data.get('top_reasons', []), key=lambda item: -item[1]):
+            percentage = round((count / (total_returns or 1)) * 100, 1)
+            reason_lines.append(f"  - {reason}: {count} returns ({percentage}%)\n")
         
+        category_lines = []
         if 'categories' in reasons_data:
-            formatted += "Return Categories:\n"
-            for category, stats in reasons_data['categories'].items():
-                formatted += f"  - {category}: {stats['count']} ({stats['percentage']}%)\n"
+            for category, stats in sorted(reasons_data['categories'].items(), key=lambda item: -item[1]['count']):
+                category_lines.append(f"  - {category}: {stats['count']} ({stats['percentage']}%)\n")
+        
+        if max_tokens:
+            used = estimate_tokens(header) + sum(estimate_tokens(line) for line in reason_lines + category_lines)
+            if category_lines:
+                used += estimate_tokens("Return Categories:\n")
+            dropped = 0
+            while used > max_tokens and len(reason_lines) > 1:
+                used -= estimate_tokens(reason_lines.pop())
+                dropped += 1
+            while used > max_tokens and category_lines:
+                used -= estimate_tokens(category_lines.pop())
+            if dropped:
+                reason_lines.append(f"  - ({dropped} lower-frequency reasons omitted)\n")
+        
+        formatted = header + "".join(reason_lines)
+        if category_lines:
+            formatted += "Return Categories:\n" + "".join(category_lines)
         
         return formatted
     
-    def _fallback_analysis(self, reasons_data: dict, product_name: str) -> str:
-        """Fallback analysis without LLM"""
+    def _fallback_analysis(self, reasons_data: dict, product_name: str, budget: CallBudget = None) -> str:
+        """Fallback analysis without LLM, noted on budget when it replaces a scheduled LLM call"""
+        
+        if budget is not None:
+            budget.fallback(product_name)
         
         analysis = f"Root Cause Analysis for {product_name}:\n"
         analysis += f"Total Returns: {reasons_data.get('total_returns', 0)}\n\n"
@@ -110,13 +146,23 @@ Be specific and actionable. Avoid generic statements."""
         
         return analysis
     
-    def batch_analyze(self, product_data: dict) -> dict:
+    def batch_analyze(self, product_data: dict, budget: CallBudget = None) -> dict:
         """Analyze multiple products"""
         
         results = {}
         
-        for product_name, reasons_data in product_data.items():
-            results[product_name] = self.analyze_reasons(reasons_data, product_name)
+        if self.client and self.batch_size > 1:
+            by_level = {}
+            for name, reasons_data in product_data.items():
+                by_level.setdefault(reasons_data.get('risk_level'), []).append(name)
+            for product_names in by_level.values():
+                for i in range(0, len(product_names), self.batch_size):
+                    chunk = {name: product_data[name] for name in product_names[i:i + self.batch_size]}
+                    results.update(self.analyze_batch(chunk, budget))
+            results = {name: results[name] for name in product_data}
+        else:
+            for product_name, reasons_data in product_data.items():
+                results[product_name] = self.analyze_reasons(reasons_data, product_name, budget)
         
         logger.info(f"Batch analyzed {len(results)} products")
         return results
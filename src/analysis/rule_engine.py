@@ -0,0 +1,216 @@
+
+import numpy as np
+import pandas as pd
+from src.utils import logger, calculate_severity
+from src.config import AI_CONFIG
+
+SEVERITY_WEIGHTS = {'CRITICAL': 4.0, 'HIGH': 3.0, 'MEDIUM': 2.0, 'LOW': 1.0}
+
+# Root cause wording and recommendation templates per return category.
+# Placeholders: {reason} top reason, {share} category share of returns (%), {count} category returns,
+# {defect_rate} mean QC defect rate (%), {pkg_note} packaging-log evidence (empty when none logged).
+CAUSE_TEMPLATES = {
+    'Quality Issue': {
+        'cause': "Manufacturing defects - units failing on arrival or in first use ('{reason}')",
+        'design': ["Run a failure-mode review on '{reason}' and redesign the failing component"],
+        'materials': ["Audit the supplier of components linked to '{reason}' ({count} returns)"],
+        'qc': ["Add a functional test on every unit for the '{reason}' failure mode ({share}% of returns)"]
+    },
+    'Sizing Issue': {
+        'cause': "Size chart or fit does not match customer expectations ('{reason}')",
+        'sizing': [
+            "Re-measure the size chart against production samples; '{reason}' drives {share}% of returns",
+            "Add fit guidance and body measurements to the listing"
+        ],
+        'design': ["Review pattern grading for the sizes most often returned"]
+    },
+    'Design Issue': {
+        'cause': "Product does not match its listing or photos ('{reason}')",
+        'design': ["Update product photos and description to match the shipped item ('{reason}')"],
+        'materials': ["Confirm colour and material specs with the supplier against the listing"]
+    },
+    'Packaging Issue': {
+        'cause': "Packaging fails to protect the product ('{reason}')",
+        'packaging': ["Upgrade protective packaging against '{reason}'{pkg_note}"],
+        'qc': ["Add a packaging seal and fill check at pack-out"]
+    },
+    'Shipping Damage': {
+        'cause': "Damage in transit ('{reason}')",
+        'packaging': ["Drop-test the shipping carton and add corner/edge protection ({count} damage returns)"],
+        'qc': ["Raise transit-damage claims with the carrier and track damage rate per lane"]
+    },
+    'Durability Issue': {
+        'cause': "Product wears out or breaks early ('{reason}')",
+        'materials': ["Upgrade wear-critical materials; durability drives {share}% of returns"],
+        'qc': ["Add an accelerated wear/flex test to batch release"]
+    },
+    'Other': {
+        'cause': "Unclassified return reasons ('{reason}')",
+        'qc': ["Review free-text return reasons to add missing classification keywords"]
+    }
+}
+
+QC_TEMPLATE = "Tighten batch acceptance (AQL) - QC defect rate {defect_rate}% in inspected batches"
+RECOMMENDATION_CATEGORIES = ['design', 'materials', 'sizing', 'packaging', 'qc']
+
+
+class RuleBasedEngine:
+
+    def __init__(self, max_causes: int = 3, qc_defect_threshold: float = 5.0):
+        self.max_causes = max_causes
+        self.qc_defect_threshold = qc_defect_threshold
+
+    def analyze(self, returns_df: pd.DataFrame, product_col: str = 'product_name',
+                qc_df: pd.DataFrame = None, packaging_df: pd.DataFrame = None,
+                reason_col: str = 'return_reason', category_col: str = 'return_category') -> tuple:
+        """Score root causes for every product at once and map them to recommendation templates"""
+
+        scores = self.score_root_causes(returns_df, product_col, qc_df, packaging_df, reason_col, category_col)
+        scores['total_returns'] = scores.groupby('product', sort=False)['returns'].transform('sum')
+        top = scores[scores.groupby('product', sort=False).cumcount() < self.max_causes]
+
+        root_causes, recommendations = self._render(top)
+
+        logger.info(f"Rule-based engine analyzed {len(root_causes)} products")
+        return root_causes, recommendations
+
+    def score_root_causes(self, returns_df: pd.DataFrame, product_col: str = 'product_name',
+                          qc_df: pd.DataFrame = None, packaging_df: pd.DataFrame = None,
+                          reason_col: str = 'return_reason', category_col: str = 'return_category') -> pd.DataFrame:
+        """
+        One row per (product, category) with a root cause score:
+        share of the product's returns weighted by reason severity, boosted by QC defect rate
+        for quality/durability and by packaging failures for packaging/shipping categories.
+        """
+
+        df = pd.DataFrame({
+            'product': returns_df[product_col],
+            'reason': returns_df[reason_col].fillna('').astype(str) if reason_col in returns_df.columns else '',
+            'category': returns_df[category_col].fillna('Other') if category_col in returns_df.columns else 'Other'
+        }).dropna(subset=['product'])
+
+        pairs = df.groupby(['product', 'category', 'reason'], sort=False).size().rename('count').reset_index()
+
+        unique_reasons = pairs['reason'].unique()
+        base_severity = pd.Series([calculate_severity(r) for r in unique_reasons], index=unique_reasons)
+        severity = pairs['reason'].map(base_severity).to_numpy()
+        severity = np.where((severity == 'HIGH') & (pairs['count'].to_numpy() > 20), 'CRITICAL', severity)
+        pairs['weighted'] = pairs['count'] * pd.Series(severity).map(SEVERITY_WEIGHTS).to_numpy()
+
+        top_reason = pairs.sort_values('count', ascending=False, kind='stable').drop_duplicates(['product', 'category'])
+        scores = pairs.groupby(['product', 'category'], sort=False).agg(
+            returns=('count', 'sum'), weighted=('weighted', 'sum')
+        ).reset_index()
+        scores = scores.merge(top_reason[['product', 'category', 'reason']], on=['product', 'category'], how='left')
+
+        totals = scores.groupby('product')['returns'].transform('sum')
+        scores['share'] = (scores['returns'] / totals * 100).round(1)
+        scores['score'] = scores['weighted'] / totals * 100 / SEVERITY_WEIGHTS['HIGH']
+
+        qc = self._qc_by_product(qc_df, returns_df, product_col)
+        pkg = self._packaging_by_product(packaging_df, returns_df, product_col)
+        scores = scores.merge(qc, on='product', how='left').merge(pkg, on='product', how='left')
+        scores[['defect_rate', 'pkg_failures', 'pkg_qty']] = scores[['defect_rate', 'pkg_failures', 'pkg_qty']].fillna(0)
+
+        quality = scores['category'].isin(['Quality Issue', 'Durability Issue'])
+        packaging = scores['category'].isin(['Packaging Issue', 'Shipping Damage'])
+        scores['score'] += np.where(quality, scores['defect_rate'], 0)
+        scores['score'] += np.where(packaging, np.minimum(scores['pkg_failures'] * 5, 50), 0)
+        scores['score'] = scores['score'].round(1)
+
+        return scores.sort_values(['product', 'score'], ascending=[True, False], kind='stable').reset_index(drop=True)
+
+    def _product_key_map(self, source_df: pd.DataFrame, returns_df: pd.DataFrame, product_col: str) -> pd.Series:
+        """Map a source's rows onto the returns product column, by product_col or via product_id"""
+
+        if product_col in source_df.columns:
+            return source_df[product_col]
+        if 'product_id' in source_df.columns and 'product_id' in returns_df.columns:
+            lookup = returns_df.dropna(subset=['product_id']).drop_duplicates('product_id').set_index('product_id')[product_col]
+            return source_df['product_id'].map(lookup)
+        return pd.Series(np.nan, index=source_df.index)
+
+    def _qc_by_product(self, qc_df: pd.DataFrame, returns_df: pd.DataFrame, product_col: str) -> pd.DataFrame:
+        if qc_df is None or qc_df.empty or 'defect_rate' not in qc_df.columns:
+            return pd.DataFrame({'product': pd.Series(dtype=object), 'defect_rate': pd.Series(dtype=float)})
+        keyed = pd.DataFrame({
+            'product': self._product_key_map(qc_df, returns_df, product_col),
+            'defect_rate': pd.to_numeric(qc_df['defect_rate'], errors='coerce')
+        })
+        return keyed.groupby('product', as_index=False)['defect_rate'].mean().round({'defect_rate': 1})
+
+    def _packaging_by_product(self, packaging_df: pd.DataFrame, returns_df: pd.DataFrame, product_col: str) -> pd.DataFrame:
+        empty = pd.DataFrame({
+            'product': pd.Series(dtype=object),
+            'pkg_failures': pd.Series(dtype=float),
+            'pkg_qty': pd.Series(dtype=float)
+        })
+        if packaging_df is None or packaging_df.empty:
+            return empty
+        keyed = pd.DataFrame({
+            'product': self._product_key_map(packaging_df, returns_df, product_col),
+            'pkg_qty': pd.to_numeric(packaging_df.get('quantity_affected', 0), errors='coerce')
+        }).dropna(subset=['product'])
+        if keyed.empty:
+            return empty
+        return keyed.groupby('product', as_index=False).agg(
+            pkg_failures=('pkg_qty', 'size'), pkg_qty=('pkg_qty', 'sum')
+        )
+
+    def _render(self, top: pd.DataFrame) -> tuple:
+        """Build analysis text and recommendation dicts in one pass over the top-ranked causes"""
+
+        root_causes = {}
+        recommendations = {}
+        defect_rates = {}
+
+        for row in top.itertuples(index=False):
+            product = row.product
+            if product not in root_causes:
+                root_causes[product] = [
+                    f"Root Cause Analysis for {product}:\n",
+                    f"Total Returns: {int(row.total_returns)}\n\n",
+                    "Likely Root Causes (rule-based):\n"
+                ]
+                recommendations[product] = {'product': product}
+                for category in RECOMMENDATION_CATEGORIES:
+                    recommendations[product][category] = []
+                defect_rates[product] = float(row.defect_rate)
+
+            template = CAUSE_TEMPLATES.get(row.category, CAUSE_TEMPLATES['Other'])
+            values = {
+                'reason': row.reason or 'unspecified',
+                'share': row.share,
+                'count': int(row.returns),
+                'defect_rate': round(float(row.defect_rate), 1),
+                'pkg_note': (
+                    f"; {int(row.pkg_failures)} packaging failures logged ({int(row.pkg_qty)} units affected)"
+                    if row.pkg_failures else ""
+                )
+            }
+            rank = len(root_causes[product]) - 2
+            root_causes[product].append(
+                f"{rank}. {template['cause'].format(**values)} - "
+                f"{row.category}, {row.returns} returns ({row.share}%), score {row.score}\n"
+            )
+            for category in RECOMMENDATION_CATEGORIES:
+                items = recommendations[product][category]
+                for item in template.get(category, []):
+                    text = item.format(**values)
+                    if text not in items:
+                        items.append(text)
+
+        for product, defect_rate in defect_rates.items():
+            if defect_rate >= self.qc_defect_threshold:
+                root_causes[product].append(
+                    f"\nQC inspections show a {defect_rate:.1f}% mean defect rate for this product.\n"
+                )
+                recommendations[product]['qc'].insert(0, QC_TEMPLATE.format(defect_rate=round(defect_rate, 1)))
+
+        return {product: "".join(parts) for product, parts in root_causes.items()}, recommendations
+
+    @staticmethod
+    def enabled(llm_available: bool) -> bool:
+        """Whether the configured ai_analysis.engine selects the rule-based engine"""
+        engine = str(AI_CONFIG.get("engine", "auto")).lower()
+        return engine == "rules" or (engine == "auto" and not llm_available)
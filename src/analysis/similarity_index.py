@@ -0,0 +1,144 @@
+
+import re
+import numpy as np
+import pandas as pd
+from src.utils import logger, extract_keywords
+from src.config import RISK_CONFIG
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+
+class SimilarityIndex:
+    """
+    TF-IDF index over each product's return reasons and review/chat text, answering
+    "products failing like this one" queries. Term weights are stored as sparse triplets and
+    compiled into a term -> postings (CSC-style) layout, so a query only touches the postings
+    of its own terms before an argpartition top-k. Documents can be added incrementally;
+    the postings and document norms are rebuilt lazily on the next query.
+    """
+
+    def __init__(self):
+        self.vocabulary = {}
+        self.products = []
+        self.product_ids = {}
+        # Sparse document x term triplets of sublinear term frequencies
+        self._rows = []
+        self._cols = []
+        self._tfs = []
+        self._dirty = True
+
+    def build_from_sources(self, returns_df: pd.DataFrame, product_col: str = 'product_name',
+                           reason_col: str = 'return_reason', reviews_df: pd.DataFrame = None,
+                           chats_df: pd.DataFrame = None) -> "SimilarityIndex":
+
+        texts = [returns_df[[product_col, reason_col]].set_axis(['product', 'text'], axis=1)]
+        if reviews_df is not None and not reviews_df.empty and {product_col, 'review_text'} <= set(reviews_df.columns):
+            texts.append(reviews_df[[product_col, 'review_text']].set_axis(['product', 'text'], axis=1))
+        if chats_df is not None and not chats_df.empty and {product_col, 'chat_transcript'} <= set(chats_df.columns):
+            texts.append(chats_df[[product_col, 'chat_transcript']].set_axis(['product', 'text'], axis=1))
+
+        texts = pd.concat(texts, ignore_index=True).dropna()
+        documents = texts.groupby('product', sort=True)['text'].agg(lambda values: ' '.join(map(str, values)))
+        return self.add_documents(documents.to_dict())
+
+    def add_documents(self, documents: dict) -> "SimilarityIndex":
+        """Add or extend product documents; text for an existing product is appended to it"""
+
+        for product, text in documents.items():
+            row = self.product_ids.get(product)
+            if row is None:
+                row = self.product_ids[product] = len(self.products)
+                self.products.append(product)
+
+            tokens = extract_keywords(' '.join(TOKEN_PATTERN.findall(str(text).lower())))
+            if not tokens:
+                continue
+            terms, counts = np.unique([self.vocabulary.setdefault(token, len(self.vocabulary)) for token in tokens],
+                                      return_counts=True)
+            self._rows.append(np.full(len(terms), row, dtype=np.int64))
+            self._cols.append(terms)
+            self._tfs.append(counts.astype(np.float64))
+
+        self._dirty = True
+        logger.info(f"Similarity index holds {len(self.products)} products, {len(self.vocabulary)} terms")
+        return self
+
+    def _compile(self) -> None:
+        """Merge triplets per (product, term), then build postings, idf and document norms"""
+
+        n_docs, n_terms = len(self.products), len(self.vocabulary)
+        rows = np.concatenate(self._rows) if self._rows else np.array([], dtype=np.int64)
+        cols = np.concatenate(self._cols) if self._cols else np.array([], dtype=np.int64)
+        tfs = np.concatenate(self._tfs) if self._tfs else np.array([], dtype=np.float64)
+
+        keys, inverse = np.unique(rows * max(n_terms, 1) + cols, return_inverse=True)
+        counts = np.bincount(inverse, weights=tfs)
+        rows, cols = keys // max(n_terms, 1), keys % max(n_terms, 1)
+        self._rows, self._cols, self._tfs = [rows], [cols], [counts]
+
+        document_frequency = np.bincount(cols, minlength=n_terms)
+        self.idf = np.log((1 + n_docs) / (1 + document_frequency)) + 1
+        weights = (1 + np.log(counts)) * self.idf[cols]
+        norms = np.sqrt(np.bincount(rows, weights=weights ** 2, minlength=n_docs))
+        weights = weights / np.where(norms[rows] > 0, norms[rows], 1)
+
+        order = np.argsort(cols, kind='stable')
+        self.postings_ptr = np.concatenate([[0], np.cumsum(np.bincount(cols, minlength=n_terms))])
+        self.postings_docs = rows[order]
+        self.postings_weights = weights[order]
+
+        doc_order = np.argsort(rows, kind='stable')
+        self.doc_ptr = np.concatenate([[0], np.cumsum(np.bincount(rows, minlength=n_docs))])
+        self.doc_terms = cols[doc_order]
+        self.doc_weights = weights[doc_order]
+        self._dirty = False
+
+    def _score(self, terms: np.ndarray, weights: np.ndarray) -> np.ndarray:
+        scores = np.zeros(len(self.products))
+        for term, weight in zip(terms.tolist(), weights.tolist()):
+            start, end = self.postings_ptr[term], self.postings_ptr[term + 1]
+            scores[self.postings_docs[start:end]] += weight * self.postings_weights[start:end]
+        return scores
+
+    def similar_products(self, product, k: int = None, min_score: float = 0.05) -> list:
+        """Top-k products by cosine similarity of their TF-IDF failure profiles"""
+
+        k = int(k or RISK_CONFIG.get("similar_products_k", 3))
+        row = self.product_ids.get(product)
+        if row is None:
+            return []
+        if self._dirty:
+            self._compile()
+
+        start, end = self.doc_ptr[row], self.doc_ptr[row + 1]
+        scores = self._score(self.doc_terms[start:end], self.doc_weights[start:end])
+        scores[row] = -1
+        return self._top_k(scores, k, min_score)
+
+    def query(self, text: str, k: int = None, min_score: float = 0.05) -> list:
+        """Top-k products similar to free text, e.g. the first return reasons of a new SKU"""
+
+        k = int(k or RISK_CONFIG.get("similar_products_k", 3))
+        if self._dirty:
+            self._compile()
+        tokens = extract_keywords(' '.join(TOKEN_PATTERN.findall(str(text).lower())))
+        terms = [self.vocabulary[token] for token in tokens if token in self.vocabulary]
+        if not terms:
+            return []
+
+        terms, counts = np.unique(terms, return_counts=True)
+        weights = (1 + np.log(counts)) * self.idf[terms]
+        weights = weights / np.linalg.norm(weights)
+        return self._top_k(self._score(terms, weights), k, min_score)
+
+    def _top_k(self, scores: np.ndarray, k: int, min_score: float) -> list:
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [
+            {'product': self.products[i], 'similarity': round(float(scores[i]), 3)}
+            for i in top.tolist()
+            if scores[i] >= min_score
+        ]
@@ -5,6 +5,8 @@ from src.utils import logger
 
 class AmazonParser(BaseParser):
     
+    date_columns = ['return_date', 'date_returned', 'return_date_time']
+    
     def __init__(self, file_path: str):
         super().__init__(file_path)
     
@@ -41,7 +43,7 @@ class AmazonParser(BaseParser):
         if 'return_reason' not in df.columns:
             logger.warning("return_reason column not found in Amazon data")
         
-        self.data = df
+        self.data = self._finalize(df)
         logger.info(f"Parsed {len(self.data)} Amazon returns")
         
         return self.data
@@ -2,15 +2,29 @@
 import pandas as pd
 from pathlib import Path
 from typing import Optional
-from src.utils import logger
+from src.utils import logger, parse_dates, resolve_dtype_backend, apply_dtype_backend
+from src.config import PROCESSING_CONFIG, RISK_CONFIG
 
 class BaseParser:
+    # Raw column names (lowercase) that may hold the record date used for lookback pushdown
+    date_columns = []
     
     def __init__(self, file_path: str):
         """Initialize parser with file path"""
         self.file_path = Path(file_path)
         self.data = None
         self.source_name = self.__class__.__name__
+        
+        pushdown = PROCESSING_CONFIG.get("lookback_pushdown") or {}
+        self.lookback_days = None
+        if pushdown.get("enabled", False):
+            # Keep the widest window any risk calculation reads
+            self.lookback_days = max([RISK_CONFIG["lookback_days"]] + list(RISK_CONFIG.get("windows", [])))
+        as_of_date = pushdown.get("as_of_date")
+        self.as_of_date = pd.Timestamp(as_of_date) if as_of_date else None
+        self.chunk_rows = int(pushdown.get("chunk_rows", 100000))
+        self.window_start = None
+        self.dtype_backend = resolve_dtype_backend(PROCESSING_CONFIG.get("dtype_backend"))
     
     def load_data(self) -> pd.DataFrame:
         try:
@@ -19,9 +33,14 @@ class BaseParser:
                 return pd.DataFrame()
             
             if self.file_path.suffix.lower() == '.csv':
-                self.data = pd.read_csv(self.file_path)
+                if self.lookback_days is not None and self.date_columns:
+                    self.data = self._read_csv_in_window()
+                else:
+                    self.data = pd.read_csv(self.file_path, **self._read_options())
             elif self.file_path.suffix.lower() in ['.json', '.jsonl']:
-                self.data = pd.read_json(self.file_path)
+                self.data = pd.read_json(self.file_path, **self._read_options())
+                if self.lookback_days is not None:
+                    self.data = self._filter_window(self.data)
             else:
                 raise ValueError(f"Unsupported file format: {self.file_path.suffix}")
             
@@ -32,6 +51,74 @@ class BaseParser:
             logger.error(f"Error loading data from {self.source_name}: {str(e)}")
             return pd.DataFrame()
     
+    def _read_options(self) -> dict:
+        """Reader keyword arguments for the configured dtype backend (numpy keeps pandas defaults)"""
+        if self.dtype_backend == 'numpy':
+            return {}
+        return {'dtype_backend': self.dtype_backend}
+    
+    def _finalize(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Keep columns derived while parsing (e.g. source, flags) in the configured backend's dtypes
+        and tag the frame with the first day kept when the lookback window was pushed down
+        """
+        df = apply_dtype_backend(df, self.dtype_backend)
+        if self.window_start is not None:
+            df.attrs['window_start'] = self.window_start
+        return df
+    
+    def _date_column(self, columns) -> Optional[str]:
+        columns_lower = {col.lower(): col for col in columns}
+        for name in self.date_columns:
+            if name in columns_lower:
+                return columns_lower[name]
+        return None
+    
+    def _read_csv_in_window(self) -> pd.DataFrame:
+        """
+        Read the CSV in chunks, dropping rows older than the lookback window before they are
+        kept. The window ends at as_of_date, or else at the latest date in the file (the anchor
+        risk scoring uses), so rows are trimmed against the running maximum as chunks arrive and
+        once more against the final maximum. Rows with unparseable dates are kept.
+        """
+        
+        kept, total_rows, latest = [], 0, self.as_of_date
+        for chunk in pd.read_csv(self.file_path, chunksize=self.chunk_rows, **self._read_options()):
+            total_rows += len(chunk)
+            date_col = self._date_column(chunk.columns)
+            if date_col is None:
+                kept.append(chunk)
+                continue
+            dates = parse_dates(chunk[date_col])
+            if self.as_of_date is None and dates.notna().any():
+                latest = dates.max() if latest is None else max(latest, dates.max())
+            kept.append(chunk[self._in_window(dates, latest)])
+        
+        data = pd.concat(kept, ignore_index=True) if kept else pd.DataFrame()
+        data = self._filter_window(data, latest)
+        logger.info(
+            f"Lookback pushdown kept {len(data)} of {total_rows} {self.source_name} rows "
+            f"({self.lookback_days} days to {latest.date() if latest is not None else 'n/a'})"
+        )
+        return data
+    
+    def _filter_window(self, df: pd.DataFrame, latest=None) -> pd.DataFrame:
+        date_col = self._date_column(df.columns)
+        if date_col is None or df.empty:
+            return df
+        dates = parse_dates(df[date_col])
+        if latest is None:
+            latest = self.as_of_date if self.as_of_date is not None else dates.max()
+        if latest is not None and not pd.isna(latest):
+            # First day kept; anything the frame holds from earlier days is not there
+            self.window_start = pd.Timestamp(latest).normalize() - pd.Timedelta(days=self.lookback_days - 1)
+        return df[self._in_window(dates, latest)].reset_index(drop=True)
+    
+    def _in_window(self, dates: pd.Series, latest) -> pd.Series:
+        if latest is None or pd.isna(latest):
+            return pd.Series(True, index=dates.index)
+        return dates.isna() | (dates.dt.normalize() > pd.Timestamp(latest).normalize() - pd.Timedelta(days=self.lookback_days))
+    
     def validate_columns(self, required_columns: list) -> bool:
         if self.data is None:
             return False
@@ -1,10 +1,12 @@
 
 import pandas as pd
 from .base_parser import BaseParser
-from src.utils import logger
+from src.utils import logger, ParallelExecutor, contains_pattern
 
 class ChatParser(BaseParser):
     
+    date_columns = ['created_date', 'date', 'chat_date']
+    
     def __init__(self, file_path: str):
         super().__init__(file_path)
     
@@ -20,6 +22,7 @@ class ChatParser(BaseParser):
 
         for standard_name, possible_names in [
             ('ticket_id', ['ticket_id', 'chat_id', 'conversation_id']),
+            ('order_id', ['order_id', 'order_number']),
             ('product_id', ['product_id', 'sku', 'product_sku']),
             ('product_name', ['product_name', 'title', 'item_name']),
             ('chat_transcript', ['transcript', 'message', 'conversation', 'chat_transcript']),
@@ -39,13 +42,12 @@ class ChatParser(BaseParser):
                 df[standard_name] = self.data[original_name]
 
         df['source'] = 'Support Chat'
-        df['is_return_related'] = df['chat_transcript'].fillna('').str.contains(
-            r'return|refund|exchange|damaged|broken|defect|issue|problem',
-            case=False,
-            regex=True
-        )
+        df['is_return_related'] = ParallelExecutor.shared().map_column(
+            df['chat_transcript'], contains_pattern,
+            r'return|refund|exchange|damaged|broken|defect|issue|problem'
+        ).astype(bool)
         
-        self.data = df
+        self.data = self._finalize(df)
         logger.info(f"Parsed {len(self.data)} support chats, {df['is_return_related'].sum()} return-related")
         
         return self.data
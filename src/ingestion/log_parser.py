@@ -5,6 +5,8 @@ from src.utils import logger
 
 class LogParser(BaseParser):
     
+    date_columns = ['log_date', 'date', 'timestamp']
+    
     def __init__(self, file_path: str):
         super().__init__(file_path)
     
@@ -44,7 +46,7 @@ class LogParser(BaseParser):
         if 'quantity_affected' in df.columns:
             df['quantity_affected'] = pd.to_numeric(df['quantity_affected'], errors='coerce').fillna(0)
         
-        self.data = df
+        self.data = self._finalize(df)
         logger.info(f"Parsed {len(self.data)} packaging failure logs")
         
         return self.data
@@ -3,6 +3,8 @@ from .base_parser import BaseParser
 from src.utils import logger
 
 class QCParser(BaseParser):
+    date_columns = ['qc_date', 'date', 'inspection_date']
+    
     def __init__(self, file_path: str):
         super().__init__(file_path)
     
@@ -44,6 +46,6 @@ class QCParser(BaseParser):
         if 'defect_count' in df.columns and 'total_inspected' in df.columns:
             df['defect_rate'] = (df['defect_count'] / df['total_inspected'].replace(0, 1)) * 100
         
-        self.data = df
+        self.data = self._finalize(df)
         logger.info(f"Parsed {len(self.data)} QC reports")
         return self.data
@@ -1,8 +1,10 @@
 import pandas as pd
 from .base_parser import BaseParser
-from src.utils import logger
+from src.utils import logger, ParallelExecutor, contains_pattern
 
 class ReviewParser(BaseParser):
+    date_columns = ['review_date', 'date', 'posted_date']
+    
     def __init__(self, file_path: str):
         super().__init__(file_path)
     
@@ -41,13 +43,12 @@ class ReviewParser(BaseParser):
         else:
             df['is_negative_review'] = False
         
-        df['has_issue_mention'] = df['review_text'].fillna('').str.contains(
-            r'broken|damaged|defect|quality|issue|problem|stop work|failed|poor|cheap|quality|cracking|fading',
-            case=False,
-            regex=True
-        )
+        df['has_issue_mention'] = ParallelExecutor.shared().map_column(
+            df['review_text'], contains_pattern,
+            r'broken|damaged|defect|quality|issue|problem|stop work|failed|poor|cheap|quality|cracking|fading'
+        ).astype(bool)
         
-        self.data = df
+        self.data = self._finalize(df)
         logger.info(
             f"Parsed {len(self.data)} reviews, "
             f"{df['is_negative_review'].sum()} negative, "
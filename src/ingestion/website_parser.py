@@ -3,6 +3,8 @@ from .base_parser import BaseParser
 from src.utils import logger
 
 class WebsiteParser(BaseParser):
+    date_columns = ['return_date', 'date', 'return_date_time']
+    
     def __init__(self, file_path: str):
         super().__init__(file_path)
     
@@ -22,7 +24,7 @@ class WebsiteParser(BaseParser):
             ('return_date', ['return_date', 'date', 'return_date_time']),
             ('refund_amount', ['refund_amount', 'price', 'total']),
             ('customer_feedback', ['customer_feedback', 'notes', 'comments']),
-            ('order_id', ['order_id, 'order_number'])
+            ('order_id', ['order_id', 'order_number'])
         ]:
             for possible_name in possible_names:
                 if possible_name in columns_lower:
@@ -36,6 +38,6 @@ class WebsiteParser(BaseParser):
         
         df['source'] = 'Website'
         
-        self.data = df
+        self.data = self._finalize(df)
         logger.info(f"Parsed {len(self.data)} website returns")
         return self.data
@@ -3,11 +3,25 @@
 from .normalizer import Normalizer
 from .classifier import Classifier
 from .pattern_detector import PatternDetector
+from .identity_resolver import IdentityResolver
 from .aggregator import Aggregator
+from .spike_detector import SpikeDetector
+from .source_joiner import SourceJoiner
+from .reason_clusterer import ReasonClusterer
+from .heavy_hitters import HeavyHitters
+from .rollup_cube import RollupCube
+from .order_deduplicator import OrderDeduplicator
 
 __all__ = [
     'Normalizer',
     'Classifier',
     'PatternDetector',
-    'Aggregator'
+    'Aggregator',
+    'SpikeDetector',
+    'SourceJoiner',
+    'IdentityResolver',
+    'ReasonClusterer',
+    'HeavyHitters',
+    'RollupCube',
+    'OrderDeduplicator'
 ]
@@ -1,39 +1,130 @@
 
 
+import numpy as np
 import pandas as pd
-from src.utils import logger
+from src.utils import logger, parse_dates
+from .identity_resolver import IdentityResolver
+
+CATEGORY_PREFIX = 'returns_'
 
 class Aggregator:
 
     def __init__(self):
         pass
     
-    def combine_dataframes(self, dataframes: list, common_columns: list = None) -> pd.DataFrame:
+    def combine_dataframes(self, dataframes: list, common_columns: list = None,
+                           resolver: IdentityResolver = None) -> pd.DataFrame:
         
         if not dataframes:
             logger.warning("No dataframes to combine")
             return pd.DataFrame()
         
         combined = pd.concat(dataframes, ignore_index=True, sort=False)
+        if resolver is not None and not combined.empty:
+            combined = resolver.resolve(combined)
         
         logger.info(f"Combined {len(dataframes)} dataframes into {len(combined)} total records")
         return combined
     
-    def aggregate_by_product(self, df: pd.DataFrame, product_col: str) -> pd.DataFrame:
+    def product_metrics(self, df: pd.DataFrame, product_col: str, reason_col: str = None,
+                        category_col: str = 'return_category', refund_col: str = 'refund_amount',
+                        date_col: str = 'return_date', top_n: int = 5, sum_columns: list = None,
+                        first_columns: list = None) -> pd.DataFrame:
+        """
+        Every product-level return metric from one factorization of the product column:
+        return_count, refund_total/refund_mean (over parsed refunds), first/last return date,
+        one returns_<category> count column per return category, top_reasons
+        ([(reason, count)], most common first, ties in order of first appearance), the sums of
+        any sum_columns and the first non-null value of any first_columns.
+        Rows are indexed by product in order of first appearance.
+        """
         
         if product_col not in df.columns:
             logger.warning(f"Product column {product_col} not found")
             return pd.DataFrame()
         
-        agg_dict = {}
+        codes, products = pd.factorize(df[product_col])
+        valid = codes >= 0
+        codes = codes[valid]
+        n = len(products)
+        metrics = pd.DataFrame({'return_count': np.bincount(codes, minlength=n)},
+                               index=pd.Index(products, name=product_col))
+        
+        if refund_col in df.columns:
+            refunds = pd.to_numeric(df[refund_col], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)[valid]
+            refunded = ~np.isnan(refunds)
+            refund_total = np.bincount(codes, weights=np.where(refunded, refunds, 0.0), minlength=n)
+            refund_rows = np.bincount(codes, weights=refunded, minlength=n)
+            metrics['refund_total'] = refund_total
+            metrics['refund_mean'] = np.divide(refund_total, refund_rows, out=np.full(n, np.nan), where=refund_rows > 0)
+        
+        if date_col in df.columns and n:
+            dates = parse_dates(df[date_col]).to_numpy(dtype='datetime64[ns]')[valid].view(np.int64)
+            missing = dates == np.iinfo(np.int64).min
+            order = np.argsort(codes, kind='stable')
+            starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+            earliest = np.minimum.reduceat(np.where(missing, np.iinfo(np.int64).max, dates)[order], starts)
+            latest = np.maximum.reduceat(dates[order], starts)
+            metrics['first_return'] = pd.to_datetime(np.where(earliest == np.iinfo(np.int64).max, latest, earliest))
+            metrics['last_return'] = pd.to_datetime(latest)
+        
+        if category_col in df.columns:
+            category_codes, categories = pd.factorize(df[category_col].fillna('Unknown').to_numpy()[valid])
+            counts = np.bincount(codes * len(categories) + category_codes,
+                                 minlength=n * len(categories)).reshape(n, len(categories))
+            for i, category in enumerate(categories):
+                metrics[f'{CATEGORY_PREFIX}{category}'] = counts[:, i]
         
-        for col in df.select_dtypes(include=['number']).columns:
-            agg_dict[col] = 'sum'
+        if reason_col and reason_col in df.columns:
+            metrics['top_reasons'] = self._top_reasons(codes, df[reason_col].fillna('').to_numpy()[valid], n, top_n)
+        
+        for col in sum_columns or []:
+            values = df[col][valid]
+            sums = np.bincount(codes, weights=values.fillna(0).to_numpy(dtype=np.float64), minlength=n)
+            metrics[col] = sums.astype(values.dtype) if values.dtype.kind in 'iu' else sums
+        
+        for col in first_columns or []:
+            values = df[col][valid]
+            present = values.notna().to_numpy()
+            found, first_row = np.unique(codes[present], return_index=True)
+            first = np.full(n, None, dtype=object)
+            first[found] = values[present].to_numpy(dtype=object)[first_row]
+            metrics[col] = first
+        
+        logger.info(f"Computed product metrics for {n} products from {len(df)} rows")
+        return metrics
+    
+    def _top_reasons(self, codes: np.ndarray, reasons: np.ndarray, n: int, top_n: int) -> list:
+        
+        reason_codes, reason_values = pd.factorize(reasons)
+        pairs, first_seen, counts = np.unique(codes.astype(np.int64) * max(len(reason_values), 1) + reason_codes,
+                                              return_index=True, return_counts=True)
+        product = pairs // max(len(reason_values), 1)
+        order = np.lexsort((first_seen, -counts, product))
+        product, reason, counts = product[order], (pairs % max(len(reason_values), 1))[order], counts[order]
+        rank = np.arange(len(product)) - np.searchsorted(product, product)
+        
+        top_reasons = [[] for _ in range(n)]
+        for p, r, count in zip(product[rank < top_n].tolist(), reason[rank < top_n].tolist(),
+                               counts[rank < top_n].tolist()):
+            top_reasons[p].append((reason_values[r], count))
+        return top_reasons
+    
+    def aggregate_by_product(self, df: pd.DataFrame, product_col: str) -> pd.DataFrame:
+        
+        if product_col not in df.columns:
+            logger.warning(f"Product column {product_col} not found")
+            return pd.DataFrame()
         
-        agg_dict['product_name'] = 'first'
+        # Numeric sums, the first product_name and return_count per product, sorted by product
+        sum_columns = [col for col in df.select_dtypes(include=['number']).columns if col != product_col]
+        first_columns = ['product_name'] if product_col != 'product_name' else []
+        metrics = self.product_metrics(df, product_col, category_col=None, refund_col=None, date_col=None,
+                                       sum_columns=sum_columns, first_columns=first_columns).sort_index()
         
-        aggregated = df.groupby(product_col, as_index=False).agg(agg_dict)
-        aggregated['return_count'] = df.groupby(product_col).size().values
+        aggregated = metrics[sum_columns].reset_index(drop=product_col == 'product_name')
+        aggregated['product_name'] = metrics['product_name'].to_numpy() if first_columns else metrics.index.to_numpy()
+        aggregated['return_count'] = metrics['return_count'].to_numpy()
         
         logger.info(f"Aggregated data by {product_col}: {len(aggregated)} unique products")
         return aggregated
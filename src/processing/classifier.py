@@ -1,5 +1,8 @@
 import pandas as pd
-from src.utils import categorize_return_reason, logger
+from src.utils import categorize_return_reason, logger, ParallelExecutor
+
+def classify_values(values, categories: dict) -> list:
+    return [categorize_return_reason(value, categories) for value in values]
 
 class Classifier:
     def __init__(self):
@@ -22,7 +25,9 @@ class Classifier:
             logger.warning(f"Column {reason_column} not found in dataframe")
             return df_copy
         
-        df_copy['return_category'] = df_copy[reason_column].fillna('').apply(self.classify_reason)
+        df_copy['return_category'] = ParallelExecutor.shared().map_column(
+            df_copy[reason_column], classify_values, self.categories
+        )
         category_counts = df_copy['return_category'].value_counts()
         logger.info(f"Classified returns: {dict(category_counts)}")
         return df_copy
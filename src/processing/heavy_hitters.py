@@ -0,0 +1,197 @@
+import json
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from src.utils import logger, parse_dates, RowLedger
+from src.config import PROCESSING_CONFIG, RISK_CONFIG, PROJECT_ROOT
+
+GLOBAL_KEY = "__all__"
+
+
+class HeavyHitters:
+    """
+    Mergeable Space-Saving summaries of item counts, one per key (e.g. per product, or a single
+    global key), held as one long table so chunks update every key with vectorized operations.
+
+    Error bounds, for a key that has seen N events with capacity k:
+      - every tracked item's count overestimates its true count by at most its `error`, and error <= N / k
+      - any untracked item occurred at most `floor` <= N / k times
+      - so every item with true count > N / k is tracked, and top-k order is exact once the
+        count gap between items exceeds their errors
+    Summaries built from separate chunks or runs merge with the same guarantees (N = total events).
+    A summary saved between runs carries a RowLedger, so update_new folds each return only once
+    however often its source is re-read.
+    """
+
+    def __init__(self, capacity: int = None):
+        config = PROCESSING_CONFIG.get("heavy_hitters") or {}
+        self.capacity = int(capacity or config.get("capacity", 50))
+        self.table = pd.DataFrame({
+            'key': pd.Series(dtype=object),
+            'item': pd.Series(dtype=object),
+            'count': pd.Series(dtype=np.int64),
+            'error': pd.Series(dtype=np.int64)
+        })
+        self.floors = pd.Series(dtype=np.int64)
+        self.totals = pd.Series(dtype=np.int64)
+        self.ledger = None
+
+    def update(self, df: pd.DataFrame, item_col: str, key_col: str = None) -> "HeavyHitters":
+        """Fold a chunk of events: exact counts for the chunk, truncated to capacity, then merged"""
+
+        keys = df[key_col] if key_col else pd.Series(GLOBAL_KEY, index=df.index)
+        events = pd.DataFrame({'key': keys.to_numpy(), 'item': df[item_col].to_numpy()}).dropna()
+        counts = events.groupby(['key', 'item'], sort=False).size().reset_index(name='count')
+        counts['error'] = 0
+
+        chunk = HeavyHitters(self.capacity)
+        chunk.totals = counts.groupby('key', sort=False)['count'].sum()
+        chunk.table, chunk.floors = chunk._truncate(counts, pd.Series(0, index=chunk.totals.index, dtype=np.int64))
+        return self.merge(chunk)
+
+    def update_new(self, df: pd.DataFrame, item_col: str, key_col: str, date_col: str,
+                   chunk_rows: int = None) -> int:
+        """
+        Fold the rows of df this summary has not seen yet, chunk by chunk, under key_col and
+        under the global key. Rows without a date cannot be placed in the ledger window and
+        are left out. Returns the number of rows folded.
+        """
+
+        if self.ledger is None:
+            # Remember rows as long as a run may re-read them (the widest risk window)
+            self.ledger = RowLedger(max([RISK_CONFIG["lookback_days"]] + list(RISK_CONFIG.get("windows", []))))
+        config = PROCESSING_CONFIG.get("heavy_hitters") or {}
+        chunk_rows = int(chunk_rows or config.get("chunk_rows", 100000))
+
+        days = RowLedger.day_numbers(parse_dates(df[date_col]))
+        dated = np.flatnonzero(~np.isnan(days))
+        if len(dated) < len(df):
+            logger.warning(f"Left {len(df) - len(dated)} undated returns out of the heavy-hitter summary")
+        keys = RowLedger.row_keys(df.iloc[dated], key_col, date_col)
+        new_rows = df.iloc[dated[self.ledger.admit(keys, days[dated].astype(np.int64))]]
+
+        for start in range(0, len(new_rows), chunk_rows):
+            chunk = new_rows.iloc[start:start + chunk_rows]
+            self.update(chunk, item_col, key_col)
+            self.update(chunk, item_col)
+        logger.info(f"Folded {len(new_rows)} new returns into the heavy-hitter summary")
+        return len(new_rows)
+
+    def merge(self, other: "HeavyHitters") -> "HeavyHitters":
+        """
+        Merge another summary in place. An item missing from one side may still have occurred
+        up to that side's floor times, so it is charged the floor as both count and error.
+        """
+
+        if other.table.empty:
+            return self
+        if self.table.empty:
+            self.table, self.floors, self.totals = other.table.copy(), other.floors.copy(), other.totals.copy()
+            return self
+
+        merged = self.table.merge(other.table, on=['key', 'item'], how='outer', suffixes=('_a', '_b'))
+        floor_a = merged['key'].map(self.floors).fillna(0).astype(np.int64)
+        floor_b = merged['key'].map(other.floors).fillna(0).astype(np.int64)
+        missing_a, missing_b = merged['count_a'].isna(), merged['count_b'].isna()
+
+        merged['count'] = (merged['count_a'].fillna(floor_a) + merged['count_b'].fillna(floor_b)).astype(np.int64)
+        merged['error'] = (merged['error_a'].where(~missing_a, floor_a)
+                           + merged['error_b'].where(~missing_b, floor_b)).astype(np.int64)
+
+        floors = self.floors.add(other.floors, fill_value=0).astype(np.int64)
+        self.totals = self.totals.add(other.totals, fill_value=0).astype(np.int64)
+        self.table, self.floors = self._truncate(merged[['key', 'item', 'count', 'error']], floors)
+        return self
+
+    def _truncate(self, table: pd.DataFrame, floors: pd.Series) -> tuple:
+        """Keep the capacity largest counts per key; the largest dropped count raises the key's floor"""
+
+        table = table.sort_values(['key', 'count'], ascending=[True, False], kind='stable')
+        rank = table.groupby('key', sort=False).cumcount()
+        dropped = table[rank >= self.capacity]
+        if not dropped.empty:
+            floors = floors.combine(dropped.groupby('key')['count'].max(), max, fill_value=0).astype(np.int64)
+        return table[rank < self.capacity].reset_index(drop=True), floors
+
+    def top_k(self, k: int = 10, key=GLOBAL_KEY) -> list:
+        """[(item, estimated_count, max_overestimate)] for one key, largest first"""
+
+        rows = self.table[self.table['key'] == key].head(k)
+        return list(zip(rows['item'], rows['count'].astype(int), rows['error'].astype(int)))
+
+    def top_k_by_key(self, k: int = 5) -> dict:
+        """{key: [(item, estimated_count)]} for every key in one pass"""
+
+        rows = self.table[self.table.groupby('key', sort=False).cumcount() < k]
+        result = {}
+        for key, item, count in zip(rows['key'], rows['item'], rows['count'].astype(int)):
+            result.setdefault(key, []).append((item, count))
+        return result
+
+    def total(self, key=GLOBAL_KEY) -> int:
+        """Events folded under this key"""
+        return int(self.totals.get(key, 0))
+
+    def error_bound(self, key=GLOBAL_KEY) -> float:
+        """Guaranteed maximum overestimate (N / capacity) for any item of this key"""
+        return float(self.totals.get(key, 0)) / self.capacity
+
+    def to_dict(self) -> dict:
+        data = {
+            'capacity': self.capacity,
+            'table': {col: self.table[col].tolist() for col in ['key', 'item', 'count', 'error']},
+            'floors': {str(key): int(value) for key, value in self.floors.items()},
+            'totals': {str(key): int(value) for key, value in self.totals.items()}
+        }
+        if self.ledger is not None:
+            data['ledger'] = self.ledger.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "HeavyHitters":
+        sketch = cls(data.get('capacity'))
+        table = data.get('table') or {}
+        if table.get('key'):
+            sketch.table = pd.DataFrame(table).astype({'count': np.int64, 'error': np.int64})
+        sketch.floors = pd.Series(data.get('floors', {}), dtype=np.int64)
+        sketch.totals = pd.Series(data.get('totals', {}), dtype=np.int64)
+        if data.get('ledger'):
+            sketch.ledger = RowLedger.from_dict(data['ledger'])
+        return sketch
+
+    def save(self, path=None) -> None:
+        path = Path(path or self.default_path())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps(self.to_dict()))
+        tmp_path.replace(path)
+        logger.info(f"Saved heavy-hitter summary for {len(self.totals)} keys to {path}")
+
+    @classmethod
+    def load(cls, path=None) -> "HeavyHitters":
+        """Load a saved summary; a missing file gives an empty one"""
+        path = Path(path or cls.default_path())
+        if not path.exists():
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            sketch = cls.from_dict(json.load(f))
+        logger.info(f"Loaded heavy-hitter summary for {len(sketch.totals)} keys from {path}")
+        return sketch
+
+    @staticmethod
+    def default_path() -> Path:
+        config = PROCESSING_CONFIG.get("heavy_hitters") or {}
+        return PROJECT_ROOT / config.get("file", "data/processed/reason_sketch.json")
+
+    @classmethod
+    def from_chunks(cls, df: pd.DataFrame, item_col: str, key_col: str = None,
+                    capacity: int = None, chunk_rows: int = None) -> "HeavyHitters":
+        """Build a summary by folding the frame chunk by chunk, keeping memory bounded by capacity"""
+
+        config = PROCESSING_CONFIG.get("heavy_hitters") or {}
+        chunk_rows = int(chunk_rows or config.get("chunk_rows", 100000))
+        sketch = cls(capacity)
+        for start in range(0, len(df), chunk_rows):
+            sketch.update(df.iloc[start:start + chunk_rows], item_col, key_col)
+        return sketch
@@ -0,0 +1,198 @@
+import re
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from src.utils import logger
+from src.config import PROCESSING_CONFIG, PROJECT_ROOT
+
+
+class IdentityResolver:
+    """
+    Maps source product identifiers (ASIN, SKU, ...) and slightly different product names
+    to one canonical product. Candidate pairs come only from token blocks (names sharing a
+    rare token), scored by character trigram Jaccard similarity and merged with union-find,
+    so resolution scales without comparing all name pairs. Rows sharing an identifier are
+    always merged. An overrides CSV (source_value, canonical_id[, canonical_name]) wins over
+    both.
+    """
+
+    def __init__(self, threshold: float = None, max_block_size: int = None, overrides_file: str = None):
+        config = PROCESSING_CONFIG.get("identity_resolution") or {}
+        self.threshold = float(threshold if threshold is not None else config.get("threshold", 0.75))
+        self.max_block_size = int(max_block_size or config.get("max_block_size", 50))
+        overrides_file = overrides_file or config.get("overrides_file")
+        self.overrides_path = PROJECT_ROOT / overrides_file if overrides_file else None
+
+        self.name_index = pd.Series(dtype=object)
+        self.id_index = pd.Series(dtype=object)
+        self.canonical_names = {}
+
+    @staticmethod
+    def normalize_names(names: pd.Series) -> pd.Series:
+        """Lowercase, strip punctuation and sort tokens so word order and spacing do not matter"""
+
+        cleaned = names.astype(str).str.lower().str.replace(r'[^a-z0-9]+', ' ', regex=True).str.split()
+        return cleaned.map(lambda tokens: ' '.join(sorted(tokens)))
+
+    def fit(self, df: pd.DataFrame, product_col: str = 'product_name', id_col: str = 'product_id') -> "IdentityResolver":
+
+        names = df[product_col] if product_col in df.columns else pd.Series(np.nan, index=df.index)
+        ids = df[id_col] if id_col in df.columns else pd.Series(np.nan, index=df.index)
+        pairs = pd.DataFrame({'name': names, 'id': ids}).dropna(how='all')
+
+        name_codes, raw_names = pd.factorize(pairs['name'])
+        normalized = self.normalize_names(pd.Series(raw_names, dtype=object)).to_numpy(dtype=object)
+        pairs['norm'] = np.append(normalized, np.nan)[name_codes]
+
+        norm_names = pd.Index(pairs['norm'].dropna().unique())
+        id_values = pd.Index(pairs['id'].dropna().unique())
+        parent = np.arange(len(norm_names) + len(id_values))
+
+        def find(node):
+            root = node
+            while parent[root] != root:
+                root = parent[root]
+            while parent[node] != root:
+                parent[node], node = root, parent[node]
+            return root
+
+        def union(a, b):
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+        # Rows carrying both a name and an identifier tie the two together
+        linked = pairs.dropna(subset=['norm', 'id'])
+        for a, b in zip(norm_names.get_indexer(linked['norm']), id_values.get_indexer(linked['id']) + len(norm_names)):
+            union(a, b)
+
+        trigrams = [self._trigrams(name) for name in norm_names]
+        model_numbers = [frozenset(re.findall(r'\S*\d\S*', name)) for name in norm_names]
+        left, right = self._candidate_pairs(norm_names)
+        for a, b in zip(left.tolist(), right.tolist()):
+            # Names differing only in a model number ("x1" vs "x2") are different products
+            if model_numbers[a] != model_numbers[b]:
+                continue
+            grams_a, grams_b = trigrams[a], trigrams[b]
+            if len(grams_a & grams_b) >= self.threshold * len(grams_a | grams_b):
+                union(a, b)
+
+        roots = np.array([find(node) for node in range(len(parent))], dtype=np.int64)
+        canonical = self._canonical_ids(roots, norm_names, id_values, pairs)
+
+        self.name_index = pd.Series(canonical[roots[:len(norm_names)]], index=norm_names)
+        self.id_index = pd.Series(canonical[roots[len(norm_names):]], index=id_values)
+        self._apply_overrides()
+
+        logger.info(
+            f"Resolved {len(norm_names)} names and {len(id_values)} identifiers into "
+            f"{len(self.canonical_names)} products ({len(left)} blocked comparisons)"
+        )
+        return self
+
+    def _candidate_pairs(self, norm_names: pd.Index) -> tuple:
+        """Index pairs of names sharing a token, skipping tokens common enough to block everything"""
+
+        tokens = pd.Series(norm_names.str.split(), index=np.arange(len(norm_names))).explode().dropna()
+        codes, _ = pd.factorize(tokens.to_numpy())
+        order = np.argsort(codes, kind='stable')
+        nodes = tokens.index.to_numpy()[order]
+        starts = np.flatnonzero(np.r_[True, np.diff(codes[order]) != 0])
+        sizes = np.diff(np.r_[starts, len(order)])
+
+        left, right = [], []
+        for start, size in zip(starts.tolist(), sizes.tolist()):
+            if size < 2 or size > self.max_block_size:
+                continue
+            i, j = np.triu_indices(size, k=1)
+            members = nodes[start:start + size]
+            left.append(members[i])
+            right.append(members[j])
+        if not left:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+
+        n = len(norm_names)
+        keys = np.unique(np.minimum(np.concatenate(left), np.concatenate(right)) * n
+                         + np.maximum(np.concatenate(left), np.concatenate(right)))
+        return keys // n, keys % n
+
+    @staticmethod
+    def _trigrams(name: str) -> set:
+        padded = f"  {name} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+    def _canonical_ids(self, roots: np.ndarray, norm_names: pd.Index, id_values: pd.Index,
+                       pairs: pd.DataFrame) -> np.ndarray:
+        """Canonical ID per union-find root (smallest source identifier, else the normalized name) and its display name"""
+
+        spellings = pairs.dropna(subset=['norm', 'name']).groupby(['norm', 'name'], sort=False).size()
+        spellings = spellings.sort_values(ascending=False, kind='stable').reset_index(name='count')
+        spellings = spellings.drop_duplicates('norm').set_index('norm')
+
+        n_names = len(norm_names)
+        components = pd.DataFrame({'root': roots, 'node': np.arange(len(roots))})
+        components['id'] = np.concatenate([np.full(n_names, None, dtype=object), id_values.astype(str).to_numpy(dtype=object)])
+        components['norm'] = np.concatenate([norm_names.to_numpy(dtype=object), np.full(len(id_values), None, dtype=object)])
+        components['name'] = components['norm'].map(spellings['name'])
+        components['count'] = components['norm'].map(spellings['count']).fillna(0)
+
+        first_id = components.dropna(subset=['id']).sort_values('id').drop_duplicates('root').set_index('root')['id']
+        first_norm = components.dropna(subset=['norm']).sort_values('norm').drop_duplicates('root').set_index('root')['norm']
+        best_name = components.dropna(subset=['name']).sort_values('count', ascending=False, kind='stable')
+        best_name = best_name.drop_duplicates('root').set_index('root')['name']
+
+        unique_roots = pd.Index(np.unique(roots))
+        canonical_ids = first_id.reindex(unique_roots).fillna(first_norm.reindex(unique_roots))
+        display_names = best_name.reindex(unique_roots).fillna(canonical_ids)
+        self.canonical_names = dict(zip(canonical_ids.to_numpy(), display_names.to_numpy()))
+
+        canonical = np.empty(len(roots), dtype=object)
+        canonical[unique_roots.to_numpy()] = canonical_ids.to_numpy()
+        return canonical
+
+    def _apply_overrides(self) -> None:
+
+        if self.overrides_path is None or not Path(self.overrides_path).exists():
+            return
+
+        overrides = pd.read_csv(self.overrides_path, dtype=str).dropna(subset=['source_value', 'canonical_id'])
+        for row in overrides.itertuples(index=False):
+            if row.source_value in self.id_index.index:
+                self.id_index[row.source_value] = row.canonical_id
+            else:
+                norm = self.normalize_names(pd.Series([row.source_value])).iloc[0]
+                self.name_index[norm] = row.canonical_id
+            canonical_name = getattr(row, 'canonical_name', None)
+            if isinstance(canonical_name, str) and canonical_name:
+                self.canonical_names[row.canonical_id] = canonical_name
+            else:
+                self.canonical_names.setdefault(row.canonical_id, row.source_value)
+
+        logger.info(f"Applied {len(overrides)} product identity overrides from {self.overrides_path}")
+
+    def apply(self, df: pd.DataFrame, product_col: str = 'product_name', id_col: str = 'product_id') -> pd.DataFrame:
+        """
+        Add canonical_product_id and replace product_col with the canonical name (original kept in
+        source_product_name), via hash lookups on identifiers first and normalized names second.
+        """
+
+        df = df.copy()
+        canonical = pd.Series(np.nan, index=df.index, dtype=object)
+        if id_col in df.columns:
+            canonical = df[id_col].map(self.id_index)
+        if product_col in df.columns:
+            codes, uniques = pd.factorize(df[product_col])
+            by_name = self.normalize_names(pd.Series(uniques, dtype=object)).map(self.name_index).to_numpy()
+            from_name = pd.Series(np.append(by_name, np.nan)[codes], index=df.index)
+            canonical = canonical.fillna(from_name)
+
+        df['canonical_product_id'] = canonical
+        if product_col in df.columns:
+            df['source_product_name'] = df[product_col]
+            df[product_col] = canonical.map(self.canonical_names).fillna(df[product_col])
+
+        logger.info(f"Applied product identity resolution to {len(df)} rows")
+        return df
+
+    def resolve(self, df: pd.DataFrame, product_col: str = 'product_name', id_col: str = 'product_id') -> pd.DataFrame:
+        return self.fit(df, product_col, id_col).apply(df, product_col, id_col)
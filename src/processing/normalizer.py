@@ -1,5 +1,8 @@
 import pandas as pd
-from src.utils import normalize_text, logger
+from src.utils import normalize_text, logger, ParallelExecutor
+
+def normalize_values(values) -> list:
+    return [normalize_text(value) for value in values]
 
 class Normalizer:
     def __init__(self):
@@ -9,7 +12,7 @@ class Normalizer:
         df_copy = df.copy()
         for col in text_columns:
             if col in df_copy.columns:
-                df_copy[f'{col}_normalized'] = df_copy[col].fillna('').apply(normalize_text)
+                df_copy[f'{col}_normalized'] = ParallelExecutor.shared().map_column(df_copy[col], normalize_values)
         logger.info(f"Normalized {len(text_columns)} text columns")
         return df_copy
     
@@ -0,0 +1,203 @@
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from src.utils import logger
+from src.config import PROCESSING_CONFIG, PROJECT_ROOT
+from .identity_resolver import IdentityResolver
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS orders (
+    key INTEGER PRIMARY KEY,
+    origin TEXT NOT NULL,
+    first_seen TEXT NOT NULL,
+    row_hash INTEGER
+);
+"""
+SPLITMIX_GAMMA = np.uint64(0x9E3779B97F4A7C15)
+
+
+class OrderDeduplicator:
+    """
+    Keeps one return per (order_id, canonical product) across feeds, files and runs, so an order
+    exported to both Amazon and the website, or read from two exports in one run, counts once. The
+    index stores the feed that first reported each key and a fingerprint of its latest row. A
+    stored key is dropped when another feed reports it; its own feed keeps it on every re-read,
+    corrected or not, and the fingerprint follows the latest version. Each key is a 64-bit hash; a fixed-size Bloom filter answers "never seen" for
+    most new keys in O(1) with no disk access, and only its positives are checked against the
+    exact SQLite index. Memory stays at the Bloom filter size however long the history.
+    """
+
+    def __init__(self, index_file: str = None, bloom_bits: int = None, bloom_hashes: int = None):
+        config = PROCESSING_CONFIG.get("order_dedup") or {}
+        self.db_path = Path(index_file or PROJECT_ROOT / config.get("index_file", "data/processed/order_index.db"))
+        self.bloom_path = self.db_path.with_suffix('.bloom.npy')
+        self.bloom_bits = int(bloom_bits or config.get("bloom_bits", 1 << 24))
+        self.bloom_hashes = int(bloom_hashes or config.get("bloom_hashes", 7))
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(orders)")}
+            if 'row_hash' not in columns:
+                # Keys recorded before row fingerprints get one on their next re-read
+                conn.execute("ALTER TABLE orders ADD COLUMN row_hash INTEGER")
+        self.bloom = self._load_bloom()
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _load_bloom(self) -> np.ndarray:
+        if self.bloom_path.exists():
+            bloom = np.load(self.bloom_path)
+            if len(bloom) * 8 == self.bloom_bits:
+                return bloom
+
+        # Missing or resized filter: rebuild it from the exact index
+        bloom = np.zeros(self.bloom_bits // 8, dtype=np.uint8)
+        with self._connect() as conn:
+            cursor = conn.execute("SELECT key FROM orders")
+            while True:
+                rows = cursor.fetchmany(500000)
+                if not rows:
+                    break
+                self._set_bits(bloom, np.array([row[0] for row in rows], dtype=np.int64).view(np.uint64))
+        return bloom
+
+    def _save_bloom(self) -> None:
+        tmp_path = self.bloom_path.with_name(self.bloom_path.stem + '.tmp.npy')
+        np.save(tmp_path, self.bloom)
+        tmp_path.replace(self.bloom_path)
+
+    @staticmethod
+    def order_keys(df: pd.DataFrame, order_col: str = 'order_id', product_col: str = 'product_name',
+                   canonical_col: str = 'canonical_product_id') -> pd.Series:
+        """
+        64-bit key per row from the trimmed order id and the product: the resolved canonical
+        product id when identity resolution ran, else the token-normalized product name
+        """
+
+        orders = df[order_col].astype(str).str.strip().str.upper()
+        products = pd.Series('', index=df.index, dtype=object)
+        if product_col in df.columns:
+            codes, names = pd.factorize(df[product_col].fillna(''))
+            normalized = IdentityResolver.normalize_names(pd.Series(names, dtype=object)).to_numpy(dtype=object)
+            products = pd.Series(normalized[codes] if len(codes) else [], index=df.index, dtype=object)
+        if canonical_col in df.columns:
+            products = df[canonical_col].astype(object).where(df[canonical_col].notna(), products).astype(str)
+        return pd.util.hash_pandas_object(pd.DataFrame({'order': orders, 'product': products}), index=False)
+
+    @staticmethod
+    def row_hashes(df: pd.DataFrame) -> pd.Series:
+        """64-bit fingerprint of each row's content, independent of the file or position it was read from"""
+
+        return pd.util.hash_pandas_object(df[sorted(df.columns)], index=False)
+
+    def _positions(self, keys: np.ndarray) -> np.ndarray:
+        """Bloom bit positions per key by double hashing: h1 + i * h2"""
+
+        with np.errstate(over='ignore'):
+            mixed = keys + SPLITMIX_GAMMA
+            mixed = (mixed ^ (mixed >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+            mixed = (mixed ^ (mixed >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+            step = (mixed ^ (mixed >> np.uint64(31))) | np.uint64(1)
+            rounds = np.arange(self.bloom_hashes, dtype=np.uint64)
+            return (keys[:, None] + rounds[None, :] * step[:, None]) % np.uint64(self.bloom_bits)
+
+    def _set_bits(self, bloom: np.ndarray, keys: np.ndarray) -> None:
+        positions = np.unique(self._positions(keys).ravel())
+        byte = (positions >> np.uint64(3)).astype(np.int64)
+        bits = np.uint8(1) << (positions & np.uint64(7)).astype(np.uint8)
+        starts = np.flatnonzero(np.r_[True, np.diff(byte) != 0])
+        bloom[byte[starts]] |= np.bitwise_or.reduceat(bits, starts)
+
+    def _might_contain(self, keys: np.ndarray) -> np.ndarray:
+        positions = self._positions(keys)
+        bits = (self.bloom[(positions >> np.uint64(3)).astype(np.int64)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return bits.all(axis=1)
+
+    def _stored_rows(self, conn, keys: np.ndarray) -> pd.DataFrame:
+        """Exact lookup of the recorded feed and row fingerprint for each (Bloom-positive) key"""
+
+        rows = []
+        if len(keys):
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS candidates (key INTEGER PRIMARY KEY)")
+            conn.execute("DELETE FROM candidates")
+            conn.executemany("INSERT OR IGNORE INTO candidates VALUES (?)", ((int(key),) for key in keys.view(np.int64)))
+            rows = conn.execute(
+                "SELECT orders.key, orders.origin, orders.row_hash FROM orders JOIN candidates USING (key)"
+            ).fetchall()
+        return pd.DataFrame(rows, columns=['key', 'origin', 'stored_hash']).astype({'key': np.int64, 'stored_hash': 'Int64'})
+
+    def drop_duplicates(self, df: pd.DataFrame, feed_col: str = 'source', order_col: str = 'order_id',
+                        product_col: str = 'product_name', hash_col: str = 'row_hash') -> pd.DataFrame:
+        """
+        Keep the first row per order/product key that is either new to the index or reported by
+        the feed (feed_col) that recorded it, record the new keys and refresh the fingerprint
+        (hash_col, computed here when the column is absent) of re-read keys whose row changed.
+        Meant for the combined returns after identity resolution, so the key uses the canonical
+        product. Rows without an order id are kept; hash_col is dropped from the result.
+        """
+
+        if df is None or df.empty or order_col not in df.columns:
+            return df
+
+        if hash_col in df.columns:
+            hashes = df[hash_col].to_numpy(dtype=np.uint64)
+            df = df.drop(columns=hash_col)
+        else:
+            hashes = self.row_hashes(df).to_numpy(dtype=np.uint64)
+
+        has_order = df[order_col].notna().to_numpy()
+        keys = self.order_keys(df[has_order], order_col, product_col).to_numpy(dtype=np.uint64)
+        feeds = df[feed_col].astype(object).fillna('').astype(str) if feed_col in df.columns else pd.Series('', index=df.index)
+        rows = pd.DataFrame({
+            'key': keys.view(np.int64),
+            'feed': feeds.to_numpy(dtype=object)[has_order],
+            'row_hash': hashes[has_order].view(np.int64)
+        })
+        maybe_seen = self._might_contain(keys)
+
+        with self._connect() as conn:
+            stored = self._stored_rows(conn, np.unique(keys[maybe_seen]))
+            rows = rows.merge(stored, on='key', how='left')
+            is_stored = rows['origin'].notna().to_numpy()
+            reread = is_stored & (rows['origin'] == rows['feed']).to_numpy()
+
+            # One row per key: new keys and keys re-read from their own feed keep their first row
+            candidate = ~is_stored | reread
+            kept = candidate.copy()
+            kept[candidate] = ~rows.loc[candidate, 'key'].duplicated().to_numpy()
+
+            new_rows = rows.loc[kept & ~is_stored, ['key', 'feed', 'row_hash']]
+            first_seen = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            conn.executemany(
+                "INSERT OR IGNORE INTO orders (key, origin, first_seen, row_hash) VALUES (?, ?, ?, ?)",
+                ((int(key), feed, first_seen, int(row_hash)) for key, feed, row_hash in new_rows.itertuples(index=False))
+            )
+
+            changed = kept & is_stored & (rows['stored_hash'] != rows['row_hash']).fillna(True).to_numpy(dtype=bool)
+            conn.executemany(
+                "UPDATE orders SET row_hash = ? WHERE key = ?",
+                ((int(row_hash), int(key)) for key, row_hash in rows.loc[changed, ['key', 'row_hash']].itertuples(index=False))
+            )
+
+        if len(new_rows):
+            self._set_bits(self.bloom, new_rows['key'].to_numpy(dtype=np.int64).view(np.uint64))
+            self._save_bloom()
+
+        keep = np.ones(len(df), dtype=bool)
+        keep[has_order] = kept
+        logger.info(
+            f"Order dedup: dropped {int((~keep).sum())} of {len(df)} rows already reported by a feed or an earlier row, "
+            f"recorded {len(new_rows)} new orders, refreshed {int(changed.sum())} changed rows "
+            f"({int(maybe_seen.sum())} filter hits checked exactly)"
+        )
+        return df[keep]
@@ -1,26 +1,69 @@
 import pandas as pd
 from collections import Counter
 from src.utils import logger, extract_keywords
+from src.config import PROCESSING_CONFIG
+from .spike_detector import SpikeDetector
+from .heavy_hitters import HeavyHitters
+from .aggregator import Aggregator
 
 class PatternDetector:
     def __init__(self):
         pass
     
-    def detect_product_issues(self, df: pd.DataFrame, product_col: str, reason_col: str) -> dict:
+    def detect_product_issues(self, df: pd.DataFrame, product_col: str, reason_col: str,
+                              use_sketch: bool = None, metrics: pd.DataFrame = None,
+                              sketch: HeavyHitters = None) -> dict:
+        """
+        Top reasons per product; reads a precomputed Aggregator.product_metrics table when given.
+        With a heavy-hitter summary carried across runs (sketch), counts are all-time.
+        """
+        if use_sketch is None:
+            use_sketch = sketch is not None or (PROCESSING_CONFIG.get("heavy_hitters") or {}).get("enabled", False)
+        if use_sketch:
+            return self._detect_product_issues_sketched(df, product_col, reason_col, sketch)
+        
+        if metrics is None or 'top_reasons' not in metrics.columns:
+            metrics = Aggregator().product_metrics(df, product_col, reason_col)
+        
         patterns = {}
-        for product in df[product_col].unique():
-            product_data = df[df[product_col] == product]
-            reasons = product_data[reason_col].fillna('').tolist()
-            reason_counts = Counter(reasons)
-            top_reasons = reason_counts.most_common(5)
+        for product, total, top_reasons in zip(metrics.index, metrics['return_count'].tolist(), metrics['top_reasons']):
             patterns[product] = {
-                'total_returns': len(product_data),
+                'total_returns': total,
                 'top_reasons': top_reasons,
-                'return_rate': round((len(product_data) / len(df)) * 100, 2)
+                'return_rate': round((total / len(df)) * 100, 2)
             }
         logger.info(f"Detected patterns for {len(patterns)} products")
         return patterns
     
+    def _detect_product_issues_sketched(self, df: pd.DataFrame, product_col: str, reason_col: str,
+                                        sketch: HeavyHitters = None) -> dict:
+        """
+        Top reasons per product from bounded-memory Space-Saving summaries instead of full Counters.
+        A given sketch already holds every run's returns, so totals and rates come from it; without
+        one, a summary of this frame is built.
+        """
+        
+        if sketch is None:
+            events = pd.DataFrame({'product': df[product_col], 'reason': df[reason_col].fillna('')})
+            sketch = HeavyHitters.from_chunks(events, 'reason', 'product')
+            totals = events['product'].value_counts(sort=False)
+            all_returns = len(df)
+        else:
+            totals = sketch.totals.reindex(df[product_col].dropna().unique()).dropna().astype(int)
+            all_returns = sketch.total()
+        top_reasons = sketch.top_k_by_key(5)
+        
+        patterns = {}
+        for product, total in totals.items():
+            patterns[product] = {
+                'total_returns': int(total),
+                'top_reasons': top_reasons.get(product, []),
+                'return_rate': round((total / all_returns) * 100, 2),
+                'reason_count_error_bound': round(sketch.error_bound(product), 2)
+            }
+        logger.info(f"Detected patterns for {len(patterns)} products (heavy-hitter sketch, capacity {sketch.capacity})")
+        return patterns
+    
     def detect_temporal_patterns(self, df: pd.DataFrame, date_col: str, reason_col: str = None) -> dict:
         patterns = {'by_week': {}, 'by_month': {}}
         if date_col not in df.columns:
@@ -38,6 +81,26 @@ class PatternDetector:
         logger.info("Detected temporal patterns")
         return patterns
     
+    def detect_return_spikes(self, df: pd.DataFrame, product_col: str, date_col: str,
+                             category_col: str = None, detector: SpikeDetector = None) -> dict:
+        """Flag products and categories whose daily returns spike above their EWMA baseline"""
+        
+        result = {'events': [], 'products': {}, 'categories': {}}
+        if date_col not in df.columns or product_col not in df.columns:
+            logger.warning(f"Columns {product_col}/{date_col} not found")
+            return result
+        
+        detector = detector or SpikeDetector()
+        events = detector.update(df, product_col, date_col, category_col)
+        
+        result['events'] = sorted(events, key=lambda event: (event['date'], event['z_score']), reverse=True)
+        for event in result['events']:
+            bucket = result['products'] if event['scope'] == SpikeDetector.SCOPE_PRODUCT else result['categories']
+            bucket.setdefault(event['key'], event)
+        
+        logger.info(f"Detected return spikes for {len(result['products'])} products and {len(result['categories'])} categories")
+        return result
+    
     def detect_keyword_patterns(self, df: pd.DataFrame, text_col: str, top_n: int = 10) -> dict:
         if text_col not in df.columns:
             logger.warning(f"Text column {text_col} not found")
@@ -0,0 +1,198 @@
+import json
+import re
+import zlib
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from src.utils import logger
+from src.config import PROCESSING_CONFIG, PROJECT_ROOT
+
+NUMBER_WORDS = {
+    'one': '1', 'two': '2', 'three': '3', 'four': '4', 'five': '5', 'six': '6',
+    'seven': '7', 'eight': '8', 'nine': '9', 'ten': '10', 'a couple': '2', 'a few': '3'
+}
+NUMBER_PATTERN = re.compile(r'\b(' + '|'.join(NUMBER_WORDS) + r')\b')
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+
+
+class ReasonClusterer:
+    """
+    Groups near-duplicate free-text return reasons with MinHash signatures over character
+    trigrams and banded locality-sensitive hashing, so only reasons sharing an LSH bucket are
+    compared. The reason -> canonical reason map is persisted and extended incrementally: known
+    reasons keep their canonical form and new ones join an existing cluster or start their own.
+    """
+
+    def __init__(self, num_perm: int = None, bands: int = None, threshold: float = None,
+                 max_bucket_size: int = None, state_file: str = None, seed: int = 1):
+        config = PROCESSING_CONFIG.get("reason_clustering") or {}
+        self.num_perm = int(num_perm or config.get("num_perm", 64))
+        self.bands = int(bands or config.get("bands", 16))
+        if self.num_perm % self.bands:
+            raise ValueError(f"num_perm ({self.num_perm}) must be divisible by bands ({self.bands})")
+        self.threshold = float(threshold if threshold is not None else config.get("threshold", 0.6))
+        self.max_bucket_size = int(max_bucket_size or config.get("max_bucket_size", 50))
+        state_file = state_file or config.get("state_file", "data/processed/reason_clusters.json")
+        self.state_path = PROJECT_ROOT / state_file
+
+        rng = np.random.default_rng(seed)
+        self.perm_a = rng.integers(1, MERSENNE_PRIME, self.num_perm, dtype=np.uint64)
+        self.perm_b = rng.integers(0, MERSENNE_PRIME, self.num_perm, dtype=np.uint64)
+        # normalized reason -> canonical reason text
+        self.cluster_map = {}
+
+    @staticmethod
+    def normalize_reason(text) -> str:
+        text = NUMBER_PATTERN.sub(lambda match: NUMBER_WORDS[match.group(1)], str(text).lower())
+        return re.sub(r'[^a-z0-9]+', ' ', text).strip()
+
+    def load(self, path=None) -> None:
+        path = Path(path or self.state_path)
+        if path.exists():
+            with open(path, 'r', encoding='utf-8') as f:
+                self.cluster_map = json.load(f).get('clusters', {})
+        logger.info(f"Loaded {len(self.cluster_map)} clustered reasons from {path}")
+
+    def save(self, path=None) -> None:
+        path = Path(path or self.state_path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'clusters': self.cluster_map}))
+        tmp_path.replace(path)
+        logger.info(f"Saved {len(self.cluster_map)} clustered reasons to {path}")
+
+    def signatures(self, texts: list) -> np.ndarray:
+        """MinHash signature (num_perm uint64 values) per text, computed in vectorized chunks"""
+
+        signatures = np.full((len(texts), self.num_perm), MAX_HASH, dtype=np.uint64)
+        chunk = max(1, 2_000_000 // (self.num_perm * 32))
+        for start in range(0, len(texts), chunk):
+            owners, hashes = [], []
+            for i, text in enumerate(texts[start:start + chunk]):
+                padded = f" {text} "
+                grams = {padded[j:j + 3] for j in range(max(1, len(padded) - 2))}
+                hashes.extend(zlib.crc32(gram.encode('utf-8')) for gram in grams)
+                owners.extend([i] * len(grams))
+            hashes = np.array(hashes, dtype=np.uint64)
+            owners = np.array(owners, dtype=np.int64)
+            permuted = (hashes[:, None] * self.perm_a[None, :] + self.perm_b[None, :]) % MERSENNE_PRIME & MAX_HASH
+            boundaries = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]])
+            signatures[start + owners[boundaries]] = np.minimum.reduceat(permuted, boundaries, axis=0)
+        return signatures
+
+    def _similar_pairs(self, signatures: np.ndarray, chunk_size: int = 100_000):
+        """
+        Yield chunks of row pairs that share a bucket in at least one band and whose
+        estimated Jaccard similarity (share of equal MinHash values) reaches the threshold.
+        """
+
+        rows_per_band = self.num_perm // self.bands
+        for band in range(self.bands):
+            block = np.ascontiguousarray(signatures[:, band * rows_per_band:(band + 1) * rows_per_band])
+            keys = block.view(np.dtype((np.void, block.dtype.itemsize * rows_per_band))).ravel()
+            _, bucket, sizes = np.unique(keys, return_inverse=True, return_counts=True)
+            shared = np.flatnonzero((sizes[bucket] > 1) & (sizes[bucket] <= self.max_bucket_size))
+            if not len(shared):
+                continue
+
+            order = shared[np.argsort(bucket[shared], kind='stable')]
+            starts = np.flatnonzero(np.r_[True, np.diff(bucket[order]) != 0])
+            ends = np.r_[starts[1:], len(order)]
+            left, right, pending = [], [], 0
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                i, j = np.triu_indices(end - start, k=1)
+                members = order[start:end]
+                left.append(members[i])
+                right.append(members[j])
+                pending += len(i)
+                if pending >= chunk_size or end == len(order):
+                    a, b = np.concatenate(left), np.concatenate(right)
+                    similarity = (signatures[a] == signatures[b]).mean(axis=1)
+                    keep = similarity >= self.threshold
+                    yield a[keep], b[keep]
+                    left, right, pending = [], [], 0
+
+    def fit(self, reasons: pd.Series) -> dict:
+        """Extend the cluster map with the reasons not seen before; returns the full map"""
+
+        counts = reasons.dropna().astype(str).value_counts()
+        normalized = pd.Series([self.normalize_reason(text) for text in counts.index], index=counts.index)
+        norm_counts = counts.groupby(normalized.to_numpy()).sum()
+        spellings = pd.DataFrame({'norm': normalized.to_numpy(), 'text': counts.index, 'count': counts.to_numpy()})
+        best_spelling = spellings.drop_duplicates('norm').set_index('norm')['text']
+
+        new_norms = [norm for norm in norm_counts.sort_values(ascending=False, kind='stable').index
+                     if norm and norm not in self.cluster_map]
+        if not new_norms:
+            return self.cluster_map
+
+        # Existing canonical reasons come first so they stay the root of any cluster they join
+        canonical_norms = list(dict.fromkeys(self.normalize_reason(text) for text in self.cluster_map.values()))
+        canonical_lookup = {self.normalize_reason(text): text for text in self.cluster_map.values()}
+        nodes = canonical_norms + new_norms
+        n_existing = len(canonical_norms)
+
+        signatures = self.signatures(nodes)
+        parent = np.arange(len(nodes))
+
+        def find(node):
+            root = node
+            while parent[root] != root:
+                root = parent[root]
+            while parent[node] != root:
+                parent[node], node = root, parent[node]
+            return root
+
+        merged = 0
+        for left, right in self._similar_pairs(signatures):
+            for a, b in zip(left.tolist(), right.tolist()):
+                root_a, root_b = find(a), find(b)
+                if root_a != root_b and not (root_a < n_existing and root_b < n_existing):
+                    parent[max(root_a, root_b)] = min(root_a, root_b)
+                    merged += 1
+
+        # New-only clusters are rooted at their most frequent member since new_norms is sorted by count
+        for node in range(n_existing, len(nodes)):
+            root = find(node)
+            if root < n_existing:
+                self.cluster_map[nodes[node]] = canonical_lookup[nodes[root]]
+            else:
+                self.cluster_map[nodes[node]] = best_spelling[nodes[root]]
+
+        logger.info(f"Clustered {len(new_norms)} new reasons ({merged} near-duplicate merges)")
+        return self.cluster_map
+
+    def transform(self, reasons: pd.Series) -> pd.Series:
+        """Canonical reason per row via a hash lookup on the normalized text of each unique reason"""
+
+        codes, uniques = pd.factorize(reasons)
+        canonical = np.array([self.cluster_map.get(self.normalize_reason(text), text) for text in uniques] + [np.nan],
+                             dtype=object)
+        return pd.Series(canonical[codes], index=reasons.index)
+
+    def cluster_dataframe(self, df: pd.DataFrame, reason_col: str = 'return_reason', persist: bool = True) -> pd.DataFrame:
+
+        if reason_col not in df.columns:
+            logger.warning(f"Reason column {reason_col} not found")
+            return df
+
+        if persist:
+            self.load()
+        self.fit(df[reason_col])
+        if persist:
+            self.save()
+
+        df = df.copy()
+        df[f'{reason_col}_canonical'] = self.transform(df[reason_col])
+        logger.info(
+            f"Clustered {df[reason_col].nunique()} distinct reasons into "
+            f"{df[f'{reason_col}_canonical'].nunique()} canonical reasons"
+        )
+        return df
+
+    def canonical_counts(self, df: pd.DataFrame, reason_col: str = 'return_reason') -> pd.Series:
+        column = f'{reason_col}_canonical'
+        reasons = df[column] if column in df.columns else self.transform(df[reason_col])
+        return reasons.value_counts()
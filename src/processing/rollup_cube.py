@@ -0,0 +1,145 @@
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from src.utils import logger, parse_dates
+from src.config import PROCESSING_CONFIG, PROJECT_ROOT
+
+DIMENSIONS = ['source', 'return_category', 'product', 'week']
+UNKNOWN = 'Unknown'
+
+
+class RollupCube:
+    """
+    Materialized return counts and refund sums by source x return_category x product x ISO week.
+    Dimensions are held as categoricals, so a slice is a few integer mask operations over the
+    compact cell table rather than a pass over raw returns.
+    """
+
+    def __init__(self, cells: pd.DataFrame = None):
+        self.cells = cells if cells is not None else pd.DataFrame(
+            columns=DIMENSIONS + ['week_start', 'returns', 'refund_total']
+        )
+        self._index_dimensions()
+
+    def build(self, returns_df: pd.DataFrame, product_col: str = 'product_name', date_col: str = 'return_date',
+              category_col: str = 'return_category', source_col: str = 'source',
+              refund_col: str = 'refund_amount') -> "RollupCube":
+
+        def column(name):
+            if name in returns_df.columns:
+                return returns_df[name].fillna(UNKNOWN).astype(str).to_numpy()
+            return np.full(len(returns_df), UNKNOWN, dtype=object)
+
+        dates = parse_dates(returns_df[date_col]) if date_col in returns_df.columns else pd.Series(pd.NaT, index=returns_df.index)
+        iso = dates.dt.isocalendar()
+        week = (iso['year'].astype('string') + '-W' + iso['week'].astype('string').str.zfill(2)).fillna(UNKNOWN)
+        week_start = (dates.dt.normalize() - pd.to_timedelta(dates.dt.dayofweek, unit='D'))
+        refunds = pd.to_numeric(returns_df[refund_col], errors='coerce') if refund_col in returns_df.columns else 0.0
+
+        events = pd.DataFrame({
+            'source': column(source_col),
+            'return_category': column(category_col),
+            'product': column(product_col),
+            'week': week.to_numpy(dtype=object),
+            'week_start': week_start.to_numpy(),
+            'refund': refunds
+        })
+        self.cells = events.groupby(DIMENSIONS, sort=True, dropna=False).agg(
+            week_start=('week_start', 'first'),
+            returns=('refund', 'size'),
+            refund_total=('refund', 'sum')
+        ).reset_index()
+        self._index_dimensions()
+
+        logger.info(f"Built rollup cube: {len(self.cells)} cells from {len(returns_df)} returns")
+        return self
+
+    def merge(self, previous: "RollupCube", covered_from=None) -> "RollupCube":
+        """
+        Carry over the weeks of a previously saved cube that this build does not fully cover.
+        Weeks present in this build replace the saved ones. covered_from is the first day the
+        build's returns are complete from (e.g. the lookback pushdown window start); for the
+        weeks before the first whole week after it, the saved cells are kept when there are any.
+        """
+
+        if previous.cells.empty:
+            return self
+
+        current_weeks = self.cells['week_start']
+        saved_weeks = previous.cells['week_start']
+        keep_saved = saved_weeks.notna() & ~saved_weeks.isin(current_weeks.dropna())
+        if covered_from is not None:
+            start = pd.Timestamp(covered_from).normalize()
+            first_full_week = start + pd.Timedelta(days=(7 - start.dayofweek) % 7)
+            keep_saved |= saved_weeks < first_full_week
+        keep_current = ~current_weeks.isin(saved_weeks[keep_saved])
+
+        cells = pd.concat([
+            previous.cells[keep_saved].astype({dim: object for dim in DIMENSIONS}),
+            self.cells[keep_current].astype({dim: object for dim in DIMENSIONS})
+        ], ignore_index=True)
+        self.cells = cells.sort_values(DIMENSIONS, kind='stable').reset_index(drop=True)
+        self._index_dimensions()
+
+        logger.info(f"Merged rollup cube: kept {int(keep_saved.sum())} saved cells, {len(self.cells)} cells in total")
+        return self
+
+    def _index_dimensions(self) -> None:
+        for dim in DIMENSIONS:
+            self.cells[dim] = self.cells[dim].astype('category')
+        self.cells['week_start'] = pd.to_datetime(self.cells['week_start'])
+
+    def _dimension_mask(self, dim: str, values) -> np.ndarray:
+        values = [values] if isinstance(values, str) or not hasattr(values, '__iter__') else list(values)
+        column = self.cells[dim]
+        wanted = column.cat.categories.get_indexer(pd.Index(values, dtype=object))
+        return np.isin(column.cat.codes.to_numpy(), wanted[wanted >= 0])
+
+    def query(self, source=None, return_category=None, product=None, week=None,
+              start=None, end=None, group_by=None) -> pd.DataFrame:
+        """
+        Sum returns and refunds over a slice. Each dimension filter takes a value or a list of
+        values; start/end select the ISO weeks overlapping that date range. group_by lists the
+        dimensions to keep; without it the whole slice collapses to one row.
+        """
+
+        mask = np.ones(len(self.cells), dtype=bool)
+        for dim, values in (('source', source), ('return_category', return_category),
+                            ('product', product), ('week', week)):
+            if values is not None:
+                mask &= self._dimension_mask(dim, values)
+        if start is not None:
+            mask &= (self.cells['week_start'] >= pd.Timestamp(start) - pd.Timedelta(days=pd.Timestamp(start).dayofweek)).to_numpy()
+        if end is not None:
+            mask &= (self.cells['week_start'] <= pd.Timestamp(end)).to_numpy()
+
+        selected = self.cells[mask]
+        if not group_by:
+            return pd.DataFrame({
+                'returns': [int(selected['returns'].sum())],
+                'refund_total': [round(float(selected['refund_total'].sum()), 2)]
+            })
+
+        group_by = [group_by] if isinstance(group_by, str) else list(group_by)
+        result = selected.groupby(group_by, observed=True, sort=True)[['returns', 'refund_total']].sum()
+        return result.reset_index().sort_values('returns', ascending=False, kind='stable').reset_index(drop=True)
+
+    def save(self, path=None) -> Path:
+        path = Path(path or self.default_path())
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.cells.to_csv(path, index=False)
+        logger.info(f"Saved rollup cube ({len(self.cells)} cells) to {path}")
+        return path
+
+    @classmethod
+    def load(cls, path=None) -> "RollupCube":
+        path = Path(path or cls.default_path())
+        cells = pd.read_csv(path, dtype={dim: str for dim in DIMENSIONS}, keep_default_na=False)
+        cells['week_start'] = pd.to_datetime(cells['week_start'].replace('', None))
+        logger.info(f"Loaded rollup cube ({len(cells)} cells) from {path}")
+        return cls(cells)
+
+    @staticmethod
+    def default_path() -> Path:
+        config = PROCESSING_CONFIG.get("rollup_cube") or {}
+        return PROJECT_ROOT / config.get("file", "data/processed/rollup_cube.csv")
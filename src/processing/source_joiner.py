@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+from src.utils import logger
+
+
+class SourceJoiner:
+    """
+    Per-product feature table across returns, QC reports, packaging logs, reviews and chats.
+    Each source is reduced to one row per product with a single hash aggregation, then all
+    sources are joined on the product index. Rows are keyed by product_id (mapped to the
+    returns product name) and fall back to product_name; chats without product columns are
+    linked through order_id.
+    """
+
+    def __init__(self, product_col: str = 'product_name', id_col: str = 'product_id'):
+        self.product_col = product_col
+        self.id_col = id_col
+
+    def build_product_features(self, returns_df: pd.DataFrame, qc_df: pd.DataFrame = None,
+                               packaging_df: pd.DataFrame = None, reviews_df: pd.DataFrame = None,
+                               chats_df: pd.DataFrame = None) -> pd.DataFrame:
+
+        if returns_df is None or returns_df.empty or self.product_col not in returns_df.columns:
+            logger.warning(f"Returns data with {self.product_col} is required to build product features")
+            return pd.DataFrame()
+
+        id_map = self._id_map([returns_df, qc_df, packaging_df, reviews_df, chats_df])
+        order_map = self._order_map(returns_df)
+
+        returns_key = self._product_keys(returns_df, id_map)
+        features = [pd.DataFrame({'return_count': returns_key.value_counts()})]
+        if 'refund_amount' in returns_df.columns:
+            refunds = pd.to_numeric(returns_df['refund_amount'], errors='coerce')
+            features.append(refunds.groupby(returns_key).sum().rename('refund_total').to_frame())
+
+        if self._usable(qc_df):
+            key = self._product_keys(qc_df, id_map)
+            qc = pd.DataFrame({'qc_reports': 1}, index=qc_df.index)
+            agg = {'qc_reports': ('qc_reports', 'sum')}
+            if 'defect_rate' in qc_df.columns:
+                qc['defect_rate'] = pd.to_numeric(qc_df['defect_rate'], errors='coerce')
+                agg['defect_rate'] = ('defect_rate', 'mean')
+            features.append(qc.groupby(key).agg(**agg))
+
+        if self._usable(packaging_df):
+            key = self._product_keys(packaging_df, id_map)
+            packaging = pd.DataFrame({
+                'packaging_failures': 1,
+                'quantity_affected': pd.to_numeric(packaging_df.get('quantity_affected', 0), errors='coerce')
+            }, index=packaging_df.index)
+            features.append(packaging.groupby(key).agg(
+                packaging_failures=('packaging_failures', 'sum'),
+                quantity_affected=('quantity_affected', 'sum')
+            ))
+
+        if self._usable(reviews_df):
+            key = self._product_keys(reviews_df, id_map)
+            negative = reviews_df['is_negative_review'] if 'is_negative_review' in reviews_df.columns else (
+                pd.to_numeric(reviews_df.get('rating'), errors='coerce') <= 2
+            )
+            reviews = pd.DataFrame({'review_count': 1, 'negative_review_share': negative.astype(float)},
+                                   index=reviews_df.index)
+            features.append(reviews.groupby(key).agg(
+                review_count=('review_count', 'sum'),
+                negative_review_share=('negative_review_share', 'mean')
+            ))
+
+        if chats_df is not None and not chats_df.empty:
+            key = self._product_keys(chats_df, id_map)
+            if 'order_id' in chats_df.columns:
+                key = key.fillna(chats_df['order_id'].map(order_map))
+            related = chats_df['is_return_related'] if 'is_return_related' in chats_df.columns else False
+            chats = pd.DataFrame({'chat_count': 1, 'return_chat_share': pd.Series(related, index=chats_df.index).astype(float)},
+                                 index=chats_df.index)
+            features.append(chats.groupby(key).agg(
+                chat_count=('chat_count', 'sum'),
+                return_chat_share=('return_chat_share', 'mean')
+            ))
+
+        table = pd.concat(features, axis=1, join='outer', sort=True)
+        table.index.name = 'product'
+        count_cols = [col for col in ['return_count', 'qc_reports', 'packaging_failures', 'review_count', 'chat_count']
+                      if col in table.columns]
+        table[count_cols] = table[count_cols].fillna(0).astype(np.int64)
+        for col in ['refund_total', 'quantity_affected']:
+            if col in table.columns:
+                table[col] = table[col].fillna(0)
+        for col in ['defect_rate', 'negative_review_share', 'return_chat_share']:
+            if col in table.columns:
+                table[col] = table[col].round(4)
+
+        table = table.reset_index()
+        if not id_map.empty:
+            ids = pd.Series(id_map.index, index=id_map.to_numpy())
+            table.insert(1, self.id_col, table['product'].map(ids[~ids.index.duplicated()]))
+
+        logger.info(f"Built cross-source features for {len(table)} products from {len(features)} sources")
+        return table
+
+    def correlate(self, features: pd.DataFrame, target: str = 'return_count') -> dict:
+        """Pearson correlation of each numeric feature with the target column"""
+
+        if features.empty or target not in features.columns:
+            return {}
+        numeric = features.select_dtypes(include=['number'])
+        correlations = numeric.corrwith(numeric[target]).drop(target).dropna().round(3)
+        return correlations.sort_values(ascending=False).to_dict()
+
+    def _usable(self, df: pd.DataFrame) -> bool:
+        return df is not None and not df.empty and (self.product_col in df.columns or self.id_col in df.columns)
+
+    def _id_map(self, frames: list) -> pd.Series:
+        """product_id -> product name, from every source that carries both (returns take precedence)"""
+
+        pairs = [
+            df[[self.id_col, self.product_col]]
+            for df in frames
+            if df is not None and self.id_col in df.columns and self.product_col in df.columns
+        ]
+        if not pairs:
+            return pd.Series(dtype=object)
+        pairs = pd.concat(pairs, ignore_index=True).dropna().drop_duplicates(self.id_col)
+        return pairs.set_index(self.id_col)[self.product_col]
+
+    def _order_map(self, returns_df: pd.DataFrame) -> pd.Series:
+        if 'order_id' not in returns_df.columns:
+            return pd.Series(dtype=object)
+        orders = returns_df[['order_id', self.product_col]].dropna().drop_duplicates('order_id')
+        return orders.set_index('order_id')[self.product_col]
+
+    def _product_keys(self, df: pd.DataFrame, id_map: pd.Series) -> pd.Series:
+        """Join key per row: product_id mapped to the product name, else the row's product_name"""
+
+        key = pd.Series(np.nan, index=df.index, dtype=object)
+        if self.id_col in df.columns and not id_map.empty:
+            key = df[self.id_col].map(id_map)
+        if self.product_col in df.columns:
+            key = key.fillna(df[self.product_col])
+        return key
@@ -0,0 +1,111 @@
+import math
+import numpy as np
+import pandas as pd
+from src.utils import logger, parse_dates
+from src.config import PROCESSING_CONFIG
+
+EPOCH = pd.Timestamp("1970-01-01")
+
+
+class SpikeDetector:
+    """
+    Streaming return-spike detector. Each key (a product or a category) keeps O(1) state:
+    an EWMA mean and variance of its daily return count plus the running count of the current day.
+    A key is flagged once per day, as soon as that day's count reaches z_threshold standard
+    deviations above its EWMA mean.
+    """
+
+    SCOPE_PRODUCT = "product"
+    SCOPE_CATEGORY = "category"
+
+    def __init__(self, alpha: float = None, z_threshold: float = None,
+                 min_count: int = None, warmup_days: int = None):
+        config = PROCESSING_CONFIG.get("spike_detection") or {}
+        self.alpha = float(alpha if alpha is not None else config.get("alpha", 0.2))
+        self.z_threshold = float(z_threshold if z_threshold is not None else config.get("z_threshold", 3.0))
+        self.min_count = int(min_count if min_count is not None else config.get("min_count", 10))
+        self.warmup_days = int(warmup_days if warmup_days is not None else config.get("warmup_days", 7))
+        # Beyond this many empty days the decayed mean/variance is effectively zero
+        self.max_gap = int(math.ceil(20 / self.alpha))
+        # key -> [mean, variance, day, count, days_seen, flagged_today]
+        self.state = {}
+        self.spikes = []
+
+    def observe(self, key, day: int, count: int = 1) -> dict:
+        """Fold count events for key on day (days since 1970-01-01); returns the spike event if newly flagged"""
+
+        state = self.state.get(key)
+        if state is None:
+            state = self.state[key] = [0.0, 0.0, day, 0, 0, False]
+        elif day > state[2]:
+            self._close_days(state, day)
+        elif day < state[2]:
+            # Late event for a day already folded into the EWMA; it can no longer be scored
+            return None
+
+        state[3] += count
+        mean, variance, _, current, days_seen, flagged = state
+        if flagged or days_seen < self.warmup_days or current < self.min_count:
+            return None
+
+        z_score = (current - mean) / max(math.sqrt(variance), 1.0)
+        if z_score < self.z_threshold:
+            return None
+
+        state[5] = True
+        scope, name = key
+        event = {
+            'scope': scope,
+            'key': name,
+            'date': str((EPOCH + pd.Timedelta(days=int(day))).date()),
+            'count': int(current),
+            'expected': round(mean, 2),
+            'z_score': round(z_score, 2)
+        }
+        self.spikes.append(event)
+        return event
+
+    def _close_days(self, state: list, day: int) -> None:
+        """Fold the finished day's count and any empty days before `day` into the EWMA"""
+
+        alpha = self.alpha
+        mean, variance = state[0], state[1]
+        gap = day - state[2] - 1
+        for value in [state[3]] + [0] * min(gap, self.max_gap):
+            diff = value - mean
+            increment = alpha * diff
+            mean += increment
+            variance = (1 - alpha) * (variance + diff * increment)
+
+        state[0], state[1] = mean, variance
+        state[2], state[3] = day, 0
+        state[4] += 1 + gap
+        state[5] = False
+
+    def update(self, df: pd.DataFrame, product_col: str, date_col: str, category_col: str = None) -> list:
+        """
+        Feed a batch of return events in date order. Events are pre-counted per (key, day),
+        which gives the same flags as feeding them one at a time since a day's count only grows.
+        """
+
+        days = (parse_dates(df[date_col]).dt.normalize() - EPOCH).dt.days
+        scopes = [(self.SCOPE_PRODUCT, product_col)]
+        if category_col and category_col in df.columns:
+            scopes.append((self.SCOPE_CATEGORY, category_col))
+
+        counts = []
+        for scope, col in scopes:
+            keyed = pd.DataFrame({'name': df[col].to_numpy(), 'day': days.to_numpy()}).dropna()
+            grouped = keyed.groupby(['day', 'name'], sort=False).size().reset_index(name='count')
+            grouped['scope'] = scope
+            counts.append(grouped)
+        counts = pd.concat(counts, ignore_index=True).sort_values('day', kind='stable')
+
+        start = len(self.spikes)
+        for scope, name, day, count in zip(counts['scope'], counts['name'],
+                                           counts['day'].astype(np.int64), counts['count']):
+            self.observe((scope, name), int(day), int(count))
+
+        new_spikes = self.spikes[start:]
+        logger.info(f"Spike detector folded {int(counts['count'].sum())} events, flagged {len(new_spikes)} spikes")
+        return new_spikes
@@ -1,5 +1,6 @@
 """Reporting module"""
 
 from .report_generator import ReportGenerator
+from .results_store import ResultsStore
 
-__all__ = ['ReportGenerator']
+__all__ = ['ReportGenerator', 'ResultsStore']
@@ -406,6 +406,14 @@ class ReportGenerator:
             html += self._build_recommendations_section(data['recommendations'])
         if 'action_items' in data:
             html += self._build_action_items_section(data['action_items'])
+        if 'return_spikes' in data:
+            html += self._build_return_spikes_section(data['return_spikes'])
+        if 'risk_changes' in data:
+            html += self._build_risk_changes_section(data['risk_changes'])
+        if 'llm_coverage' in data:
+            html += self._build_llm_coverage_section(data['llm_coverage'])
+        if 'model_routes' in data:
+            html += self._build_model_routes_section(data['model_routes'])
         
         html += f"""
         <div class="footer">
@@ -637,9 +645,12 @@ class ReportGenerator:
                     <th style="width: 140px;">Return Rate</th>
                     <th style="width: 140px;">Risk Score</th>
                     <th style="width: 120px;">Status</th>
+                    <th style="width: 140px;">Est. Monthly Refunds</th>
+                    <th style="width: 150px;">Weekly Trend</th>
+                    <th>Similar Failure Profiles</th>
                 </tr>
 """
-        for product in products[:10]:
+        for product in products:
             risk_level = product.get('risk_level', 'UNKNOWN')
             risk_score = product.get('risk_score', 0)
             return_rate = product.get('return_rate_percentage', 0)
@@ -652,6 +663,19 @@ class ReportGenerator:
             else:
                 risk_badge = '<span class="badge badge-low">🟢 LOW</span>'
             bar_width = min(risk_score, 100)
+            similar = ', '.join(
+                f"{match['product']} ({match['similarity']:.2f})" for match in product.get('similar_products', [])
+            ) or '-'
+            estimated_refunds = product.get('estimated_refund_amount')
+            estimated_refunds = f"${estimated_refunds:,.2f}" if estimated_refunds is not None else '-'
+            trend = product.get('trend')
+            if trend in ('increasing', 'decreasing', 'stable'):
+                arrow, trend_class = {'increasing': ('↑', 'up'), 'decreasing': ('↓', 'down'), 'stable': ('→', 'stable')}[trend]
+                next_weeks = sum(product.get(f'forecast_w{h}') or 0 for h in range(1, 5))
+                trend_cell = (f'<span class="trend-indicator trend-{trend_class}">{arrow} {trend}</span>'
+                              f'<div style="font-size: 12px; color: #666;">{next_weeks:.0f} returns next 4 wks</div>')
+            else:
+                trend_cell = '-'
             bar_color = '#d32f2f' if bar_width >= 70 else '#f57c00' if bar_width >= 50 else '#fbc02d' if bar_width >= 30 else '#388e3c'
             html += f"""
                 <tr>
@@ -670,6 +694,9 @@ class ReportGenerator:
                         </div>
                     </td>
                     <td>{risk_badge}</td>
+                    <td>{estimated_refunds}</td>
+                    <td>{trend_cell}</td>
+                    <td style="font-size: 12px;">{similar}</td>
                 </tr>
 """
         html += """
@@ -782,6 +809,128 @@ class ReportGenerator:
 """
         return html
     
+    def _build_return_spikes_section(self, spikes: dict) -> str:
+        html = """
+        <div class="section">
+            <h2>📈 Return Spikes</h2>
+            <table>
+                <tr>
+                    <th>Scope</th>
+                    <th>Product / Category</th>
+                    <th>Date</th>
+                    <th style="width: 100px;">Returns</th>
+                    <th style="width: 100px;">Expected</th>
+                    <th style="width: 100px;">Z-Score</th>
+                </tr>
+"""
+        for event in spikes.get('events', [])[:20]:
+            html += f"""
+                <tr>
+                    <td>{event['scope']}</td>
+                    <td><strong>{event['key']}</strong></td>
+                    <td>{event['date']}</td>
+                    <td>{event['count']}</td>
+                    <td>{event['expected']}</td>
+                    <td>{event['z_score']}</td>
+                </tr>
+"""
+        html += """
+            </table>
+        </div>
+"""
+        return html
+    
+    def _build_risk_changes_section(self, changes: list) -> str:
+        html = """
+        <div class="section">
+            <h2>🔁 Risk Changes Since Last Run</h2>
+            <table>
+                <tr>
+                    <th>Product</th>
+                    <th style="width: 120px;">Previous Score</th>
+                    <th style="width: 120px;">Current Score</th>
+                    <th style="width: 100px;">Change</th>
+                    <th style="width: 160px;">Level</th>
+                </tr>
+"""
+        for change in changes:
+            html += f"""
+                <tr>
+                    <td><strong>{change['product']}</strong></td>
+                    <td>{change['previous_risk_score']:.1f}</td>
+                    <td>{change['current_risk_score']:.1f}</td>
+                    <td>{change['risk_score_change']:+.1f}</td>
+                    <td>{change['previous_risk_level']} → {change['current_risk_level']}</td>
+                </tr>
+"""
+        html += """
+            </table>
+        </div>
+"""
+        return html
+    
+    def _build_llm_coverage_section(self, coverage: dict) -> str:
+        budget = coverage.get('time_budget_seconds', 0)
+        budget_label = f"{budget:g}s" if budget else "unlimited"
+        html = f"""
+        <div class="section">
+            <h2>🤖 Analysis Coverage</h2>
+            <p>LLM time budget: <strong>{budget_label}</strong> | Elapsed: <strong>{coverage.get('elapsed_seconds', 0)}s</strong></p>
+            <table>
+                <tr>
+                    <th>Stage</th>
+                    <th>Tier</th>
+                    <th style="width: 120px;">Products</th>
+                </tr>
+"""
+        for stage, tiers in coverage.get('tiers', {}).items():
+            for tier, count in tiers.items():
+                html += f"""
+                <tr>
+                    <td>{stage}</td>
+                    <td>{tier}</td>
+                    <td>{count}</td>
+                </tr>
+"""
+        html += """
+            </table>
+        </div>
+"""
+        return html
+    
+    def _build_model_routes_section(self, routes: dict) -> str:
+        html = """
+        <div class="section">
+            <h2>🧭 Model Routing</h2>
+            <table>
+                <tr>
+                    <th>Route</th>
+                    <th>Model</th>
+                    <th style="width: 100px;">Requests</th>
+                    <th style="width: 100px;">Errors</th>
+                    <th style="width: 120px;">p50 Latency</th>
+                    <th style="width: 120px;">p99 Latency</th>
+                </tr>
+"""
+        for name, stats in routes.items():
+            p50 = f"{stats['p50_ms']:.0f} ms" if 'p50_ms' in stats else '-'
+            p99 = f"{stats['p99_ms']:.0f} ms" if 'p99_ms' in stats else '-'
+            html += f"""
+                <tr>
+                    <td><strong>{name}</strong></td>
+                    <td>{stats.get('model', '')}</td>
+                    <td>{stats.get('requests', 0)}</td>
+                    <td>{stats.get('errors', 0)}</td>
+                    <td>{p50}</td>
+                    <td>{p99}</td>
+                </tr>
+"""
+        html += """
+            </table>
+        </div>
+"""
+        return html
+    
     def save_report_data(self, data: dict, filename: str = None) -> None:
         if filename is None:
             base_filename = f"return_report_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
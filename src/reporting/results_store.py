@@ -0,0 +1,178 @@
+import json
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+import pandas as pd
+from src.utils import logger
+from src.config import REPORTING_CONFIG, PROJECT_ROOT
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    run_date TEXT NOT NULL,
+    total_returns INTEGER,
+    products_analyzed INTEGER
+);
+CREATE TABLE IF NOT EXISTS risk_scores (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    run_date TEXT NOT NULL,
+    product TEXT NOT NULL,
+    return_count INTEGER,
+    return_rate_percentage REAL,
+    risk_score REAL,
+    risk_level TEXT
+);
+CREATE TABLE IF NOT EXISTS category_distribution (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    run_date TEXT NOT NULL,
+    category TEXT NOT NULL,
+    count INTEGER,
+    percentage REAL
+);
+CREATE TABLE IF NOT EXISTS product_patterns (
+    run_id INTEGER NOT NULL REFERENCES runs(run_id),
+    run_date TEXT NOT NULL,
+    product TEXT NOT NULL,
+    total_returns INTEGER,
+    return_rate REAL,
+    top_reasons TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_runs_date ON runs(run_date);
+CREATE INDEX IF NOT EXISTS idx_risk_product_date ON risk_scores(product, run_date);
+CREATE INDEX IF NOT EXISTS idx_risk_run_product ON risk_scores(run_id, product);
+CREATE INDEX IF NOT EXISTS idx_category_date ON category_distribution(category, run_date);
+CREATE INDEX IF NOT EXISTS idx_patterns_product_date ON product_patterns(product, run_date);
+"""
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+CHANGE_COLUMNS = ['product', 'previous_risk_score', 'current_risk_score',
+                  'previous_risk_level', 'current_risk_level', 'risk_score_change']
+
+
+class ResultsStore:
+    """
+    Local SQLite history of each run's risk scores, category distribution and product patterns.
+    Rows carry run_date alongside run_id so per-product history reads straight off the
+    (product, run_date) indexes.
+    """
+
+    def __init__(self, db_path: str = None):
+        config = REPORTING_CONFIG.get("results_store") or {}
+        self.db_path = Path(db_path or PROJECT_ROOT / config.get("path", "data/processed/results.db"))
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record_run(self, analysis_results: dict, run_date: datetime = None, total_returns: int = None) -> int:
+        """Append one run's structured results in a single transaction; returns the run_id"""
+
+        run_date = (run_date or datetime.now()).strftime(DATE_FORMAT)
+        risk_df = analysis_results.get('risk_scores')
+        categories = analysis_results.get('category_distribution') or {}
+        patterns = analysis_results.get('product_patterns') or {}
+
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "INSERT INTO runs (run_date, total_returns, products_analyzed) VALUES (?, ?, ?)",
+                (run_date, total_returns, 0 if risk_df is None else len(risk_df))
+            )
+            run_id = cursor.lastrowid
+
+            if risk_df is not None and not risk_df.empty:
+                conn.executemany(
+                    "INSERT INTO risk_scores VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [
+                        (run_id, run_date, str(product), int(count), float(rate), float(score), level)
+                        for product, count, rate, score, level in zip(
+                            risk_df['product'], risk_df['return_count'], risk_df['return_rate_percentage'],
+                            risk_df['risk_score'], risk_df['risk_level']
+                        )
+                    ]
+                )
+            conn.executemany(
+                "INSERT INTO category_distribution VALUES (?, ?, ?, ?, ?)",
+                [
+                    (run_id, run_date, str(category), int(stats['count']), float(stats['percentage']))
+                    for category, stats in categories.items()
+                ]
+            )
+            conn.executemany(
+                "INSERT INTO product_patterns VALUES (?, ?, ?, ?, ?, ?)",
+                [
+                    (run_id, run_date, str(product), int(data['total_returns']), float(data['return_rate']),
+                     json.dumps([[str(reason), int(count)] for reason, count in data['top_reasons']]))
+                    for product, data in patterns.items()
+                ]
+            )
+
+        logger.info(f"Recorded run {run_id} ({run_date}) in results store {self.db_path}")
+        return run_id
+
+    def _since(self, weeks: int, as_of: datetime = None) -> str:
+        return ((as_of or datetime.now()) - timedelta(weeks=weeks)).strftime(DATE_FORMAT)
+
+    def product_risk_history(self, product: str, weeks: int = 52, as_of: datetime = None) -> pd.DataFrame:
+        """Risk score and level for one product across runs in the last `weeks` weeks"""
+
+        with self._connect() as conn:
+            return pd.read_sql_query(
+                "SELECT run_id, run_date, return_count, return_rate_percentage, risk_score, risk_level "
+                "FROM risk_scores WHERE product = ? AND run_date >= ? ORDER BY run_date",
+                conn, params=(product, self._since(weeks, as_of))
+            )
+
+    def product_pattern_history(self, product: str, weeks: int = 52, as_of: datetime = None) -> pd.DataFrame:
+
+        with self._connect() as conn:
+            history = pd.read_sql_query(
+                "SELECT run_id, run_date, total_returns, return_rate, top_reasons "
+                "FROM product_patterns WHERE product = ? AND run_date >= ? ORDER BY run_date",
+                conn, params=(product, self._since(weeks, as_of))
+            )
+        history['top_reasons'] = history['top_reasons'].map(json.loads)
+        return history
+
+    def category_history(self, category: str = None, weeks: int = 52, as_of: datetime = None) -> pd.DataFrame:
+
+        query = "SELECT run_id, run_date, category, count, percentage FROM category_distribution WHERE run_date >= ?"
+        params = [self._since(weeks, as_of)]
+        if category is not None:
+            query += " AND category = ?"
+            params.append(category)
+        with self._connect() as conn:
+            return pd.read_sql_query(query + " ORDER BY run_date, category", conn, params=params)
+
+    def risk_changes(self, current_run: int = None, previous_run: int = None) -> pd.DataFrame:
+        """Per-product risk score change between two runs (defaults: the latest run and the one before)"""
+
+        with self._connect() as conn:
+            if current_run is None or previous_run is None:
+                latest = [row[0] for row in conn.execute("SELECT run_id FROM runs ORDER BY run_id DESC LIMIT 2")]
+                if len(latest) < 2:
+                    return pd.DataFrame(columns=CHANGE_COLUMNS)
+                current_run = current_run if current_run is not None else latest[0]
+                previous_run = previous_run if previous_run is not None else latest[1]
+
+            changes = pd.read_sql_query(
+                "SELECT cur.product, prev.risk_score AS previous_risk_score, cur.risk_score AS current_risk_score, "
+                "prev.risk_level AS previous_risk_level, cur.risk_level AS current_risk_level "
+                "FROM risk_scores cur LEFT JOIN risk_scores prev ON prev.product = cur.product AND prev.run_id = ? "
+                "WHERE cur.run_id = ?",
+                conn, params=(previous_run, current_run)
+            )
+        changes['risk_score_change'] = changes['current_risk_score'] - changes['previous_risk_score']
+        return changes.sort_values('risk_score_change', ascending=False, na_position='last').reset_index(drop=True)
+
+    def runs(self) -> pd.DataFrame:
+        with self._connect() as conn:
+            return pd.read_sql_query("SELECT * FROM runs ORDER BY run_id", conn)
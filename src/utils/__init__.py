@@ -7,10 +7,21 @@ from .helpers import (
     categorize_return_reason,
     calculate_severity,
     format_date,
+    parse_dates,
+    select_top_n,
+    resolve_dtype_backend,
+    apply_dtype_backend,
+    pack_array,
+    unpack_array,
     merge_dictionaries,
     format_currency,
-    calculate_percentage
+    calculate_percentage,
+    extract_json_object,
+    estimate_tokens,
+    truncate_to_tokens
 )
+from .row_ledger import RowLedger
+from .parallel_executor import ParallelExecutor, contains_pattern
 
 __all__ = [
     'logger',
@@ -19,7 +30,19 @@ __all__ = [
     'categorize_return_reason',
     'calculate_severity',
     'format_date',
+    'parse_dates',
+    'select_top_n',
+    'resolve_dtype_backend',
+    'apply_dtype_backend',
+    'pack_array',
+    'unpack_array',
+    'RowLedger',
+    'ParallelExecutor',
+    'contains_pattern',
     'merge_dictionaries',
     'format_currency',
-    'calculate_percentage'
+    'calculate_percentage',
+    'extract_json_object',
+    'estimate_tokens',
+    'truncate_to_tokens'
 ]
@@ -1,8 +1,12 @@
 """Helper utilities for the Return Prevention Agent"""
 
 import re
+import json
+import base64
 from datetime import datetime
 from typing import List, Dict, Any
+import numpy as np
+import pandas as pd
 
 def normalize_text(text: str) -> str:
     """Normalize text for processing"""
@@ -77,6 +81,72 @@ def format_date(date_str: str, input_format: str = "%Y-%m-%d") -> str:
     except:
         return str(date_str)
 
+def parse_dates(values: pd.Series) -> pd.Series:
+    """Parse a column of mixed-format date strings to naive datetimes; unparseable values become NaT"""
+    if pd.api.types.is_datetime64_any_dtype(values):
+        if getattr(values.dt, 'tz', None) is not None:
+            return values.dt.tz_convert('UTC').dt.tz_localize(None)
+        return values
+    return pd.to_datetime(values, errors='coerce', format='mixed', utc=True).dt.tz_localize(None)
+
+def select_top_n(df: pd.DataFrame, column: str, n: int, mask=None, ascending: bool = False) -> pd.DataFrame:
+    """
+    Rows with the n largest (or smallest) values of column, ordered, among rows where mask holds.
+    Uses a partial selection (argpartition) so only the selected rows are sorted; ties keep row
+    order and missing values rank last, as in a stable sort_values.
+    """
+    values = pd.to_numeric(df[column], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    keys = values if ascending else -values
+    keys = np.where(np.isnan(keys), np.inf, keys)
+    candidates = np.arange(len(df)) if mask is None else np.flatnonzero(np.asarray(mask, dtype=bool))
+    
+    n = max(0, min(int(n), len(candidates)))
+    if n < len(candidates):
+        cutoff = keys[candidates[np.argpartition(keys[candidates], n - 1)[n - 1]]] if n else -np.inf
+        candidates = candidates[keys[candidates] <= cutoff]
+    selected = candidates[np.lexsort((candidates, keys[candidates]))][:n]
+    return df.iloc[selected]
+
+DTYPE_BACKENDS = ('numpy', 'numpy_nullable', 'pyarrow')
+
+def resolve_dtype_backend(backend: str = None) -> str:
+    """
+    Validate a configured dtype backend: "numpy" (object strings, the default), "numpy_nullable"
+    or "pyarrow". "pyarrow" falls back to "numpy" with a warning when pyarrow is not installed.
+    """
+    backend = backend or 'numpy'
+    if backend not in DTYPE_BACKENDS:
+        raise ValueError(f"Unknown dtype_backend '{backend}', expected one of {DTYPE_BACKENDS}")
+    if backend == 'pyarrow':
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            from .logger import logger
+            logger.warning("dtype_backend 'pyarrow' requested but pyarrow is not installed; using numpy dtypes")
+            return 'numpy'
+    return backend
+
+def apply_dtype_backend(df: pd.DataFrame, backend: str, columns: list = None) -> pd.DataFrame:
+    """Convert columns (default: all object columns) to the backend's dtypes; no-op for "numpy" """
+    if backend == 'numpy' or df.empty:
+        return df
+    if columns is None:
+        columns = df.select_dtypes(include=['object']).columns
+    columns = [col for col in columns if col in df.columns]
+    if not columns:
+        return df
+    df = df.copy()
+    df[columns] = df[columns].convert_dtypes(dtype_backend=backend)
+    return df
+
+def pack_array(values: np.ndarray) -> str:
+    """Numeric array as base64 text, for compact JSON state files"""
+    return base64.b64encode(np.ascontiguousarray(values).tobytes()).decode('ascii')
+
+def unpack_array(text: str, dtype) -> np.ndarray:
+    """Inverse of pack_array"""
+    return np.frombuffer(base64.b64decode(text or ''), dtype=dtype).copy()
+
 def merge_dictionaries(*dicts: Dict) -> Dict:
     """Merge multiple dictionaries"""
     result = {}
@@ -93,3 +163,40 @@ def calculate_percentage(part: float, total: float) -> float:
     if total == 0:
         return 0
     return round((part / total) * 100, 2)
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token estimate (~4 characters per token)"""
+    if not text:
+        return 0
+    return (len(text) + 3) // 4
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Truncate text to an approximate token budget, cutting at a line break where possible"""
+    if not text or not max_tokens or estimate_tokens(text) <= max_tokens:
+        return text
+    cut = text[:max_tokens * 4]
+    newline = cut.rfind('\n')
+    if newline > len(cut) // 2:
+        cut = cut[:newline]
+    return cut.rstrip() + "\n[truncated]"
+
+def extract_json_object(text: str) -> Dict[str, Any]:
+    """Extract the outermost JSON object from an LLM response, tolerating code fences and trailing commas"""
+    if not isinstance(text, str) or not text.strip():
+        return {}
+    
+    candidate = re.sub(r'^```(?:json)?\s*|\s*```$', '', text.strip())
+    start = candidate.find('{')
+    end = candidate.rfind('}')
+    if start == -1 or end <= start:
+        return {}
+    candidate = candidate[start:end + 1]
+    
+    for attempt in (candidate, re.sub(r',\s*([}\]])', r'\1', candidate)):
+        try:
+            parsed = json.loads(attempt)
+            return parsed if isinstance(parsed, dict) else {}
+        except json.JSONDecodeError:
+            continue
+    
+    return {}
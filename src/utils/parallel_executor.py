@@ -0,0 +1,89 @@
+import os
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from .logger import logger
+from src.config import PROCESSING_CONFIG
+
+
+def contains_pattern(values: np.ndarray, pattern: str) -> np.ndarray:
+    """Case-insensitive regex flag per value; a block function for ParallelExecutor.map_column"""
+    return pd.Series(values, dtype=object).str.contains(pattern, case=False, regex=True).to_numpy(dtype=bool)
+
+
+class ParallelExecutor:
+    """
+    Runs a per-value text function over a column in row blocks on a process pool. Only the
+    distinct values of the column are shipped to workers (as plain object arrays, one block
+    per task), and results are mapped back to every row in the original order. Columns with
+    fewer than min_values distinct values, or a single worker, run inline without a pool.
+    The pool is started on first use and stays up until shutdown() or shutdown_shared().
+    Block functions take an array of values (plus any extra arguments) and return a sequence
+    of the same length; they must be module-level so workers can import them.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, workers: int = None, block_rows: int = None, min_values: int = None):
+        config = PROCESSING_CONFIG.get("parallel") or {}
+        workers = workers if workers is not None else config.get("workers", 1)
+        self.workers = int(workers) if workers else (os.cpu_count() or 1)
+        self.block_rows = int(block_rows or config.get("block_rows", 50000))
+        self.min_values = int(min_values if min_values is not None else config.get("min_values", 200000))
+        self._pool = None
+
+    @classmethod
+    def shared(cls) -> "ParallelExecutor":
+        """Process-wide executor so every stage reuses one worker pool"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    @classmethod
+    def shutdown_shared(cls) -> None:
+        """Stop the process-wide pool if one was started"""
+        with cls._shared_lock:
+            if cls._shared is not None:
+                cls._shared.shutdown()
+                cls._shared = None
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+            self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+            logger.info(f"Started process pool with {self.workers} workers")
+        return self._pool
+
+    def shutdown(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+            logger.info("Stopped process pool")
+
+    def map_values(self, values: np.ndarray, func, *args) -> np.ndarray:
+        """Apply a block function to an array of values; returns an object array in the same order"""
+
+        values = np.asarray(values, dtype=object)
+        if self.workers <= 1 or len(values) < self.min_values:
+            return np.asarray(func(values, *args), dtype=object)
+
+        blocks = [values[start:start + self.block_rows] for start in range(0, len(values), self.block_rows)]
+        results = self._get_pool().map(func, blocks, *[[arg] * len(blocks) for arg in args])
+        results = np.concatenate([np.asarray(result, dtype=object) for result in results])
+        logger.info(f"Mapped {len(values)} values in {len(blocks)} blocks on {self.workers} workers")
+        return results
+
+    def map_column(self, series: pd.Series, func, *args, fill_value='') -> pd.Series:
+        """
+        Apply a block function to a column, computing each distinct value once.
+        Missing values are replaced by fill_value first.
+        """
+
+        codes, uniques = pd.factorize(series.fillna(fill_value))
+        results = self.map_values(np.asarray(uniques, dtype=object), func, *args)
+        return pd.Series(results[codes] if len(codes) else results[:0], index=series.index)
@@ -0,0 +1,95 @@
+"""Remembers which return rows a running summary has already folded"""
+
+import numpy as np
+import pandas as pd
+from .logger import logger
+from .helpers import pack_array, unpack_array
+
+EPOCH = pd.Timestamp("1970-01-01")
+
+
+class RowLedger:
+    """
+    Content keys of the rows folded into a persisted summary, kept while their day is inside
+    the lookback window. Feeding the same rows again (a re-read or a re-exported source) admits
+    only the unseen ones. Rows dated at or before the window start of the previous run may
+    have been folded with their keys already evicted, so they are skipped with a warning.
+    """
+
+    KEY_COLUMNS = ['source', 'order_id', 'product_id', 'quantity', 'refund_amount']
+
+    def __init__(self, lookback_days: int):
+        self.lookback_days = int(lookback_days)
+        self.as_of_day = None
+        self.keys = np.zeros(0, dtype=np.uint64)
+        self.days = np.zeros(0, dtype=np.int64)
+
+    @classmethod
+    def row_keys(cls, df: pd.DataFrame, product_col: str, date_col: str) -> np.ndarray:
+        """
+        64-bit key per return row from its product, date and identifying columns. Identical rows
+        are told apart by their occurrence number, so a repeated row in a grown export is new.
+        """
+
+        columns = [product_col, date_col] + [c for c in cls.KEY_COLUMNS if c in df.columns]
+        keys = pd.util.hash_pandas_object(df[columns].astype(str), index=False).to_numpy()
+        occurrence = pd.Series(keys).groupby(keys, sort=False).cumcount().to_numpy().astype(np.uint64)
+        with np.errstate(over='ignore'):
+            return keys + occurrence * np.uint64(0x9E3779B97F4A7C15)
+
+    @staticmethod
+    def day_numbers(dates: pd.Series) -> np.ndarray:
+        """Days since 1970-01-01 as floats (NaN for missing dates)"""
+        return (dates.dt.normalize() - EPOCH).dt.days.to_numpy(dtype=np.float64, na_value=np.nan)
+
+    def unseen(self, keys: np.ndarray) -> np.ndarray:
+        """Mask of row keys not folded yet"""
+        return ~np.isin(keys, self.keys)
+
+    def admit(self, keys: np.ndarray, days: np.ndarray) -> np.ndarray:
+        """
+        Mask of the rows to fold now (unseen, and not older than the previous window) and record
+        them. days are whole day numbers; the ledger's as_of_day advances to the newest one.
+        """
+
+        admitted = self.unseen(keys)
+        if self.as_of_day is not None:
+            expired = admitted & (self.as_of_day - days >= self.lookback_days)
+            if expired.any():
+                logger.warning(f"Skipped {int(expired.sum())} unseen returns dated before the last "
+                               f"{self.lookback_days}-day window; they arrived too late to fold")
+                admitted &= ~expired
+            late = admitted & (days < self.as_of_day)
+            if late.any():
+                logger.info(f"Folding {int(late.sum())} late returns dated before the last processed day")
+
+        if admitted.any():
+            latest = int(days[admitted].max())
+            self.as_of_day = latest if self.as_of_day is None else max(self.as_of_day, latest)
+            self.keys = np.concatenate([self.keys, keys[admitted]])
+            self.days = np.concatenate([self.days, days[admitted]])
+            self.evict()
+        return admitted
+
+    def evict(self) -> None:
+        if self.as_of_day is None:
+            return
+        keep = self.as_of_day - self.days < self.lookback_days
+        self.keys, self.days = self.keys[keep], self.days[keep]
+
+    def to_dict(self) -> dict:
+        return {
+            'lookback_days': self.lookback_days,
+            'as_of_day': self.as_of_day,
+            'key': pack_array(self.keys),
+            'day': pack_array(self.days)
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict, lookback_days: int = None) -> "RowLedger":
+        ledger = cls(lookback_days or data.get('lookback_days', 0))
+        ledger.as_of_day = data.get('as_of_day')
+        ledger.keys = unpack_array(data.get('key'), np.uint64)
+        ledger.days = unpack_array(data.get('day'), np.int64)
+        ledger.evict()
+        return ledger
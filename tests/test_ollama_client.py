@@ -0,0 +1,113 @@
+import time
+
+import pytest
+
+from benchmarks.fake_ollama_server import FakeOllamaServer
+from src.analysis import LLMScheduler, ModelRouter, OllamaClient, RootCauseAnalyzer
+
+
+@pytest.fixture
+def server():
+    server = FakeOllamaServer().start()
+    yield server
+    server.stop()
+
+
+def make_client(server) -> OllamaClient:
+    router = ModelRouter(routes={'LOW': {'model': 'mistral', 'max_concurrency': 1, 'timeout': 5}},
+                         default_model='mistral', default_timeout=5, default_concurrency=1)
+    client = OllamaClient(router)
+    client.base_url = server.url
+    return client
+
+
+def test_route_stats_count_only_requests_sent(server):
+    client = make_client(server)
+    scheduler = LLMScheduler(0.2)
+    scheduler.start()
+
+    budget = scheduler.budget()
+    assert client.generate("Analyze these product return data", risk_level='LOW', budget=budget) is not None
+    assert client.generate("Analyze these product return data", risk_level='LOW', budget=budget) is not None
+
+    time.sleep(0.25)
+    for _ in range(3):
+        assert client.generate("Analyze these product return data", risk_level='LOW', budget=budget) is None
+
+    stats = client.router.summary()['LOW']
+    assert server.request_count == 2
+    assert stats['requests'] == 2
+    assert stats['errors'] == 0
+
+
+def test_slot_acquired_after_the_deadline_is_not_recorded():
+    router = ModelRouter(routes={}, default_model='mistral', default_timeout=5, default_concurrency=1)
+    scheduler = LLMScheduler(0.01)
+    scheduler.start()
+    time.sleep(0.02)
+
+    with router.acquire(None, scheduler.budget()) as route:
+        assert route is None
+    assert router.summary() == {}
+
+
+def stub_generate(client: OllamaClient, keyed_reply: str) -> list:
+    """Answer keyed-JSON prompts with keyed_reply and single prompts with a marker; returns the prompts sent"""
+    prompts = []
+
+    def generate(prompt, json_mode=False, **kwargs):
+        prompts.append(prompt)
+        if json_mode:
+            return keyed_reply
+        return f"single answer #{len(prompts)}"
+
+    client.generate = generate
+    return prompts
+
+
+@pytest.mark.parametrize('reply, answered', [
+    ('{"P1": "Sizing runs small", "P3": "Zipper breaks"}', {'Jacket', 'Boots'}),
+    ('```json\n{"P2": "Soles peel", "P3": ""}', {'Sneakers'}),
+    ('Sorry, I cannot answer that.', set()),
+    (None, set()),
+])
+def test_keyed_reply_missing_products_are_retried_one_by_one(reply, answered):
+    client = OllamaClient(ModelRouter(routes={}, default_model='mistral'))
+    stub_generate(client, reply)
+    retried = []
+
+    def retry(name):
+        retried.append(name)
+        return f"retried {name}"
+
+    items = {'Jacket': {}, 'Sneakers': {}, 'Boots': {}}
+    results = client.generate_keyed(
+        items,
+        build_prompt=lambda keys: ", ".join(keys),
+        parse_value=lambda value, name: value.strip() if isinstance(value, str) and value.strip() else None,
+        retry=retry
+    )
+
+    assert list(results) == list(items)
+    assert set(retried) == set(items) - answered
+    assert all(results[name] == f"retried {name}" for name in retried)
+    assert all(not results[name].startswith("retried") for name in answered)
+
+
+def test_batch_analysis_falls_back_to_single_prompts_for_missing_products(monkeypatch):
+    monkeypatch.setattr(OllamaClient, 'connect', lambda self: True)
+    analyzer = RootCauseAnalyzer(ModelRouter(routes={}, default_model='mistral'))
+    prompts = stub_generate(analyzer.ollama, '{"P2": "Sole separates after a week", "P4": "unknown"}')
+
+    product_data = {
+        name: {'total_returns': 4, 'risk_level': 'HIGH', 'top_reasons': [('Defective', 4)]}
+        for name in ['Jacket', 'Sneakers', 'Boots']
+    }
+    results = analyzer.analyze_batch(product_data)
+
+    assert list(results) == ['Jacket', 'Sneakers', 'Boots']
+    assert results['Sneakers'] == "Sole separates after a week"
+    assert len(prompts) == 3
+    assert "Product: Jacket" in prompts[1] and "Product: Boots" in prompts[2]
+    assert results['Jacket'] == "single answer #2"
+    assert results['Boots'] == "single answer #3"
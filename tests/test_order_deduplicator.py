@@ -0,0 +1,105 @@
+import sqlite3
+import pandas as pd
+import pytest
+
+from src.processing import OrderDeduplicator
+
+
+def make_orders(ids, source: str) -> pd.DataFrame:
+    return pd.DataFrame({
+        'order_id': [f"ORD{i}" for i in ids],
+        'product_name': [f"Product {i % 3}" for i in ids],
+        'source': source
+    })
+
+
+def run(index_file, *feeds) -> pd.DataFrame:
+    """One pipeline run: a fresh deduplicator over the persisted index and the combined feeds"""
+    deduplicator = OrderDeduplicator(index_file=index_file, bloom_bits=1 << 16, bloom_hashes=4)
+    combined = pd.concat(
+        [df.assign(row_hash=OrderDeduplicator.row_hashes(df)) for df in feeds], ignore_index=True
+    )
+    return deduplicator.drop_duplicates(combined)
+
+
+@pytest.fixture
+def index_file(tmp_path):
+    return tmp_path / "order_index.db"
+
+
+def test_cross_source_duplicates_are_dropped(index_file):
+    amazon = make_orders(range(5), 'Amazon')
+    website = make_orders(range(3, 8), 'Website')
+
+    kept = run(index_file, amazon, website)
+    assert kept['order_id'].tolist() == [f"ORD{i}" for i in range(8)]
+    assert kept['source'].tolist() == ['Amazon'] * 5 + ['Website'] * 3
+    assert 'row_hash' not in kept.columns
+
+    # A later run still attributes the shared orders to the feed that reported them first
+    kept = run(index_file, website, amazon)
+    assert kept.groupby('source').size().to_dict() == {'Amazon': 5, 'Website': 3}
+
+
+def test_same_file_reread_keeps_rows(index_file):
+    amazon = make_orders(range(3), 'Amazon')
+
+    run(index_file, amazon)
+    kept = run(index_file, amazon)
+    pd.testing.assert_frame_equal(kept, amazon)
+
+
+def test_grown_reexport_in_second_file_is_not_double_counted(index_file):
+    january = make_orders(range(3), 'Amazon')
+    february = make_orders(range(4), 'Amazon')
+
+    run(index_file, january)
+    kept = run(index_file, january, february)
+    assert kept['order_id'].tolist() == ['ORD0', 'ORD1', 'ORD2', 'ORD3']
+
+    # The grown export on its own is a re-read of the recorded rows plus one new order
+    kept = run(index_file, february)
+    pd.testing.assert_frame_equal(kept, february)
+
+
+def test_corrected_reexport_of_recorded_order_is_kept(index_file):
+    run(index_file, make_orders(range(2), 'Amazon').assign(refund_amount=[10.0, 20.0]))
+
+    corrected = make_orders(range(2), 'Amazon').assign(refund_amount=[10.0, 15.0])
+    pd.testing.assert_frame_equal(run(index_file, corrected), corrected)
+    pd.testing.assert_frame_equal(run(index_file, corrected), corrected)
+    with sqlite3.connect(index_file) as conn:
+        stored = {row[0] for row in conn.execute("SELECT row_hash FROM orders")}
+    assert stored == set(OrderDeduplicator.row_hashes(corrected).to_numpy().view('int64').tolist())
+
+    # The corrected order still belongs to its feed: another feed reporting it is dropped
+    website = make_orders([1], 'Website').assign(refund_amount=[15.0])
+    assert run(index_file, website).empty
+
+
+def test_in_batch_duplicates_are_dropped(index_file):
+    amazon = make_orders([0, 1, 1, 2], 'Amazon').assign(refund_amount=[10.0, 20.0, 25.0, 30.0])
+
+    kept = run(index_file, amazon)
+    assert kept['order_id'].tolist() == ['ORD0', 'ORD1', 'ORD2']
+
+
+def test_duplicates_with_differently_spelled_products_are_dropped(index_file):
+    amazon = pd.DataFrame({'order_id': ['ORD1'], 'product_name': ['iPhone 13 Case'],
+                           'canonical_product_id': ['B0XYZ'], 'source': 'Amazon'})
+    website = pd.DataFrame({'order_id': ['ord1 '], 'product_name': ['IPHONE-13 case (B0XYZ)'],
+                            'canonical_product_id': ['B0XYZ'], 'source': 'Website'})
+
+    kept = run(index_file, amazon, website)
+    assert kept['source'].tolist() == ['Amazon']
+
+
+def test_rows_without_order_id_are_kept(index_file):
+    amazon = make_orders(range(2), 'Amazon')
+    website = pd.concat([make_orders(range(2), 'Website'),
+                         pd.DataFrame({'order_id': [None], 'product_name': ['Product 0'], 'source': ['Website']})],
+                        ignore_index=True)
+
+    kept = run(index_file, amazon, website)
+    assert len(kept) == 3
+    assert kept['order_id'].isna().sum() == 1